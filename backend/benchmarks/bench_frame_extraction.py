@@ -0,0 +1,172 @@
+"""
+Frame Extraction Benchmark
+Compares the grab()-based interval and scene extraction against the previous
+read()-every-frame loops, and the scene change detectors against each other,
+reporting decoded frames per second
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services"))
+
+from frame_extractor import extract_frames, extract_frames_with_scene_detection
+from scene_detectors import DETECTORS
+
+def legacy_interval(video_path, output_folder, interval=3, max_frames=50):
+    """Previous extract_frames loop: read() and convert every frame"""
+    cap = cv2.VideoCapture(video_path)
+    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    frame_interval = int(fps * interval)
+    count = 0
+    saved = 0
+    while cap.isOpened() and saved < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if count % frame_interval == 0:
+            cv2.imwrite(os.path.join(output_folder, f"frame_{saved:04d}.jpg"), frame)
+            saved += 1
+        count += 1
+    cap.release()
+    return {"success": True, "frames_extracted": saved}
+
+def legacy_scene(video_path, output_folder, threshold=30.0, max_frames=50):
+    """Previous scene detection loop: read() and diff every frame"""
+    cap = cv2.VideoCapture(video_path)
+    ret, prev_frame = cap.read()
+    prev_gray = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
+    cv2.imwrite(os.path.join(output_folder, "frame_0000.jpg"), prev_frame)
+    saved = 1
+    while cap.isOpened() and saved < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if cv2.absdiff(prev_gray, gray).mean() > threshold:
+            cv2.imwrite(os.path.join(output_folder, f"frame_{saved:04d}.jpg"), frame)
+            saved += 1
+            prev_gray = gray
+    cap.release()
+    return {"success": True, "frames_extracted": saved}
+
+def make_synthetic_video(path, seconds=60, fps=30, width=1920, height=1080, slide_seconds=5):
+    """
+    Write a slide-style test video: static slides with a moving cursor
+
+    Args:
+        path: Output .mp4 path
+        seconds: Video length
+        fps: Frame rate
+        width: Frame width
+        height: Frame height
+        slide_seconds: How long each slide stays on screen
+
+    Returns:
+        str: The path written
+    """
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    rng = np.random.default_rng(0)
+    slide = None
+    for index in range(seconds * fps):
+        if index % (slide_seconds * fps) == 0:
+            slide = np.full((height, width, 3), int(rng.integers(150, 255)), dtype=np.uint8)
+            for line in range(8):
+                y = 120 + line * (height - 200) // 8
+                cv2.putText(slide, f"x^{line} + {rng.integers(100)} = y", (80, y),
+                            cv2.FONT_HERSHEY_SIMPLEX, 2.0, (0, 0, 0), 3)
+        frame = slide.copy()
+        cv2.circle(frame, ((index * 7) % width, height // 2), 12, (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+def time_run(function, video_path, total_frames, **kwargs):
+    """Run one extraction into a scratch folder and return timing figures"""
+    with tempfile.TemporaryDirectory() as output_folder:
+        start = time.perf_counter()
+        result = function(video_path, output_folder, **kwargs)
+        elapsed = time.perf_counter() - start
+    return {
+        "seconds": round(elapsed, 3),
+        "frames_per_second": round(total_frames / elapsed, 1) if elapsed > 0 else 0.0,
+        "frames_extracted": result.get("frames_extracted", 0),
+        "detect_ms_per_frame": result.get("detect_ms_per_frame")
+    }
+
+def run_benchmark(video_path, interval=3, threshold=30.0, strides=(1, 5), max_frames=50, repeat=3,
+                  detectors=(), adaptive=False):
+    """
+    Benchmark legacy and current extraction on one video
+
+    Args:
+        video_path: Video to decode
+        interval: Seconds between frames for interval mode
+        threshold: Scene change threshold
+        strides: Scene detection strides to measure
+        max_frames: Maximum frames saved per run
+        detectors: Scene detectors to compare at stride 1 with their default thresholds
+        adaptive: Use the adaptive threshold for the detector cases
+        repeat: Runs per case; the fastest run is reported
+
+    Returns:
+        dict: Per-case timings keyed by case name
+    """
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    cases = {
+        "interval_legacy": (legacy_interval, {"interval": interval, "max_frames": max_frames}),
+        "interval_grab": (extract_frames, {"interval": interval, "max_frames": max_frames}),
+        "scene_legacy": (legacy_scene, {"threshold": threshold, "max_frames": max_frames})
+    }
+    for stride in strides:
+        cases[f"scene_grab_stride{stride}"] = (
+            extract_frames_with_scene_detection,
+            {"threshold": threshold, "max_frames": max_frames, "stride": stride}
+        )
+    for detector in detectors:
+        cases[f"scene_{detector}{'_adaptive' if adaptive else ''}"] = (
+            extract_frames_with_scene_detection,
+            {"max_frames": max_frames, "detector": detector, "adaptive": adaptive}
+        )
+
+    results = {}
+    for name, (function, kwargs) in cases.items():
+        runs = [time_run(function, video_path, total_frames, **kwargs) for _ in range(repeat)]
+        results[name] = min(runs, key=lambda run: run["seconds"])
+        print(f"{name}: {results[name]['frames_per_second']} frames/s", file=sys.stderr)
+
+    return {"video": video_path, "total_frames": total_frames, "results": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark frame extraction")
+    parser.add_argument("video_path", nargs="?",
+                        help="Video to benchmark (a synthetic 1080p video is generated if omitted)")
+    parser.add_argument("--interval", type=float, default=3)
+    parser.add_argument("--threshold", type=float, default=30.0)
+    parser.add_argument("--strides", type=int, nargs="+", default=[1, 5])
+    parser.add_argument("--max-frames", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--detectors", nargs="*", choices=list(DETECTORS), default=[],
+                        help="Scene detectors to compare")
+    parser.add_argument("--adaptive", action="store_true")
+    parser.add_argument("--seconds", type=int, default=60, help="Length of the synthetic video")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        video_path = args.video_path or make_synthetic_video(
+            os.path.join(scratch, "synthetic.mp4"), seconds=args.seconds
+        )
+        report = run_benchmark(video_path, args.interval, args.threshold, args.strides,
+                               args.max_frames, args.repeat, args.detectors, args.adaptive)
+
+    print(json.dumps(report, indent=2))
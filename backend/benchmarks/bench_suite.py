@@ -0,0 +1,465 @@
+"""
+Benchmark Suite
+End-to-end benchmarks for the Python media services on synthetic fixtures
+generated locally (slide videos with rendered equations, speech-like audio,
+large transcripts), with a JSON run history and regression checks against a
+baseline run
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from datetime import datetime, timezone
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "services"))
+sys.path.insert(0, str(BENCH_DIR))
+
+SECTIONS = ("frames", "ocr", "transcribe", "audio", "merge")
+
+DEFAULT_HISTORY = BENCH_DIR / "results" / "history.json"
+
+# Allowed slowdown before a metric counts as a regression
+DEFAULT_TOLERANCE = 0.15
+
+SAMPLE_RATE = 16000
+
+# Equations drawn on the synthetic slides (mathtext subset of LaTeX)
+SLIDE_EQUATIONS = [
+    r"E = mc^2",
+    r"\int_0^1 x^2\,dx = \frac{1}{3}",
+    r"\sum_{n=1}^{\infty} \frac{1}{n^2} = \frac{\pi^2}{6}",
+    r"f(x) = \frac{1}{\sigma\sqrt{2\pi}} e^{-\frac{(x-\mu)^2}{2\sigma^2}}",
+    r"\nabla \cdot \mathbf{E} = \frac{\rho}{\epsilon_0}",
+    r"a^2 + b^2 = c^2",
+    r"\frac{d}{dx} \sin x = \cos x",
+    r"x = \frac{-b \pm \sqrt{b^2 - 4ac}}{2a}",
+    r"\lim_{h \to 0} \frac{f(x+h) - f(x)}{h}",
+    r"e^{i\pi} + 1 = 0"
+]
+
+try:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    MATPLOTLIB_AVAILABLE = True
+except ImportError:
+    # Equations are then drawn as plain LaTeX source with OpenCV
+    MATPLOTLIB_AVAILABLE = False
+
+def render_slide(index, width=1280, height=720):
+    """
+    Draw one lecture slide: a title and a few rendered equations
+
+    Returns:
+        numpy.ndarray: BGR image
+    """
+    rng = random.Random(index)
+    equations = rng.sample(SLIDE_EQUATIONS, 3)
+    title = f"Lecture slide {index + 1}"
+
+    if MATPLOTLIB_AVAILABLE:
+        figure = Figure(figsize=(width / 100, height / 100), dpi=100)
+        canvas = FigureCanvasAgg(figure)
+        figure.text(0.06, 0.86, title, fontsize=30, weight="bold")
+        for line, equation in enumerate(equations):
+            figure.text(0.1, 0.62 - line * 0.22, f"${equation}$", fontsize=28)
+        canvas.draw()
+        rgba = np.asarray(canvas.buffer_rgba())
+        return cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR)
+
+    slide = np.full((height, width, 3), 255, dtype=np.uint8)
+    cv2.putText(slide, title, (60, 100), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (0, 0, 0), 3)
+    for line, equation in enumerate(equations):
+        cv2.putText(slide, equation, (90, 260 + line * 150), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 0), 2)
+    return slide
+
+def make_slide_video(path, seconds=60, fps=30, width=1280, height=720, slide_seconds=6):
+    """
+    Write a lecture-style video: rendered equation slides with a moving pointer
+
+    OpenCV writes the frames; when ffmpeg is on PATH the result is re-encoded
+    to H.264, as downloaded lectures usually are.
+
+    Returns:
+        str: The path written
+    """
+    raw_path = path if not shutil.which("ffmpeg") else str(Path(path).with_suffix(".raw.mp4"))
+    writer = cv2.VideoWriter(raw_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    slide = None
+    for index in range(int(seconds * fps)):
+        if index % (slide_seconds * fps) == 0:
+            slide = render_slide(index // (slide_seconds * fps), width, height)
+        frame = slide.copy()
+        cv2.circle(frame, ((index * 7) % width, height - 60), 10, (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+
+    if raw_path != path:
+        completed = subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-i", raw_path, "-c:v", "libx264", "-preset", "veryfast",
+             "-pix_fmt", "yuv420p", path],
+            capture_output=True
+        )
+        if completed.returncode == 0:
+            os.remove(raw_path)
+        else:
+            os.replace(raw_path, path)
+    return path
+
+def make_slide_images(folder, count=12, width=1280, height=720):
+    """Write distinct slides as PNG images for the OCR benchmark"""
+    Path(folder).mkdir(parents=True, exist_ok=True)
+    for index in range(count):
+        cv2.imwrite(os.path.join(folder, f"slide_{index:03d}.png"), render_slide(index, width, height))
+    return folder
+
+def make_speech_audio(path, seconds=60, seed=0):
+    """
+    Write a 16 kHz mono WAV that looks like speech to the analyzers
+
+    Voiced "syllables" (a gliding pitch with harmonics, 3-6 per second) are
+    grouped into phrases separated by short pauses, over low background noise.
+
+    Returns:
+        str: The path written
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    audio = rng.normal(0, 0.005, total)
+
+    position = 0
+    while position < total:
+        phrase = int(rng.uniform(1.5, 4.0) * SAMPLE_RATE)
+        end = min(total, position + phrase)
+        while position < end:
+            length = min(end - position, int(rng.uniform(0.12, 0.3) * SAMPLE_RATE))
+            t = np.arange(length) / SAMPLE_RATE
+            pitch = rng.uniform(110, 220) * (1 + 0.1 * np.sin(2 * np.pi * 4 * t))
+            phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+            voice = sum(np.sin(phase * harmonic) / harmonic for harmonic in range(1, 6))
+            audio[position:position + length] += 0.2 * voice * np.hanning(length)
+            position += length
+        position += int(rng.uniform(0.2, 0.8) * SAMPLE_RATE)
+
+    samples = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.tobytes())
+    return path
+
+def make_fixtures(folder, video_seconds=60, audio_seconds=60, images=12):
+    """
+    Generate (or reuse) the fixtures in a folder
+
+    File names include the settings, so a kept fixtures folder is only
+    reused for the same sizes.
+
+    Returns:
+        dict: Paths of the video, slide image folder and audio file
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    fixtures = {
+        "video": folder / f"slides_{video_seconds}s.mp4",
+        "images": folder / f"slides_{images}",
+        "audio": folder / f"speech_{audio_seconds}s.wav"
+    }
+
+    if not fixtures["video"].exists():
+        print(f"Rendering {video_seconds}s slide video...", file=sys.stderr)
+        make_slide_video(str(fixtures["video"]), seconds=video_seconds)
+    if not fixtures["images"].exists():
+        make_slide_images(str(fixtures["images"]), images)
+    if not fixtures["audio"].exists():
+        make_speech_audio(str(fixtures["audio"]), seconds=audio_seconds)
+
+    return {name: str(path) for name, path in fixtures.items()}
+
+def audio_seconds(path):
+    with wave.open(path, "rb") as f:
+        return f.getnframes() / f.getframerate()
+
+def bench_frames(fixtures, repeat=3):
+    """Decoded frames per second for interval and scene extraction"""
+    from bench_frame_extraction import time_run
+    from frame_extractor import extract_frames, extract_frames_with_scene_detection
+
+    cap = cv2.VideoCapture(fixtures["video"])
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    details = {}
+    for name, function, kwargs in (
+        ("interval", extract_frames, {"interval": 3}),
+        ("scene", extract_frames_with_scene_detection, {"threshold": 30.0}),
+        ("scene_stride5", extract_frames_with_scene_detection, {"threshold": 30.0, "stride": 5})
+    ):
+        runs = [time_run(function, fixtures["video"], total_frames, **kwargs) for _ in range(repeat)]
+        details[name] = min(runs, key=lambda run: run["seconds"])
+
+    metrics = {f"frames.{name}_fps": case["frames_per_second"] for name, case in details.items()}
+    return metrics, {"total_frames": total_frames, "cases": details}
+
+def bench_ocr(fixtures, backend="auto", workers=1):
+    """OCR images per second over the rendered slides, model loading excluded"""
+    from equation_ocr import EquationExtractor
+
+    extractor = EquationExtractor(backend=backend)
+    if not extractor.use_latex and not extractor.use_text:
+        raise ImportError("no OCR backend installed (pix2tex or pytesseract)")
+    warm_up = extractor.warm_up()
+
+    images = len(list(Path(fixtures["images"]).glob("*.png")))
+    started = time.perf_counter()
+    result = extractor.extract_from_folder(fixtures["images"], "*.png", workers)
+    elapsed = time.perf_counter() - started
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+
+    metrics = {
+        "ocr.images_per_second": round(images / elapsed, 3),
+        "ocr.warm_up_seconds": round(warm_up, 3)
+    }
+    return metrics, {"images": images, "backend": extractor.backend, "workers": workers,
+                     "equations_found": result["total_equations"]}
+
+def bench_transcribe(fixtures, model_name="tiny"):
+    """Real-time factor of transcribe_audio() (seconds taken per second of audio)"""
+    from whisper_profiles import resolve_profile
+    from whisper_service_simple import load_model, transcribe_audio
+
+    profile = resolve_profile("fast", {"model": model_name})
+    started = time.perf_counter()
+    model = load_model(profile)
+    load_seconds = time.perf_counter() - started
+
+    duration = audio_seconds(fixtures["audio"])
+    started = time.perf_counter()
+    segments = transcribe_audio(fixtures["audio"], model)
+    elapsed = time.perf_counter() - started
+
+    metrics = {
+        "transcribe.rtf": round(elapsed / duration, 4),
+        "transcribe.load_seconds": round(load_seconds, 3)
+    }
+    return metrics, {"model": model_name, "audio_seconds": duration, "segments": len(segments)}
+
+def bench_audio(fixtures, repeat=3):
+    """Latency of analyze_audio_for_speech() on the synthetic speech"""
+    from audioAnalyzer import analyze_audio_for_speech
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = analyze_audio_for_speech(fixtures["audio"])
+        timings.append(time.perf_counter() - started)
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+
+    metrics = {"audio.analyze_seconds": round(min(timings), 4)}
+    return metrics, {"has_speech": result["has_speech"], "confidence": result["confidence"]}
+
+def bench_merge(sizes=(1000, 10000, 100000), repeat=3):
+    """Merger time per transcript size for each engine, plus output checks"""
+    from bench_transcript_merge import run_benchmark
+
+    report = run_benchmark(sizes, frames_per_segment=0.05, repeat=repeat, legacy=False)
+    metrics = {}
+    for size, case in report["results"].items():
+        metrics[f"merge.seconds_{size}"] = case["seconds"]
+        if "numpy_seconds" in case:
+            metrics[f"merge.numpy_seconds_{size}"] = case["numpy_seconds"]
+        if "stream_seconds" in case:
+            metrics[f"merge.stream_seconds_{size}"] = case["stream_seconds"]
+    identical = all(case.get("identical", True) for case in report["results"].values())
+    return metrics, {"identical": identical, "cases": report["results"]}
+
+def higher_is_better(metric):
+    """Throughput metrics improve upwards; times and real-time factors downwards"""
+    return metric.endswith(("_fps", "_per_second"))
+
+def compare(metrics, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare metrics with a baseline run
+
+    Args:
+        metrics: Metric name to value for this run
+        baseline: Metric name to value for the baseline
+        tolerance: Fraction a metric may get worse before it is a regression
+
+    Returns:
+        list: One comparison per metric present in both runs
+    """
+    comparisons = []
+    for metric, value in sorted(metrics.items()):
+        previous = baseline.get(metric)
+        if previous is None or value is None or not previous:
+            continue
+        change = (value - previous) / previous
+        worse = -change if higher_is_better(metric) else change
+        comparisons.append({
+            "metric": metric,
+            "baseline": previous,
+            "current": value,
+            "change": round(change, 4),
+            "regressed": worse > tolerance
+        })
+    return comparisons
+
+def load_runs(path):
+    """Read a history file (list of runs) or a single run record"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+def append_history(path, run):
+    """Append a run to the history file, creating it if needed"""
+    path = Path(path)
+    runs = load_runs(path) if path.exists() else []
+    runs.append(run)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(runs, f, indent=2)
+
+def git_commit():
+    try:
+        completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                                   capture_output=True, text=True, timeout=10)
+        return completed.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run_suite(fixtures, sections=SECTIONS, repeat=3, merge_sizes=(1000, 10000, 100000), ocr_backend="auto",
+              ocr_workers=1, whisper_model="tiny"):
+    """
+    Run the selected benchmark sections
+
+    Sections whose dependencies are missing are reported as skipped rather
+    than failing the run. Service output meant for stdout goes to stderr so
+    the report stays parseable.
+
+    Args:
+        fixtures: Paths from make_fixtures()
+        sections: Section names to run (see SECTIONS)
+        repeat: Runs per timed case where the section repeats
+        merge_sizes: Transcript sizes for the merge section
+        ocr_backend: OCR backend for the ocr section
+        ocr_workers: OCR worker processes
+        whisper_model: Whisper model for the transcribe section
+
+    Returns:
+        dict: Run record with flat metrics and per-section details
+    """
+    runners = {
+        "frames": lambda: bench_frames(fixtures, repeat),
+        "ocr": lambda: bench_ocr(fixtures, ocr_backend, ocr_workers),
+        "transcribe": lambda: bench_transcribe(fixtures, whisper_model),
+        "audio": lambda: bench_audio(fixtures, repeat),
+        "merge": lambda: bench_merge(merge_sizes, repeat)
+    }
+
+    metrics = {}
+    details = {}
+    for section in sections:
+        print(f"Running {section} benchmark...", file=sys.stderr)
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                section_metrics, section_details = runners[section]()
+        except ImportError as e:
+            details[section] = {"skipped": f"missing dependency: {e}"}
+            print(f"Skipping {section}: {e}", file=sys.stderr)
+            continue
+        except Exception as e:
+            details[section] = {"error": str(e)}
+            print(f"{section} benchmark failed: {e}", file=sys.stderr)
+            continue
+        metrics.update(section_metrics)
+        details[section] = {**section_details, "seconds": round(time.perf_counter() - started, 2)}
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count()
+        },
+        "metrics": metrics,
+        "sections": details
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks for the Python media services")
+    parser.add_argument("--sections", nargs="+", choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument("--fixtures", help="Folder to generate fixtures into and reuse (default: temporary)")
+    parser.add_argument("--video-seconds", type=int, default=60)
+    parser.add_argument("--audio-seconds", type=int, default=60)
+    parser.add_argument("--images", type=int, default=12, help="Slides for the OCR benchmark")
+    parser.add_argument("--merge-sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ocr-backend", default="auto")
+    parser.add_argument("--ocr-workers", type=int, default=1)
+    parser.add_argument("--whisper-model", default="tiny")
+    parser.add_argument("--history", default=str(DEFAULT_HISTORY), help="Run history JSON to append to")
+    parser.add_argument("--no-history", action="store_true")
+    parser.add_argument("--baseline", help="Run record or history file (its latest run) to compare against")
+    parser.add_argument("--save-baseline", help="Also write this run as a baseline file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Fraction a metric may get worse before it counts as a regression")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        fixtures_dir = args.fixtures or stack.enter_context(tempfile.TemporaryDirectory())
+        fixtures = make_fixtures(fixtures_dir, args.video_seconds, args.audio_seconds, args.images)
+        run = run_suite(fixtures, args.sections, args.repeat, args.merge_sizes, args.ocr_backend,
+                        args.ocr_workers, args.whisper_model)
+
+    run["config"] = {
+        "sections": args.sections,
+        "video_seconds": args.video_seconds,
+        "audio_seconds": args.audio_seconds,
+        "images": args.images,
+        "merge_sizes": args.merge_sizes,
+        "ocr_backend": args.ocr_backend,
+        "whisper_model": args.whisper_model
+    }
+
+    regressions = []
+    if args.baseline:
+        baseline = load_runs(args.baseline)[-1]
+        run["comparison"] = {
+            "baseline": {"timestamp": baseline.get("timestamp"), "commit": baseline.get("commit")},
+            "tolerance": args.tolerance,
+            "metrics": compare(run["metrics"], baseline.get("metrics", {}), args.tolerance)
+        }
+        regressions = [item for item in run["comparison"]["metrics"] if item["regressed"]]
+        for item in regressions:
+            print(f"Regression: {item['metric']} {item['baseline']} -> {item['current']} "
+                  f"({item['change']:+.1%})", file=sys.stderr)
+
+    if not args.no_history:
+        append_history(args.history, run)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+
+    print(json.dumps(run, indent=2))
+    merge_ok = run["sections"].get("merge", {}).get("identical", True)
+    if regressions or not merge_ok:
+        sys.exit(1)
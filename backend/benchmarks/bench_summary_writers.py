@@ -0,0 +1,215 @@
+"""
+Summary Writer Benchmark
+Times the streaming Markdown/JSON/NDJSON writers against building the whole
+document in memory first, on a large synthetic timeline, and reports the
+extra peak memory each one needs on top of the timeline itself
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services"))
+
+from equation_transcript_merger import (
+    format_timestamp, generate_json_summary, open_output, write_json_summary, write_markdown_summary,
+    write_timeline_json, write_timeline_ndjson
+)
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    # resource is Unix-only; peak RSS is left out on Windows
+    RESOURCE_AVAILABLE = False
+
+def legacy_markdown_summary(merged_data, include_timestamps=True):
+    """Previous markdown summary: one string grown entry by entry"""
+    if not merged_data.get("success"):
+        return "# Error\n\nFailed to generate summary."
+
+    timeline = merged_data.get("timeline", [])
+
+    markdown = "# Video Summary with Equations\n\n"
+    markdown += f"**Total Entries:** {len(timeline)}\n\n"
+    markdown += "---\n\n"
+
+    for item in timeline:
+        if include_timestamps:
+            markdown += f"## 🕒 {item['formatted_time']}\n\n"
+
+        if item.get("equation"):
+            markdown += f"**Equation:** `{item['equation']}`\n\n"
+            if item.get("speech"):
+                markdown += f"**Context:** {item['speech']}\n\n"
+        else:
+            markdown += f"{item.get('speech', '')}\n\n"
+
+        markdown += "---\n\n"
+
+    return markdown
+
+def make_timeline(entries, seed=0):
+    """Merged result with a mix of equation and speech entries, about one every few seconds"""
+    rng = random.Random(seed)
+    timeline = []
+    timestamp = 0.0
+    for index in range(entries):
+        timestamp += rng.uniform(0.5, 6.0)
+        speech = " ".join(f"word{rng.randrange(5000)}" for _ in range(rng.randint(5, 30)))
+        if rng.random() < 0.3:
+            timeline.append({
+                "timestamp": round(timestamp, 2),
+                "formatted_time": format_timestamp(timestamp),
+                "type": "equation",
+                "equation": f"\\frac{{x_{{{index}}}}}{{y}} + \\sum_{{i=0}}^{{{index % 50}}} a_i",
+                "method": "pix2tex",
+                "confidence": "high",
+                "speech": speech if rng.random() > 0.2 else "",
+                "frame": index
+            })
+        else:
+            timeline.append({
+                "timestamp": round(timestamp, 2),
+                "formatted_time": format_timestamp(timestamp),
+                "type": "speech",
+                "speech": speech,
+                "equation": None
+            })
+    return {"success": True, "total_entries": len(timeline), "timeline": timeline}
+
+def _write_text(path, text):
+    with open_output(path) as output:
+        output.write(text)
+
+def _with_output(path, writer, data):
+    with open_output(path) as output:
+        writer(data, output)
+
+# Each case writes the timeline to a path; "legacy" cases build the document first
+CASES = {
+    "markdown_legacy": lambda merged, path: _write_text(path, legacy_markdown_summary(merged)),
+    "markdown_stream": lambda merged, path: _with_output(path, write_markdown_summary, merged),
+    "json_legacy": lambda merged, path: _write_text(path, json.dumps(merged, indent=2)),
+    "json_stream": lambda merged, path: _with_output(path, write_timeline_json, merged),
+    "ndjson_stream": lambda merged, path: _with_output(path, write_timeline_ndjson, merged["timeline"]),
+    "summary_legacy": lambda merged, path: _write_text(path, json.dumps(generate_json_summary(merged), indent=2)),
+    "summary_stream": lambda merged, path: _with_output(path, write_json_summary, merged),
+    "markdown_stream_gzip": lambda merged, path: _with_output(path + ".gz", write_markdown_summary, merged),
+    "json_stream_gzip": lambda merged, path: _with_output(path + ".gz", write_timeline_json, merged)
+}
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_case(case, entries, seed=0):
+    """
+    Run one writer case in this process
+
+    The timeline is built first; peak RSS growth and time are measured on an
+    untraced run, then traced Python allocations on a second run.
+
+    Returns:
+        dict: Seconds, output size, extra peak RSS (MB) and traced peak (MB)
+    """
+    merged = make_timeline(entries, seed)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "summary")
+        rss_before = _peak_rss_mb() if RESOURCE_AVAILABLE else None
+
+        started = time.perf_counter()
+        CASES[case](merged, path)
+        seconds = time.perf_counter() - started
+
+        rss_after = _peak_rss_mb() if RESOURCE_AVAILABLE else None
+        written = path + ".gz" if case.endswith("_gzip") else path
+        size = os.path.getsize(written)
+
+        tracemalloc.start()
+        CASES[case](merged, path)
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "seconds": round(seconds, 4),
+        "bytes": size,
+        "peak_rss_growth_mb": round(rss_after - rss_before, 1) if RESOURCE_AVAILABLE else None,
+        "traced_peak_mb": round(traced_peak / (1024 * 1024), 2)
+    }
+
+def check_outputs(entries=2000, seed=0):
+    """Check each streaming writer reproduces the in-memory output"""
+    merged = make_timeline(entries, seed)
+    with tempfile.TemporaryDirectory() as folder:
+        results = {}
+        for case in ("markdown_stream", "json_stream", "ndjson_stream", "summary_stream", "markdown_stream_gzip"):
+            path = os.path.join(folder, case)
+            CASES[case](merged, path)
+            if case.endswith("_gzip"):
+                with gzip.open(path + ".gz", "rt", encoding="utf-8") as f:
+                    text = f.read()
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+
+            if case.startswith("markdown"):
+                results[case] = text == legacy_markdown_summary(merged)
+            elif case == "json_stream":
+                results[case] = json.loads(text) == merged
+            elif case == "ndjson_stream":
+                results[case] = [json.loads(line) for line in text.splitlines()] == merged["timeline"]
+            else:
+                results[case] = json.loads(text) == generate_json_summary(merged)
+    return results
+
+def run_benchmark(entries=200000, cases=None, seed=0):
+    """
+    Run every writer case in a fresh process so peak memory is its own
+
+    Args:
+        entries: Timeline entries to write
+        cases: Case names (None = all of CASES)
+        seed: Timeline seed
+
+    Returns:
+        dict: Per-case results and the output checks
+    """
+    results = {}
+    for case in cases or CASES:
+        completed = subprocess.run(
+            [sys.executable, __file__, "--case", case, "--entries", str(entries), "--seed", str(seed)],
+            capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            results[case] = {"error": completed.stderr.strip()[-2000:]}
+        else:
+            results[case] = json.loads(completed.stdout)
+        print(f"{case}: {results[case]}", file=sys.stderr)
+
+    return {"entries": entries, "results": results, "identical": check_outputs(seed=seed)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the streaming summary writers")
+    parser.add_argument("--entries", type=int, default=200000)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--case", choices=list(CASES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.entries, args.seed)))
+        sys.exit(0)
+
+    report = run_benchmark(args.entries, args.cases, args.seed)
+    print(json.dumps(report, indent=2))
+    if not all(report["identical"].values()):
+        sys.exit(1)
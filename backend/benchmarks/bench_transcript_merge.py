@@ -0,0 +1,200 @@
+"""
+Transcript Merge Benchmark
+Times merge_equations_with_transcript() against the previous linear-scan
+implementation, and the NumPy and streaming mergers against it, on synthetic
+lectures and checks they all give identical output
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services"))
+
+from equation_transcript_merger import (
+    NUMPY_AVAILABLE, StreamingMerger, format_timestamp, find_matching_transcript, merge_equations_with_transcript
+)
+
+def legacy_merge(equations_data, transcript_data, time_window=10):
+    """Previous merge: linear transcript scan per equation and per segment"""
+    merged_timeline = []
+    for eq_item in equations_data:
+        if not eq_item.get("success"):
+            continue
+        timestamp = eq_item.get("timestamp", 0)
+        equations = eq_item.get("equations", [])
+        if not equations:
+            continue
+        matching_speech = find_matching_transcript(timestamp, transcript_data, time_window)
+        for eq in equations:
+            merged_timeline.append({
+                "timestamp": timestamp,
+                "formatted_time": format_timestamp(timestamp),
+                "type": "equation",
+                "equation": eq.get("latex") or eq.get("text", ""),
+                "method": eq.get("method", "unknown"),
+                "confidence": eq.get("confidence", "unknown"),
+                "speech": matching_speech,
+                "frame": eq_item.get("frame_number")
+            })
+
+    if isinstance(transcript_data, list):
+        for segment in transcript_data:
+            timestamp = segment.get("start", segment.get("timestamp", 0))
+            text = segment.get("text", "")
+            has_equation = any(abs(item["timestamp"] - timestamp) < 1 for item in merged_timeline)
+            if not has_equation and text.strip():
+                merged_timeline.append({
+                    "timestamp": timestamp,
+                    "formatted_time": format_timestamp(timestamp),
+                    "type": "speech",
+                    "speech": text.strip(),
+                    "equation": None
+                })
+
+    merged_timeline.sort(key=lambda x: x["timestamp"])
+    return {"success": True, "total_entries": len(merged_timeline), "timeline": merged_timeline}
+
+def make_transcript(segments, seed=0):
+    """
+    Whisper-style segments with irregular lengths, some gaps and overlaps,
+    some without an end time, and a few out of order
+    """
+    rng = random.Random(seed)
+    transcript = []
+    start = 0.0
+    for index in range(segments):
+        length = rng.uniform(0.5, 8.0)
+        segment = {"start": round(start, 2), "text": f" segment {index} " if rng.random() > 0.05 else "  "}
+        if rng.random() > 0.1:
+            segment["end"] = round(start + length, 2)
+        transcript.append(segment)
+        start += length * rng.uniform(0.3, 1.2)
+    for _ in range(segments // 100):
+        a, b = rng.randrange(segments), rng.randrange(segments)
+        transcript[a], transcript[b] = transcript[b], transcript[a]
+    return transcript
+
+def make_equations(frames, duration, seed=0):
+    """OCR results for frames spread over the lecture, some failed or empty"""
+    rng = random.Random(seed + 1)
+    results = []
+    for frame in range(frames):
+        timestamp = rng.choice([round(rng.uniform(0, duration), 2), int(rng.uniform(0, duration))])
+        found = [{"latex": f"x_{{{frame}}}^{{{n}}}", "method": "pix2tex", "confidence": "high"}
+                 for n in range(rng.randint(0, 3))]
+        results.append({
+            "success": bool(found) and rng.random() > 0.05,
+            "timestamp": timestamp,
+            "frame_number": frame,
+            "equations": found
+        })
+    return results
+
+def stream_merge(equations, transcript, time_window=10):
+    """
+    Feed both sources to a StreamingMerger interleaved by time, as producers
+    working through the lecture would
+
+    Returns:
+        dict: Timeline in the batch result format, plus the merger stats
+    """
+    events = sorted(
+        [(item.get("timestamp", 0), 0, index) for index, item in enumerate(equations)] +
+        [(segment.get("start", 0), 1, index) for index, segment in enumerate(transcript)]
+    )
+    merger = StreamingMerger(time_window)
+    timeline = []
+    for _, kind, index in events:
+        timeline += merger.add_equation(equations[index]) if kind == 0 else merger.add_segment(transcript[index])
+    timeline += merger.finish()
+    return {"success": True, "total_entries": len(timeline), "timeline": timeline, "stats": merger.stats()}
+
+def time_call(function, *args, repeat=1):
+    """Fastest of repeat runs, in seconds, plus the last result"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def run_benchmark(sizes=(1000, 10000), frames_per_segment=0.05, time_window=10, repeat=3, legacy=True,
+                  numpy_engine=NUMPY_AVAILABLE, streaming=True):
+    """
+    Time the merger on synthetic lectures of each size
+
+    Args:
+        sizes: Transcript lengths in segments
+        frames_per_segment: OCR'd frames per transcript segment
+        time_window: Matching window passed to the merger
+        repeat: Runs per case; the fastest is reported
+        legacy: Also time the previous implementation and compare outputs
+        numpy_engine: Also time the NumPy engine and compare outputs
+        streaming: Also time the streaming merger on time-ordered copies of
+            the inputs, compare with the batch merge of the same copies and
+            report its peak buffered items
+
+    Returns:
+        dict: Per-size timings and whether the outputs match
+    """
+    results = {}
+    for size in sizes:
+        transcript = make_transcript(size, seed=size)
+        duration = max(segment.get("end", segment["start"]) for segment in transcript)
+        equations = make_equations(max(1, int(size * frames_per_segment)), duration, seed=size)
+
+        seconds, merged = time_call(merge_equations_with_transcript, equations, transcript, time_window,
+                                    repeat=repeat)
+        case = {
+            "segments": size,
+            "frames": len(equations),
+            "entries": merged["total_entries"],
+            "seconds": round(seconds, 4)
+        }
+        if legacy:
+            legacy_seconds, expected = time_call(legacy_merge, equations, transcript, time_window)
+            case["legacy_seconds"] = round(legacy_seconds, 4)
+            case["speedup"] = round(legacy_seconds / seconds, 1) if seconds > 0 else None
+            case["identical"] = merged == expected
+        if numpy_engine:
+            numpy_seconds, columnar = time_call(merge_equations_with_transcript, equations, transcript, time_window,
+                                                "numpy", repeat=repeat)
+            case["numpy_seconds"] = round(numpy_seconds, 4)
+            case["numpy_speedup"] = round(seconds / numpy_seconds, 1) if numpy_seconds > 0 else None
+            case["identical"] = case.get("identical", True) and columnar == merged
+        if streaming:
+            # The streaming merger expects each source in time order
+            ordered_transcript = sorted(transcript, key=lambda segment: segment["start"])
+            ordered_equations = sorted(equations, key=lambda item: item["timestamp"])
+            stream_seconds, streamed = time_call(stream_merge, ordered_equations, ordered_transcript, time_window,
+                                                 repeat=repeat)
+            stats = streamed.pop("stats")
+            case["stream_seconds"] = round(stream_seconds, 4)
+            case["stream_max_buffered"] = stats["max_buffered"]
+            case["identical"] = case.get("identical", True) and streamed == merge_equations_with_transcript(
+                ordered_equations, ordered_transcript, time_window)
+        results[str(size)] = case
+        print(f"{size} segments: {case}", file=sys.stderr)
+
+    return {"time_window": time_window, "results": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark equation/transcript merging")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Transcript lengths in segments")
+    parser.add_argument("--frames-per-segment", type=float, default=0.05)
+    parser.add_argument("--time-window", type=float, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-legacy", action="store_true", help="Skip the slow previous implementation")
+    parser.add_argument("--no-numpy", action="store_true", help="Skip the NumPy engine")
+    parser.add_argument("--no-stream", action="store_true", help="Skip the streaming merger")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.sizes, args.frames_per_segment, args.time_window, args.repeat,
+                           not args.no_legacy, NUMPY_AVAILABLE and not args.no_numpy, not args.no_stream)
+    print(json.dumps(report, indent=2))
+    if not all(case.get("identical", True) for case in report["results"].values()):
+        sys.exit(1)
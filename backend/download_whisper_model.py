@@ -1,41 +1,54 @@
 #!/usr/bin/env python3
 """
-Pre-download Whisper model before first use
+Pre-download the CTranslate2 Whisper model used by the transcription service
 Run this script to download the model in advance
 """
 import sys
-import os
 from pathlib import Path
-import whisper
+from faster_whisper.utils import available_models, download_model as fetch_model
 
-# Model cache directory
+sys.path.insert(0, str(Path(__file__).parent / "services"))
+from whisper_profiles import PROFILES, DEFAULT_PROFILE, resolve_profile
+
+# Model cache directory (same download_root as whisper_service_simple.py)
 MODEL_DIR = Path(__file__).parent / "services" / "whisper_models"
 MODEL_DIR.mkdir(exist_ok=True)
 
-def download_model(model_name="large"):
-    """Download Whisper model with progress indication"""
+def model_size_mb(model_path):
+    """Total size of the files in a downloaded model directory"""
+    return sum(f.stat().st_size for f in Path(model_path).rglob("*") if f.is_file()) / (1024 * 1024)
+
+def download_model(model_name="base"):
+    """Download faster-whisper (CTranslate2) model with progress indication"""
     
     print("=" * 70)
     print(f"WHISPER MODEL DOWNLOADER")
     print("=" * 70)
     print(f"\nModel: {model_name}")
     print(f"Target directory: {MODEL_DIR}")
+    print("\nProfiles:")
+    for name, profile in PROFILES.items():
+        default = "  ⭐ DEFAULT" if name == DEFAULT_PROFILE else ""
+        print(f"  - {name:<9} {profile['model']:<7} ({profile['compute_type']}, beam {profile['beam_size']}){default}")
     print("\nModel sizes:")
     print("  - tiny:   ~75 MB   (fastest, lowest accuracy)")
     print("  - base:   ~150 MB  (fast, basic accuracy)")
     print("  - small:  ~500 MB  (good speed, decent accuracy)")
     print("  - medium: ~1.5 GB  (slower, good accuracy)")
-    print("  - large:  ~3 GB    (slowest, best accuracy) ⭐ RECOMMENDED")
+    print("  - large:  ~3 GB    (slowest, best accuracy)")
     print("\n" + "=" * 70)
     
     # Check if model already exists
-    existing_models = list(MODEL_DIR.glob(f"{model_name}*.pt"))
-    if existing_models:
-        model_file = existing_models[0]
-        size_mb = model_file.stat().st_size / (1024 * 1024)
+    try:
+        existing_path = fetch_model(model_name, local_files_only=True, cache_dir=str(MODEL_DIR))
+    except Exception:
+        existing_path = None
+
+    if existing_path:
+        size_mb = model_size_mb(existing_path)
         size_gb = size_mb / 1024
         
-        print(f"\n✓ Model already exists: {model_file.name}")
+        print(f"\n✓ Model already exists: {existing_path}")
         print(f"  Size: {size_gb:.2f} GB ({size_mb:.1f} MB)")
         
         response = input("\nDo you want to re-download? (y/N): ").strip().lower()
@@ -50,32 +63,21 @@ def download_model(model_name="large"):
     print("Please be patient...\n")
     
     try:
-        # Set cache directory
-        os.environ['WHISPER_CACHE_DIR'] = str(MODEL_DIR)
-        
         # Download model (this will show progress bar)
-        print(f"Loading model '{model_name}'...")
-        model = whisper.load_model(model_name, download_root=str(MODEL_DIR))
+        print(f"Fetching model '{model_name}'...")
+        model_path = fetch_model(model_name, cache_dir=str(MODEL_DIR))
         
         print("\n" + "=" * 70)
         print("✅ MODEL DOWNLOADED SUCCESSFULLY!")
         print("=" * 70)
         
-        # Show model details
-        print(f"\nModel Details:")
-        print(f"  Device: {model.device}")
-        print(f"  Type: {type(model).__name__}")
-        
-        # Show downloaded file
-        downloaded_files = list(MODEL_DIR.glob(f"{model_name}*.pt"))
-        if downloaded_files:
-            for file in downloaded_files:
-                size_mb = file.stat().st_size / (1024 * 1024)
-                size_gb = size_mb / 1024
-                print(f"\nDownloaded file:")
-                print(f"  Name: {file.name}")
-                print(f"  Size: {size_gb:.2f} GB ({size_mb:.1f} MB)")
-                print(f"  Location: {file}")
+        # Show downloaded model
+        size_mb = model_size_mb(model_path)
+        size_gb = size_mb / 1024
+        print(f"\nDownloaded model:")
+        print(f"  Name: {model_name}")
+        print(f"  Size: {size_gb:.2f} GB ({size_mb:.1f} MB)")
+        print(f"  Location: {model_path}")
         
         print("\n" + "=" * 70)
         print("🎉 READY TO USE!")
@@ -102,24 +104,32 @@ def download_model(model_name="large"):
         print("  1. Check your internet connection")
         print("  2. Ensure you have enough disk space (~5 GB free)")
         print("  3. Try again later if server is busy")
-        print("  4. Try a smaller model: python download_whisper_model.py medium")
+        print("  4. Try a smaller profile: python download_whisper_model.py fast")
         return False
 
 def main():
     """Main function"""
     
-    # Get model name from command line or use default
-    model_name = "large"
-    if len(sys.argv) > 1:
-        model_name = sys.argv[1].lower()
-        
-        valid_models = ["tiny", "base", "small", "medium", "large"]
-        if model_name not in valid_models:
-            print(f"❌ Invalid model name: {model_name}")
-            print(f"Valid options: {', '.join(valid_models)}")
-            print(f"\nUsage: python download_whisper_model.py [model_name]")
-            print(f"Example: python download_whisper_model.py large")
+    # Get profile or model name from command line, or the profile the service
+    # would use (WHISPER_PROFILE, else the default)
+    name = sys.argv[1].lower() if len(sys.argv) > 1 else None
+    
+    if name is None or name in PROFILES:
+        # Resolved like whisper_service_simple.py does, so WHISPER_MODEL applies too
+        try:
+            model_name = resolve_profile(name)["model"]
+        except ValueError as e:
+            print(f"❌ {e}")
             sys.exit(1)
+    elif name in available_models():
+        model_name = name
+    else:
+        print(f"❌ Invalid profile or model name: {name}")
+        print(f"Valid profiles: {', '.join(PROFILES)}")
+        print(f"Valid models: {', '.join(available_models())}")
+        print(f"\nUsage: python download_whisper_model.py [profile_or_model_name]")
+        print(f"Example: python download_whisper_model.py accurate")
+        sys.exit(1)
     
     success = download_model(model_name)
     sys.exit(0 if success else 1)
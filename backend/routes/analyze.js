@@ -6,7 +6,7 @@ import { extractAudioWithYtDlp } from "../services/audioExtractorYtDlp.js";
 import { downloadVideo, downloadAudioAndVideo } from "../services/videoDownloader.js";
 import { transcribeWithLocalWhisper } from "../services/localWhisper.js";
 import { summarizeWithGemini } from "../services/geminiService.js";
-import { extractEquationsFromVideo, mergeEquationsWithTranscript } from "../services/equationExtractor.js";
+import { extractEquationsFromVideo, createStreamingMerger } from "../services/equationExtractor.js";
 import { detectSpeechInAudio } from "../services/audioAnalyzer.js";
 import { analyzeVideoVisuals } from "../services/visualAnalyzer.js";
 import { generateEnhancedSummary } from "../services/enhancedSummarizer.js";
@@ -99,6 +99,15 @@ router.post("/", async (req, res) => {
     let transcript = null;
     let transcriptionSkipped = false;
     let visualAnalyses = [];
+
+    // Transcript segments are merged as Whisper decodes them, so the timeline
+    // only waits for the equation results once OCR finishes
+    const merger = includeEquations ? createStreamingMerger({ timeWindow: 10 }) : null;
+    let segmentsStreamed = 0;
+    const onSegment = merger ? (segment) => {
+      merger.addSegment(segment);
+      segmentsStreamed++;
+    } : undefined;
     
     // Decide whether to transcribe based on speech detection
     if (audioAnalysis.success && audioAnalysis.has_speech === false && audioAnalysis.confidence > 0.6) {
@@ -113,14 +122,15 @@ router.post("/", async (req, res) => {
       sendProgress(sessionId, "🎙️ Speech detected - transcribing audio...", 40);
       
       try {
-        transcript = await transcribeWithLocalWhisper(audioFile, (progressMsg, percent) => {
+        const transcription = await transcribeWithLocalWhisper(audioFile, (progressMsg, percent) => {
           if (percent !== null) {
             const transcribePercent = 40 + Math.floor(percent * 0.25); // Map to 40-65%
             sendProgress(sessionId, `🎙️ ${progressMsg}`, transcribePercent);
           } else {
             sendProgress(sessionId, `🎙️ ${progressMsg}`, null);
           }
-        }, language);
+        }, language, { withSegments: true, onSegment });
+        transcript = transcription.transcript;
         
         sendProgress(sessionId, "✨ Transcription complete!", 65);
       } catch (transcribeError) {
@@ -135,14 +145,15 @@ router.post("/", async (req, res) => {
       sendProgress(sessionId, "🎙️ Transcribing audio...", 40);
       
       try {
-        transcript = await transcribeWithLocalWhisper(audioFile, (progressMsg, percent) => {
+        const transcription = await transcribeWithLocalWhisper(audioFile, (progressMsg, percent) => {
           if (percent !== null) {
             const transcribePercent = 40 + Math.floor(percent * 0.25);
             sendProgress(sessionId, `🎙️ ${progressMsg}`, transcribePercent);
           } else {
             sendProgress(sessionId, `🎙️ ${progressMsg}`, null);
           }
-        }, language);
+        }, language, { withSegments: true, onSegment });
+        transcript = transcription.transcript;
         
         sendProgress(sessionId, "✨ Transcription complete!", 65);
       } catch (transcribeError) {
@@ -152,9 +163,18 @@ router.post("/", async (req, res) => {
       }
     }
 
+    if (merger) {
+      // Plain-text transcripts carry no segments; merge estimated ones instead
+      if (segmentsStreamed === 0 && transcript) {
+        parseTranscriptForMerge(transcript).forEach(segment => merger.addSegment(segment));
+      }
+      merger.end('transcript');
+    }
+
     // Step 3: Extract equations (if requested)
     let equationData = null;
     let mergedTimeline = null;
+    let mergerEnded = false;
     
     if (includeEquations) {
       sendProgress(sessionId, "📐 Extracting equations from video frames...", 70);
@@ -182,16 +202,14 @@ router.post("/", async (req, res) => {
           if (equationData.success) {
             sendProgress(sessionId, `✅ Found ${equationData.equations_found} equations`, 80);
 
-            // Merge equations with transcript
+            // Merge equations with the transcript already streamed in
+            equationData.equations.forEach(result => merger.addEquation(result));
+            merger.end('equations');
+            mergerEnded = true;
+            const streamedTimeline = await merger.end();
+
             if (equationData.equations_found > 0) {
-              sendProgress(sessionId, "🔗 Merging equations with transcript...", 82);
-              
-              mergedTimeline = await mergeEquationsWithTranscript(
-                { results: equationData.equations },
-                parseTranscriptForMerge(transcript),
-                { timeWindow: 10 }
-              );
-              
+              mergedTimeline = streamedTimeline;
               sendProgress(sessionId, "✅ Timeline created!", 85);
             } else {
               sendProgress(sessionId, "ℹ️ No equations detected in video", 85);
@@ -205,6 +223,11 @@ router.post("/", async (req, res) => {
         console.error(`[${sessionId}] Equation extraction error:`, eqError);
         sendProgress(sessionId, `⚠️ Equation extraction failed: ${eqError.message}`, null);
         // Continue with summarization even if equation extraction fails
+      } finally {
+        if (!mergerEnded) {
+          // No equations to merge; stop the merger process
+          merger.end().catch(() => {});
+        }
       }
     }
 
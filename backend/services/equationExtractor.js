@@ -6,6 +6,185 @@ import fs from 'fs/promises';
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
 
+const OCR_SCRIPT = path.join(__dirname, 'equation_ocr.py');
+
+// Set EQUATION_OCR_SERVER=true to OCR through a persistent Python process with warm models
+const USE_OCR_SERVER = process.env.EQUATION_OCR_SERVER === 'true';
+const OCR_SERVER_WORKERS = process.env.EQUATION_OCR_SERVER_WORKERS || '1';
+const OCR_SERVER_QUEUE_SIZE = process.env.EQUATION_OCR_SERVER_QUEUE_SIZE || '32';
+
+// Long-lived OCR process shared by all requests (models stay loaded)
+let ocrServer = null;
+let nextOcrJobId = 1;
+
+/**
+ * Start (or reuse) the persistent OCR server process
+ */
+function getOcrServer() {
+  if (ocrServer) {
+    return ocrServer;
+  }
+
+  console.log('Starting persistent equation OCR server...');
+
+  const args = ['-3.10', OCR_SCRIPT, '--server',
+    '--server-workers', OCR_SERVER_WORKERS, '--queue-size', OCR_SERVER_QUEUE_SIZE, '--on-full', 'wait',
+    '--backend', process.env.EQUATION_OCR_BACKEND || 'auto'];
+  if (process.env.EQUATION_OCR_REGIONS === 'true') {
+    args.push('--regions');
+  }
+  if (process.env.EQUATION_OCR_CACHE === 'true' || process.env.EQUATION_OCR_CACHE_DB) {
+    args.push('--cache');
+    if (process.env.EQUATION_OCR_CACHE_DB) {
+      args.push('--cache-db', process.env.EQUATION_OCR_CACHE_DB);
+    }
+  }
+
+  const serverProcess = spawn('py', args);
+  const server = { process: serverProcess, jobs: new Map(), stdoutBuffer: '', errorBuffer: '' };
+
+  serverProcess.stdout.on('data', (data) => {
+    server.stdoutBuffer += data.toString();
+
+    // Only parse complete lines; keep any partial line for the next chunk
+    const lines = server.stdoutBuffer.split('\n');
+    server.stdoutBuffer = lines.pop();
+
+    lines.filter(line => line.trim()).forEach(line => {
+      let parsed;
+      try {
+        parsed = JSON.parse(line);
+      } catch (e) {
+        console.log(`[Equation OCR] ${line}`);
+        return;
+      }
+
+      if (parsed.id === undefined || parsed.id === null) {
+        console.log(`[Equation OCR] ${parsed.status}: ${parsed.message || ''}`);
+        return;
+      }
+
+      const job = server.jobs.get(parsed.id);
+      if (!job) {
+        return;
+      }
+      server.jobs.delete(parsed.id);
+      if (parsed.status === 'error') {
+        job.reject(new Error(parsed.message));
+      } else if (parsed.status === 'complete') {
+        job.resolve(parsed.result);
+      } else {
+        job.resolve(parsed);
+      }
+    });
+  });
+
+  serverProcess.stderr.on('data', (data) => {
+    server.errorBuffer = (server.errorBuffer + data.toString()).slice(-4000);
+  });
+
+  const failPendingJobs = (error) => {
+    if (ocrServer === server) {
+      ocrServer = null;
+    }
+    server.jobs.forEach(job => job.reject(error));
+    server.jobs.clear();
+  };
+
+  serverProcess.stdin.on('error', (err) => {
+    console.error(`[Equation OCR] Failed to write to server: ${err.message}`);
+  });
+
+  serverProcess.on('close', (code) => {
+    console.log(`Equation OCR server exited with code ${code}`);
+    failPendingJobs(new Error(`Equation OCR server exited with code ${code}. Error: ${server.errorBuffer}`));
+  });
+
+  serverProcess.on('error', (err) => {
+    failPendingJobs(new Error(`Failed to start Python process: ${err.message}`));
+  });
+
+  ocrServer = server;
+  return server;
+}
+
+/**
+ * Send one message to the OCR server and wait for the reply with the same id
+ */
+function sendToOcrServer(message) {
+  return new Promise((resolve, reject) => {
+    const server = getOcrServer();
+    const id = String(nextOcrJobId++);
+
+    server.jobs.set(id, { resolve, reject });
+    server.process.stdin.write(JSON.stringify({ id, ...message }) + '\n');
+  });
+}
+
+/**
+ * OCR one image on the persistent server
+ * @param {string|Buffer} image - Image file path, or encoded image bytes (JPEG, PNG, ...)
+ * @param {string} label - Name reported as "image" in the result when sending bytes
+ * @returns {Promise<Object>} - Per-image result, as returned by equation_ocr.py for a single image
+ */
+export function ocrImage(image, label = null) {
+  if (Buffer.isBuffer(image)) {
+    return sendToOcrServer({ image_base64: image.toString('base64'), label });
+  }
+  return sendToOcrServer({ image_path: path.resolve(image) });
+}
+
+/**
+ * Get queue depth, latency and cache statistics from the OCR server
+ */
+export function getOcrServerStats() {
+  return sendToOcrServer({ command: 'stats' });
+}
+
+/**
+ * Check that the OCR server's workers are up and their models loaded
+ */
+export function getOcrServerHealth() {
+  return sendToOcrServer({ command: 'health' });
+}
+
+/**
+ * Stop the persistent OCR server (e.g. on server shutdown)
+ */
+export function stopOcrServer() {
+  if (ocrServer) {
+    ocrServer.process.stdin.end(JSON.stringify({ command: 'shutdown' }) + '\n');
+    ocrServer = null;
+  }
+}
+
+/**
+ * OCR an image or a folder of *.jpg images on the persistent server
+ */
+async function extractEquationsWithServer(inputPath) {
+  const stat = await fs.stat(inputPath);
+  if (!stat.isDirectory()) {
+    return ocrImage(inputPath);
+  }
+
+  const images = (await fs.readdir(inputPath))
+    .filter(name => name.toLowerCase().endsWith('.jpg'))
+    .sort()
+    .map(name => path.join(inputPath, name));
+  if (images.length === 0) {
+    return { success: false, error: 'No images found matching *.jpg', results: [] };
+  }
+
+  const results = await Promise.all(images.map(image => ocrImage(image)));
+  return {
+    success: true,
+    folder: inputPath,
+    images_processed: images.length,
+    total_equations: results.reduce((sum, result) => sum + (result.success ? result.equations.length : 0), 0),
+    results
+  };
+}
+
 /**
  * Extract frames from video file
  */
@@ -13,12 +192,29 @@ export async function extractFrames(videoPath, outputFolder, options = {}) {
   const {
     interval = 5,
     method = 'interval',
-    maxFrames = 50
+    maxFrames = 50,
+    sceneDetector = 'absdiff', // absdiff, histogram, dhash or phash
+    sceneThreshold = null,
+    adaptiveThreshold = false,
+    workers = process.env.FRAME_EXTRACTOR_WORKERS // parallel decode shards (0 = one per core)
   } = options;
 
   return new Promise((resolve, reject) => {
     const pythonScript = path.join(__dirname, 'frame_extractor.py');
-    const args = ['-3.10', pythonScript, videoPath, outputFolder, interval.toString(), method];
+    const args = ['-3.10', pythonScript, videoPath, outputFolder, interval.toString(), method,
+      '--max-frames', maxFrames.toString()];
+    if (method === 'scene') {
+      args.push('--detector', sceneDetector);
+      if (sceneThreshold !== null) {
+        args.push('--threshold', sceneThreshold.toString());
+      }
+      if (adaptiveThreshold) {
+        args.push('--adaptive');
+      }
+    }
+    if (workers !== undefined) {
+      args.push('--workers', workers.toString());
+    }
 
     console.log(`Extracting frames from video: ${videoPath}`);
     console.log(`Output folder: ${outputFolder}`);
@@ -62,9 +258,21 @@ export async function extractFrames(videoPath, outputFolder, options = {}) {
  * Extract equations from images using OCR
  */
 export async function extractEquations(inputPath, options = {}) {
+  const {
+    workers = process.env.EQUATION_OCR_WORKERS, // OCR processes for folders, each loads its own model
+    backend = process.env.EQUATION_OCR_BACKEND || 'auto', // auto, latex (pix2tex) or text (tesseract)
+    useServer = USE_OCR_SERVER // reuse the persistent OCR server instead of spawning a process
+  } = options;
+
+  if (useServer) {
+    return extractEquationsWithServer(inputPath);
+  }
+
   return new Promise((resolve, reject) => {
-    const pythonScript = path.join(__dirname, 'equation_ocr.py');
-    const args = ['-3.10', pythonScript, inputPath];
+    const args = ['-3.10', OCR_SCRIPT, inputPath, backend];
+    if (workers) {
+      args.push('--workers', workers.toString());
+    }
 
     console.log(`Extracting equations from: ${inputPath}`);
 
@@ -106,7 +314,10 @@ export async function extractEquations(inputPath, options = {}) {
  * Merge equations with transcript
  */
 export async function mergeEquationsWithTranscript(equationsData, transcriptData, options = {}) {
-  const { timeWindow = 10 } = options;
+  const {
+    timeWindow = 10,
+    engine = process.env.TRANSCRIPT_MERGE_ENGINE || 'python' // python, or numpy for very long lectures
+  } = options;
 
   return new Promise((resolve, reject) => {
     const pythonScript = path.join(__dirname, 'equation_transcript_merger.py');
@@ -126,7 +337,7 @@ export async function mergeEquationsWithTranscript(equationsData, transcriptData
         ]);
       })
       .then(() => {
-        const args = ['-3.10', pythonScript, equationsFile, transcriptFile, 'json'];
+        const args = ['-3.10', pythonScript, equationsFile, transcriptFile, 'json', '--engine', engine];
 
         console.log('Merging equations with transcript...');
 
@@ -181,8 +392,209 @@ export async function mergeEquationsWithTranscript(equationsData, transcriptData
   });
 }
 
+/**
+ * Start an incremental merge that takes OCR results and transcript segments
+ * as they are produced and reports finished timeline entries along the way.
+ *
+ * Each source should be fed roughly in time order; call end(source) when one
+ * is done, then await end() once both are, which resolves with the summary
+ * and timeline when the merger exits. onEntry sees every entry in timeline order.
+ */
+export function createStreamingMerger(options = {}) {
+  const {
+    timeWindow = 10,
+    lateness = process.env.TRANSCRIPT_MERGE_LATENESS || 0, // seconds a result may lag its source (parallel OCR)
+    onEntry = null
+  } = options;
+
+  const pythonScript = path.join(__dirname, 'equation_transcript_merger.py');
+  const args = ['-3.10', pythonScript, '--stream',
+    '--time-window', timeWindow.toString(), '--lateness', lateness.toString()];
+  const pythonProcess = spawn('py', args);
+
+  const timeline = [];
+  let stdoutBuffer = '';
+  let errorData = '';
+  let summary = null;
+
+  const finished = new Promise((resolve, reject) => {
+    pythonProcess.stdout.on('data', (data) => {
+      stdoutBuffer += data.toString();
+
+      // Only parse complete lines; keep any partial line for the next chunk
+      const lines = stdoutBuffer.split('\n');
+      stdoutBuffer = lines.pop();
+
+      lines.filter(line => line.trim()).forEach(line => {
+        let parsed;
+        try {
+          parsed = JSON.parse(line);
+        } catch (e) {
+          console.log(`[Merger] ${line}`);
+          return;
+        }
+
+        if (parsed.done) {
+          summary = parsed;
+          return;
+        }
+        timeline.push(parsed);
+        if (onEntry) {
+          onEntry(parsed);
+        }
+      });
+    });
+
+    pythonProcess.stderr.on('data', (data) => {
+      errorData = (errorData + data.toString()).slice(-4000);
+      console.log('Merger:', data.toString());
+    });
+
+    pythonProcess.stdin.on('error', (err) => {
+      console.error(`[Merger] Failed to write to merger: ${err.message}`);
+    });
+
+    pythonProcess.on('close', (code) => {
+      if (code !== 0 || !summary) {
+        reject(new Error(`Streaming merge failed with code ${code}: ${errorData}`));
+        return;
+      }
+      resolve({ ...summary, timeline });
+    });
+
+    pythonProcess.on('error', (error) => {
+      reject(new Error(`Failed to start Python process: ${error.message}`));
+    });
+  });
+  // A failure is reported by end(); don't let it go unhandled before that
+  finished.catch(() => {});
+
+  const send = (event) => {
+    pythonProcess.stdin.write(JSON.stringify(event) + '\n');
+  };
+
+  return {
+    addEquation: (result) => send({ ...result, type: 'equation' }),
+    addSegment: (segment) => send({ ...segment, type: 'segment' }),
+    advance: (source, time) => send({ type: 'watermark', source, time }),
+    end: (source) => {
+      if (source) {
+        send({ type: 'end', source });
+        return;
+      }
+      pythonProcess.stdin.end();
+      return finished;
+    },
+    timeline
+  };
+}
+
+/**
+ * Run frame extraction and OCR in one Python process (frames stay in memory)
+ */
+export async function runEquationPipeline(videoPath, options = {}) {
+  const {
+    interval = 5,
+    method = 'interval',
+    maxFrames = 50,
+    sceneDetector = 'absdiff', // absdiff, histogram, dhash or phash
+    sceneThreshold = null,
+    adaptiveThreshold = false,
+    saveFramesTo = null, // folder to also write the frames to as JPEG
+    ocrProcesses = process.env.EQUATION_OCR_PROCESSES, // OCR worker processes fed by a shared-memory frame ring
+    cropRegions = process.env.EQUATION_OCR_REGIONS === 'true', // OCR detected equation regions only
+    ocrBackend = process.env.EQUATION_OCR_BACKEND || 'auto', // auto, latex (pix2tex) or text (tesseract)
+    presenceGate = process.env.EQUATION_OCR_GATE === 'true', // skip OCR on frames unlikely to hold equations
+    gateThreshold = process.env.EQUATION_OCR_GATE_THRESHOLD,
+    gateWeights = process.env.EQUATION_OCR_GATE_WEIGHTS, // weights JSON from equation_classifier.py train
+    ocrCache = process.env.EQUATION_OCR_CACHE === 'true', // reuse OCR results for near-duplicate frames
+    ocrCacheDb = process.env.EQUATION_OCR_CACHE_DB, // SQLite file that keeps cached results between runs
+    ocrCacheTolerance = process.env.EQUATION_OCR_CACHE_TOLERANCE // max perceptual hash distance (bits of 64)
+  } = options;
+
+  return new Promise((resolve, reject) => {
+    const pythonScript = path.join(__dirname, 'equation_pipeline.py');
+    const args = ['-3.10', pythonScript, videoPath, method, interval.toString(),
+      '--max-frames', maxFrames.toString(), '--ocr-backend', ocrBackend];
+    if (method === 'scene') {
+      args.push('--detector', sceneDetector);
+      if (sceneThreshold !== null) {
+        args.push('--threshold', sceneThreshold.toString());
+      }
+      if (adaptiveThreshold) {
+        args.push('--adaptive');
+      }
+    }
+    if (saveFramesTo) {
+      args.push('--save-frames', saveFramesTo);
+    }
+    if (ocrProcesses) {
+      args.push('--ocr-processes', ocrProcesses.toString());
+    }
+    if (cropRegions) {
+      args.push('--regions');
+    }
+    if (presenceGate || gateWeights) {
+      args.push('--gate');
+      if (gateThreshold) {
+        args.push('--gate-threshold', gateThreshold.toString());
+      }
+      if (gateWeights) {
+        args.push('--gate-weights', gateWeights);
+      }
+    }
+    if (ocrCache || ocrCacheDb) {
+      args.push('--cache');
+      if (ocrCacheDb) {
+        args.push('--cache-db', ocrCacheDb);
+      }
+      if (ocrCacheTolerance) {
+        args.push('--cache-tolerance', ocrCacheTolerance.toString());
+      }
+    }
+
+    console.log(`Running equation pipeline on: ${videoPath}`);
+    console.log(`Method: ${method}, Interval: ${interval}s`);
+
+    const pythonProcess = spawn('py', args);
+    let outputData = '';
+    let errorData = '';
+
+    pythonProcess.stdout.on('data', (data) => {
+      outputData += data.toString();
+    });
+
+    pythonProcess.stderr.on('data', (data) => {
+      errorData += data.toString();
+      console.log('Equation pipeline:', data.toString());
+    });
+
+    pythonProcess.on('close', (code) => {
+      if (code !== 0) {
+        console.error('Equation pipeline error:', errorData);
+        reject(new Error(`Equation pipeline failed: ${errorData}`));
+        return;
+      }
+
+      try {
+        const result = JSON.parse(outputData);
+        resolve(result);
+      } catch (error) {
+        reject(new Error(`Failed to parse equation pipeline result: ${error.message}`));
+      }
+    });
+
+    pythonProcess.on('error', (error) => {
+      reject(new Error(`Failed to start Python process: ${error.message}`));
+    });
+  });
+}
+
 /**
  * Complete pipeline: Extract frames and equations from video
+ *
+ * Frames are handed to OCR in memory; they are only written to outputFolder
+ * when cleanupFrames is false.
  */
 export async function extractEquationsFromVideo(videoPath, options = {}) {
   const {
@@ -195,51 +607,31 @@ export async function extractEquationsFromVideo(videoPath, options = {}) {
   try {
     console.log('Starting equation extraction pipeline...');
 
-    // Step 1: Extract frames
-    console.log('Step 1: Extracting frames...');
-    const frameResult = await extractFrames(videoPath, outputFolder, { interval, method });
-
-    if (!frameResult.success) {
-      throw new Error(`Frame extraction failed: ${frameResult.error}`);
-    }
-
-    console.log(`Extracted ${frameResult.frames_extracted} frames`);
-
-    // Step 2: Extract equations from frames
-    console.log('Step 2: Extracting equations from frames...');
-    const equationResult = await extractEquations(outputFolder);
+    const result = await runEquationPipeline(videoPath, {
+      ...options,
+      interval,
+      method,
+      saveFramesTo: cleanupFrames ? null : outputFolder
+    });
 
-    if (!equationResult.success) {
-      throw new Error(`Equation extraction failed: ${equationResult.error}`);
+    if (!result.success) {
+      throw new Error(`Equation extraction failed: ${result.error}`);
     }
 
-    console.log(`Found ${equationResult.total_equations} equations`);
+    console.log(`Extracted ${result.frames_extracted} frames, found ${result.equations_found} equations`);
 
-    // Combine results
-    const combinedResult = {
+    return {
       success: true,
       video_path: videoPath,
-      frames_extracted: frameResult.frames_extracted,
-      equations_found: equationResult.total_equations,
-      video_duration: frameResult.video_duration,
-      frames: frameResult.frames,
-      equations: equationResult.results,
-      output_folder: outputFolder
+      frames_extracted: result.frames_extracted,
+      equations_found: result.equations_found,
+      video_duration: result.video_duration,
+      frames: result.frames,
+      equations: result.equations,
+      output_folder: cleanupFrames ? null : outputFolder,
+      timings: result.timings
     };
 
-    // Step 3: Cleanup frames if requested
-    if (cleanupFrames) {
-      console.log('Cleaning up extracted frames...');
-      try {
-        await fs.rm(outputFolder, { recursive: true, force: true });
-        console.log('Frames cleaned up successfully');
-      } catch (err) {
-        console.error('Failed to cleanup frames:', err);
-      }
-    }
-
-    return combinedResult;
-
   } catch (error) {
     console.error('Equation extraction pipeline error:', error);
     throw error;
@@ -0,0 +1,351 @@
+"""
+Equation Presence Classifier
+Cheap per-frame score for whether a frame is likely to contain equations,
+used to skip LaTeX/text OCR on talking heads, blank slides and photos
+"""
+import argparse
+import json
+import math
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Frames are scored at this width (aspect kept)
+ANALYSIS_WIDTH = 640
+
+# Connected components this size (in analysis pixels) look like glyphs
+SYMBOL_MIN_AREA = 6
+SYMBOL_MAX_AREA = 2500
+SYMBOL_MIN_HEIGHT = 4
+SYMBOL_MAX_HEIGHT = 90
+
+FEATURES = ["edge_density", "ink_ratio", "symbol_density", "symbol_fraction", "symbol_height_cv"]
+
+# Hand-tuned logistic weights: sharp, glyph-like ink of consistent height
+# scores high; photo-like half-and-half binarisation, soft blobs and blank
+# frames score low
+DEFAULT_WEIGHTS = {
+    "bias": -4.0,
+    "weights": {
+        "edge_density": 60.0,
+        "ink_ratio": -10.0,
+        "symbol_density": 3.0,
+        "symbol_fraction": 4.0,
+        "symbol_height_cv": -3.0
+    }
+}
+
+DEFAULT_THRESHOLD = 0.5
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+def to_analysis_gray(image):
+    """Load (if given a path) and convert an image to a downscaled grayscale array"""
+    # OpenCV/NumPy are imported on use so equation_ocr can import this module cheaply
+    import cv2
+    import numpy as np
+
+    if isinstance(image, (str, Path)):
+        image = cv2.imread(str(image))
+        if image is None:
+            raise ValueError("Failed to read image")
+    elif not isinstance(image, np.ndarray):
+        # PIL image
+        image = np.asarray(image.convert("L"))
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    height, width = gray.shape
+    if width > ANALYSIS_WIDTH:
+        gray = cv2.resize(gray, (ANALYSIS_WIDTH, max(1, round(height * ANALYSIS_WIDTH / width))),
+                          interpolation=cv2.INTER_AREA)
+    return gray
+
+def frame_features(image):
+    """
+    Compute the classifier features for one frame
+
+    Args:
+        image: Path, BGR/grayscale NumPy array or PIL image
+
+    Returns:
+        dict: Feature name to value (see FEATURES)
+    """
+    import cv2
+    import numpy as np
+
+    gray = to_analysis_gray(image)
+    pixels = gray.size
+
+    edges = cv2.Canny(gray, 80, 160)
+    edge_density = float(np.count_nonzero(edges)) / pixels
+
+    # Ink is white in the binary image for both dark-on-light and light-on-dark slides
+    flags = cv2.THRESH_BINARY if gray.mean() < 128 else cv2.THRESH_BINARY_INV
+    _, binary = cv2.threshold(gray, 0, 255, flags + cv2.THRESH_OTSU)
+    ink = np.count_nonzero(binary)
+    ink_ratio = float(ink) / pixels
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    stats = stats[1:]
+    areas = stats[:, cv2.CC_STAT_AREA]
+    heights = stats[:, cv2.CC_STAT_HEIGHT]
+    symbol = (
+        (areas >= SYMBOL_MIN_AREA) & (areas <= SYMBOL_MAX_AREA) &
+        (heights >= SYMBOL_MIN_HEIGHT) & (heights <= SYMBOL_MAX_HEIGHT)
+    )
+    symbols = int(np.count_nonzero(symbol))
+
+    # Glyphs per 10k pixels, squashed so dense text does not dominate
+    symbol_density = math.log1p(symbols * 10000.0 / pixels)
+    symbol_fraction = float(areas[symbol].sum()) / ink if ink else 0.0
+    # Text lines have consistent glyph heights; clutter does not
+    symbol_heights = heights[symbol]
+    symbol_height_cv = float(symbol_heights.std() / symbol_heights.mean()) if symbols > 1 else 0.0
+
+    return {
+        "edge_density": edge_density,
+        "ink_ratio": ink_ratio,
+        "symbol_density": symbol_density,
+        "symbol_fraction": symbol_fraction,
+        "symbol_height_cv": symbol_height_cv
+    }
+
+def load_weights(path):
+    """Read classifier weights written by the train command"""
+    with open(path, "r", encoding="utf-8") as f:
+        weights = json.load(f)
+    unknown = set(weights.get("weights", {})) - set(FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown features in weights file: {', '.join(sorted(unknown))}")
+    return weights
+
+class EquationPresenceClassifier:
+    """
+    Score frames for equation presence with a logistic model over cheap features
+
+    Scores are in [0, 1]; frames scoring below threshold should skip OCR.
+    One classifier may be shared by several OCR threads, so its counters are
+    updated under a lock; it pickles by its settings only, with fresh counters.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, weights=None):
+        """
+        Args:
+            threshold: Minimum score for a frame to be OCR'd
+            weights: Dict with "bias" and per-feature "weights", or a path to
+                a weights JSON file (None = DEFAULT_WEIGHTS)
+        """
+        if isinstance(weights, (str, Path)):
+            weights = load_weights(weights)
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.scored = 0
+        self.passed = 0
+        self.seconds = 0.0
+
+    def __getstate__(self):
+        return {"threshold": self.threshold, "weights": self.weights}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def score_features(self, features):
+        """Logistic score for a feature dict"""
+        z = self.weights.get("bias", 0.0)
+        for name, weight in self.weights.get("weights", {}).items():
+            z += weight * features[name]
+        return 1.0 / (1.0 + math.exp(-max(-60.0, min(60.0, z))))
+
+    def score(self, image):
+        """Score one frame (path, NumPy array or PIL image)"""
+        started = time.perf_counter()
+        score = self.score_features(frame_features(image))
+        with self.lock:
+            self.seconds += time.perf_counter() - started
+        return score
+
+    def check(self, image):
+        """
+        Decide whether a frame should be OCR'd
+
+        Returns:
+            tuple: (passes, score)
+        """
+        score = self.score(image)
+        passes = score >= self.threshold
+        with self.lock:
+            self.scored += 1
+            self.passed += int(passes)
+        return passes, score
+
+    def stats(self):
+        """Return how many frames were scored and passed, and the time spent"""
+        with self.lock:
+            return {
+                "threshold": self.threshold,
+                "frames_scored": self.scored,
+                "frames_passed": self.passed,
+                "frames_skipped": self.scored - self.passed,
+                "ms_per_frame": round(self.seconds * 1000 / self.scored, 3) if self.scored else None
+            }
+
+def load_labelled_set(dataset):
+    """
+    Read a labelled sample set
+
+    Args:
+        dataset: Either a JSON file mapping image paths (relative to the file)
+            to true/false, or a folder with "equations" and "no_equations"
+            subfolders
+
+    Returns:
+        list: (image path, label) pairs
+    """
+    dataset = Path(dataset)
+    if dataset.is_dir():
+        samples = []
+        for folder, label in (("equations", True), ("no_equations", False)):
+            for path in sorted((dataset / folder).glob("*")):
+                if path.suffix.lower() in IMAGE_EXTENSIONS:
+                    samples.append((path, label))
+        return samples
+
+    with open(dataset, "r", encoding="utf-8") as f:
+        labels = json.load(f)
+    return [(dataset.parent / name, bool(label)) for name, label in sorted(labels.items())]
+
+def confusion(scores, labels, threshold):
+    """Precision/recall figures for one threshold"""
+    tp = sum(1 for s, l in zip(scores, labels) if s >= threshold and l)
+    fp = sum(1 for s, l in zip(scores, labels) if s >= threshold and not l)
+    fn = sum(1 for s, l in zip(scores, labels) if s < threshold and l)
+    tn = len(labels) - tp - fp - fn
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        "threshold": threshold,
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+        "skip_rate": round((tn + fn) / len(labels), 4) if labels else 0.0,
+        "true_positives": tp,
+        "false_positives": fp,
+        "false_negatives": fn,
+        "true_negatives": tn
+    }
+
+def evaluate(dataset, threshold=DEFAULT_THRESHOLD, weights=None):
+    """
+    Report precision/recall of the classifier on a labelled sample set
+
+    Args:
+        dataset: Labelled set (see load_labelled_set)
+        threshold: Threshold to report in detail
+        weights: Optional weights dict or path
+
+    Returns:
+        dict: Metrics at the threshold plus a sweep over thresholds
+    """
+    classifier = EquationPresenceClassifier(threshold, weights)
+    samples = load_labelled_set(dataset)
+    if not samples:
+        return {"success": False, "error": f"No labelled images found in {dataset}"}
+
+    scores = [classifier.score(path) for path, _ in samples]
+    labels = [label for _, label in samples]
+
+    return {
+        "success": True,
+        "samples": len(samples),
+        "positives": sum(labels),
+        "ms_per_frame": round(classifier.seconds * 1000 / len(samples), 3),
+        "metrics": confusion(scores, labels, threshold),
+        "sweep": [confusion(scores, labels, t / 20) for t in range(1, 20)]
+    }
+
+def train(dataset, output_path, epochs=2000, learning_rate=0.5, l2=0.001):
+    """
+    Fit logistic weights on a labelled sample set and write them as JSON
+
+    Features are standardised for training and the weights are folded back
+    to raw feature units, so the file plugs straight into the classifier.
+
+    Returns:
+        dict: Written weights and training-set metrics
+    """
+    import numpy as np
+
+    samples = load_labelled_set(dataset)
+    if not samples:
+        return {"success": False, "error": f"No labelled images found in {dataset}"}
+
+    x = np.array([[frame_features(path)[name] for name in FEATURES] for path, _ in samples])
+    y = np.array([1.0 if label else 0.0 for _, label in samples])
+
+    mean = x.mean(axis=0)
+    std = x.std(axis=0)
+    std[std == 0] = 1.0
+    z = (x - mean) / std
+
+    w = np.zeros(len(FEATURES))
+    b = 0.0
+    for _ in range(epochs):
+        p = 1.0 / (1.0 + np.exp(-(z @ w + b)))
+        w -= learning_rate * (z.T @ (p - y) / len(y) + l2 * w)
+        b -= learning_rate * float((p - y).mean())
+
+    raw_weights = w / std
+    weights = {
+        "bias": float(b - (raw_weights * mean).sum()),
+        "weights": {name: float(value) for name, value in zip(FEATURES, raw_weights)}
+    }
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(weights, f, indent=2)
+
+    classifier = EquationPresenceClassifier(DEFAULT_THRESHOLD, weights)
+    scores = [classifier.score_features(dict(zip(FEATURES, row))) for row in x]
+    return {
+        "success": True,
+        "samples": len(samples),
+        "weights_path": str(output_path),
+        "weights": weights,
+        "training_metrics": confusion(scores, list(y.astype(bool)), DEFAULT_THRESHOLD)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Equation presence classifier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    score_parser = subparsers.add_parser("score", help="Score images")
+    score_parser.add_argument("images", nargs="+")
+    score_parser.add_argument("--weights")
+    score_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    evaluate_parser = subparsers.add_parser("evaluate", help="Precision/recall on a labelled set")
+    evaluate_parser.add_argument("dataset", help="Labels JSON file or folder with equations/ and no_equations/")
+    evaluate_parser.add_argument("--weights")
+    evaluate_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    train_parser = subparsers.add_parser("train", help="Fit classifier weights on a labelled set")
+    train_parser.add_argument("dataset")
+    train_parser.add_argument("output", help="Weights JSON to write")
+
+    args = parser.parse_args()
+
+    if args.command == "score":
+        classifier = EquationPresenceClassifier(args.threshold, args.weights)
+        result = []
+        for image in args.images:
+            features = frame_features(image)
+            score = classifier.score_features(features)
+            result.append({"image": image, "score": round(score, 4),
+                           "has_equations": score >= args.threshold, "features": features})
+    elif args.command == "evaluate":
+        result = evaluate(args.dataset, args.threshold, args.weights)
+    else:
+        result = train(args.dataset, args.output)
+
+    print(json.dumps(result, indent=2))
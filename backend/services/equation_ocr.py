@@ -2,41 +2,358 @@
 Equation OCR Service
 Extracts mathematical equations from images and converts to LaTeX
 """
+import time
+_MODULE_STARTED = time.perf_counter()
+
 import os
 import sys
+import copy
 import json
+import base64
+import queue
+import argparse
+import importlib
+import importlib.util
+import socketserver
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from PIL import Image
 
-# Try to import pix2tex, fallback to basic OCR if not available
-try:
-    from pix2tex.cli import LatexOCR
-    PIX2TEX_AVAILABLE = True
-except ImportError:
-    PIX2TEX_AVAILABLE = False
+# Both import OpenCV/NumPy on first use, so startup and --help do not pay for them
+from equation_classifier import EquationPresenceClassifier, DEFAULT_THRESHOLD as GATE_THRESHOLD
+from ocr_cache import OCRResultCache, DEFAULT_TOLERANCE as CACHE_TOLERANCE, DEFAULT_MAX_ENTRIES, image_key
+
+# The OCR backends are only looked up here and imported on first use: pix2tex
+# pulls in torch, which would otherwise dominate startup even for requests
+# that never run LaTeX OCR
+PIX2TEX_AVAILABLE = importlib.util.find_spec("pix2tex") is not None
+if not PIX2TEX_AVAILABLE:
     print("Warning: pix2tex not installed. Install with: pip install pix2tex", file=sys.stderr)
 
 # Fallback to pytesseract for basic text detection
-try:
-    import pytesseract
-    PYTESSERACT_AVAILABLE = True
-except ImportError:
-    PYTESSERACT_AVAILABLE = False
+PYTESSERACT_AVAILABLE = importlib.util.find_spec("pytesseract") is not None
+if not PYTESSERACT_AVAILABLE:
     print("Warning: pytesseract not installed. Install with: pip install pytesseract", file=sys.stderr)
 
+# OCR backends selectable with the CLI mode: LaTeX OCR with text fallback,
+# LaTeX OCR only, or text OCR only
+OCR_BACKENDS = ("auto", "latex", "text")
+BACKEND_ALIASES = {"pix2tex": "latex", "tesseract": "text", "pytesseract": "text"}
+
+# Milliseconds spent importing this module, each backend and the LaTeX model
+STARTUP_TIMINGS = {"module_import_ms": round((time.perf_counter() - _MODULE_STARTED) * 1000, 1)}
+
+_backend_modules = {}
+
+def _import_backend(label, module_name):
+    """Import an OCR backend module once, recording how long it took (None if it fails)"""
+    if label not in _backend_modules:
+        started = time.perf_counter()
+        try:
+            _backend_modules[label] = importlib.import_module(module_name)
+        except Exception as e:
+            print(f"Failed to import {module_name}: {e}", file=sys.stderr)
+            _backend_modules[label] = None
+        STARTUP_TIMINGS[f"{label}_import_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return _backend_modules[label]
+
+def load_latex_model():
+    """Import pix2tex and build a LaTeX OCR model (None when unavailable)"""
+    if not PIX2TEX_AVAILABLE:
+        return None
+    pix2tex_cli = _import_backend("pix2tex", "pix2tex.cli")
+    if pix2tex_cli is None:
+        return None
+    
+    started = time.perf_counter()
+    try:
+        print("Initializing LaTeX OCR model...", file=sys.stderr)
+        model = pix2tex_cli.LatexOCR()
+        print("LaTeX OCR model loaded successfully", file=sys.stderr)
+    except Exception as e:
+        print(f"Failed to load LaTeX OCR model: {e}", file=sys.stderr)
+        model = None
+    STARTUP_TIMINGS["latex_model_init_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return model
+
+def resolve_backend(backend):
+    """Map a CLI mode or alias to one of OCR_BACKENDS"""
+    backend = BACKEND_ALIASES.get(backend, backend)
+    if backend not in OCR_BACKENDS:
+        raise ValueError(f"Unknown OCR backend: '{backend}'. Choose from: {', '.join(OCR_BACKENDS)}")
+    return backend
+
+def startup_report():
+    """Import and model load times recorded so far in this process"""
+    return dict(STARTUP_TIMINGS)
+
+def latex_equations(latex_model, img, failures=None):
+    """
+    Run LaTeX OCR on a PIL image and return the equations found
+    
+    Backend errors are logged and give no equations; the message is also
+    appended to failures when given, so the result is not cached as final.
+    """
+    if not latex_model:
+        return []
+    try:
+        latex_code = latex_model(img)
+        if latex_code and latex_code.strip():
+            print(f"Extracted LaTeX: {latex_code}", file=sys.stderr)
+            return [{
+                "latex": latex_code,
+                "method": "pix2tex",
+                "confidence": "high"
+            }]
+    except Exception as e:
+        print(f"LaTeX OCR failed: {e}", file=sys.stderr)
+        if failures is not None:
+            failures.append(f"LaTeX OCR failed: {e}")
+    return []
+
+def text_equations(img, failures=None):
+    """Run basic text OCR on a PIL image and return the text found (failures as in latex_equations)"""
+    pytesseract = _import_backend("pytesseract", "pytesseract") if PYTESSERACT_AVAILABLE else None
+    if pytesseract is None:
+        return []
+    try:
+        text = pytesseract.image_to_string(img)
+        if text and text.strip():
+            print(f"Extracted text: {text.strip()[:100]}", file=sys.stderr)
+            return [{
+                "text": text.strip(),
+                "method": "pytesseract",
+                "confidence": "medium"
+            }]
+    except Exception as e:
+        print(f"Text OCR failed: {e}", file=sys.stderr)
+        if failures is not None:
+            failures.append(f"Text OCR failed: {e}")
+    return []
+
+def region_equations(latex_model, img, regions, use_text=True, cache=None, cache_hits=None, failures=None):
+    """
+    OCR each region crop, tagging every equation with its bounding box
+    
+    Crops go through the model one call at a time: pix2tex's LatexOCR only
+    takes a single image (it picks a resize per image before decoding), so
+    there is no batch entry point to hand several crops to. Throughput comes
+    from running several frames at once instead (extract_parallel).
+    
+    Args:
+        latex_model: LatexOCR model (or None)
+        img: PIL image
+        regions: Boxes from find_regions()
+        use_text: Fall back to text OCR for crops without LaTeX
+        cache: OCRResultCache reused for near-identical crops (only with use_text)
+        cache_hits: List that gets one entry appended per crop served from the cache
+        failures: List that gets backend error messages appended; crops whose
+            OCR failed are not cached
+    
+    Returns:
+        tuple: (equations, regions that produced no LaTeX)
+    """
+    def ocr_crop(crop, crop_failures):
+        found = latex_equations(latex_model, crop, crop_failures)
+        if not found and use_text:
+            found = text_equations(crop, crop_failures)
+        return found
+    
+    equations = []
+    missing = []
+    for region in regions:
+        crop = crop_region(img, region)
+        crop_failures = []
+        if cache is not None and use_text:
+            namespace = cache_namespace("region", latex_model is not None)
+            key = image_key(crop)
+            found = cache.get(namespace, key)
+            if found is not None:
+                if cache_hits is not None:
+                    cache_hits.append(region)
+            else:
+                found = ocr_crop(crop, crop_failures)
+                if not crop_failures:
+                    cache.put(namespace, key, found)
+        else:
+            found = ocr_crop(crop, crop_failures)
+        if failures is not None:
+            failures.extend(crop_failures)
+        if not found:
+            missing.append(region)
+        for equation in found:
+            equation["bbox"] = region
+        equations.extend(found)
+    return equations, missing
+
+def ocr_result(label, equations, error=None, regions=None, presence_score=None):
+    """Build the per-image result returned by every extraction path"""
+    result = {
+        "image": label,
+        "success": bool(equations),
+        "equations": equations
+    }
+    if regions is not None:
+        result["regions"] = regions
+        # Frames without candidate regions never reach the OCR models
+        result["skipped"] = not regions
+    if presence_score is not None:
+        result["presence_score"] = round(presence_score, 4)
+        if error == GATE_ERROR:
+            result["skipped"] = True
+    if not equations:
+        result["error"] = error or "No equations detected"
+    return result
+
+def cache_namespace(kind, latex, text=PYTESSERACT_AVAILABLE):
+    """Cache namespace for a kind of entry and the OCR backends that produced it"""
+    return f"{kind}/{'pix2tex' if latex else 'no-pix2tex'}/{'tesseract' if text else 'no-tesseract'}"
+
+def cache_summary(results, cache):
+    """Count frame (and region) cache hits recorded on the results"""
+    looked_up = [result for result in results if "cache_hit" in result]
+    hits = sum(1 for result in looked_up if result["cache_hit"])
+    return {
+        "frame_hits": hits,
+        "frame_misses": len(looked_up) - hits,
+        "frame_hit_rate": round(hits / len(looked_up), 3) if looked_up else 0.0,
+        "region_hits": sum(result.get("region_cache_hits", 0) for result in looked_up),
+        "tolerance": cache.tolerance,
+        "db_path": cache.db_path
+    }
+
+def gate_summary(results, threshold):
+    """Count how many results the presence gate scored and skipped"""
+    scored = [result for result in results if "presence_score" in result]
+    skipped = sum(1 for result in scored if result.get("error") == GATE_ERROR)
+    return {
+        "threshold": threshold,
+        "frames_scored": len(scored),
+        "frames_passed": len(scored) - skipped,
+        "frames_skipped": skipped
+    }
+
+# Region OCR: glyphs are joined into lines with this (width, height) kernel,
+# boxes closer than the gap (as a fraction of frame width, height) are merged,
+# merged boxes smaller than the minimum size are dropped, crops get padding,
+# and boxes covering more than the area ratio of the frame are ignored
+REGION_DILATE_KERNEL = (15, 5)
+REGION_MERGE_GAP = (0.05, 0.005)
+REGION_MIN_SIZE = (50, 20)
+REGION_PADDING = 8
+REGION_MAX_AREA_RATIO = 0.9
+NO_REGIONS_ERROR = "No candidate equation regions"
+
+# Frames the presence classifier scores below its threshold skip OCR entirely
+GATE_ERROR = "Below equation presence threshold"
+
+# LaTeX OCR model and presence gate held by each OCR worker process
+_worker_model = None
+_worker_gate = None
+
+def _init_ocr_worker(gate=None, use_latex=True):
+    """Load the LaTeX OCR model once per worker process"""
+    global _worker_model, _worker_gate
+    _worker_gate = gate
+    _worker_model = load_latex_model() if use_latex else None
+
+def _latex_ocr_file(image_path, crop_regions=False):
+    """
+    Worker task: LaTeX OCR on one image file (or on its region crops)
+    
+    Returns:
+        dict: equations, error, regions (None when whole-frame), text_regions
+        still needing text OCR (None = the whole image), presence_score
+        (None without a gate) and ocr_failed (a backend call raised)
+    """
+    failures = []
+    try:
+        with Image.open(image_path) as img:
+            presence_score = None
+            if _worker_gate is not None:
+                passes, presence_score = _worker_gate.check(img)
+                if not passes:
+                    return {"equations": [], "error": GATE_ERROR, "regions": None, "text_regions": [],
+                            "presence_score": presence_score, "ocr_failed": False}
+            
+            if not crop_regions:
+                equations = latex_equations(_worker_model, img, failures)
+                return {"equations": equations, "error": None, "regions": None, "text_regions": None,
+                        "presence_score": presence_score, "ocr_failed": bool(failures)}
+            
+            regions = find_regions(img)
+            equations, missing = region_equations(_worker_model, img, regions, use_text=False, failures=failures)
+            return {"equations": equations, "error": None if regions else NO_REGIONS_ERROR,
+                    "regions": regions, "text_regions": missing, "presence_score": presence_score,
+                    "ocr_failed": bool(failures)}
+    except Exception as e:
+        return {"equations": [], "error": str(e), "regions": None, "text_regions": [], "presence_score": None,
+                "ocr_failed": True}
+
+def _text_ocr_file(image_path, regions=None):
+    """
+    Thread task: text OCR on one image file or on some of its regions
+    
+    Returns:
+        tuple: (equations, error, whether a backend call failed)
+    """
+    failures = []
+    try:
+        with Image.open(image_path) as img:
+            if regions is None:
+                return text_equations(img, failures), None, bool(failures)
+            equations = []
+            for region in regions:
+                for equation in text_equations(crop_region(img, region), failures):
+                    equation["bbox"] = region
+                    equations.append(equation)
+            return equations, None, bool(failures)
+    except Exception as e:
+        return [], str(e), True
+
 class EquationExtractor:
     """Extract mathematical equations from images"""
     
-    def __init__(self):
-        self.latex_model = None
-        if PIX2TEX_AVAILABLE:
-            try:
-                print("Initializing LaTeX OCR model...", file=sys.stderr)
-                self.latex_model = LatexOCR()
-                print("LaTeX OCR model loaded successfully", file=sys.stderr)
-            except Exception as e:
-                print(f"Failed to load LaTeX OCR model: {e}", file=sys.stderr)
-                self.latex_model = None
+    def __init__(self, load_model=True, crop_regions=False, gate=None, cache=None, backend="auto"):
+        """
+        Args:
+            load_model: Allow loading the LaTeX OCR model in this process; it
+                is loaded on first use, never at construction
+            crop_regions: OCR only detected equation regions instead of the
+                whole frame; frames without candidate regions are skipped
+            gate: EquationPresenceClassifier run before any OCR; frames
+                scoring below its threshold are skipped (None = OCR every frame)
+            cache: OCRResultCache; near-duplicate frames (and, in region mode,
+                region crops) reuse earlier results instead of being OCR'd
+            backend: "auto" (LaTeX OCR with text fallback), "latex" or "text"
+        """
+        self.crop_regions = crop_regions
+        self.gate = gate
+        self.cache = cache
+        self.backend = resolve_backend(backend)
+        self.use_latex = self.backend in ("auto", "latex") and PIX2TEX_AVAILABLE
+        self.use_text = self.backend in ("auto", "text") and PYTESSERACT_AVAILABLE
+        self.load_model = load_model
+        self._latex_model = None
+        self._model_requested = False
+    
+    @property
+    def latex_model(self):
+        """LaTeX OCR model, loaded on first use (None when disabled or unavailable)"""
+        if not self._model_requested:
+            self._model_requested = True
+            if self.use_latex and self.load_model:
+                self._latex_model = load_latex_model()
+        return self._latex_model
+    
+    def warm_up(self):
+        """Load the OCR backends now instead of on the first image"""
+        started = time.perf_counter()
+        self.latex_model
+        if self.use_text:
+            _import_backend("pytesseract", "pytesseract")
+        return time.perf_counter() - started
     
     def extract_from_image(self, image_path):
         """
@@ -50,62 +367,217 @@ class EquationExtractor:
         """
         try:
             img = Image.open(image_path)
-            
-            result = {
+        except Exception as e:
+            return {
                 "image": image_path,
-                "success": True,
+                "success": False,
+                "error": str(e),
                 "equations": []
             }
+        
+        return self._extract(img, image_path)
+    
+    def extract_from_array(self, frame, label=None):
+        """
+        Extract equations from a decoded frame without going through a file
+        
+        Args:
+            frame: BGR (OpenCV) or grayscale NumPy array
+            label: Name reported as "image" in the result (e.g. frame number)
+        
+        Returns:
+            dict: Extracted equation information
+        """
+        try:
+            # OpenCV frames are BGR; PIL expects RGB
+            img = Image.fromarray(frame[:, :, ::-1] if frame.ndim == 3 else frame)
+        except Exception as e:
+            return {
+                "image": label,
+                "success": False,
+                "error": str(e),
+                "equations": []
+            }
+        
+        return self._extract(img, label)
+    
+    def _frame_namespace(self):
+        # Built from the configured backends so a cache hit never loads the model
+        return cache_namespace("frame-regions" if self.crop_regions else "frame", self.use_latex, self.use_text)
+    
+    def _extract(self, img, label):
+        """Run LaTeX OCR, falling back to text OCR, on a PIL image"""
+        try:
+            if self.cache is not None:
+                namespace = self._frame_namespace()
+                key = image_key(img)
+                cached = self.cache.get(namespace, key)
+                if cached is not None:
+                    result = ocr_result(label, cached["equations"], cached["error"], cached["regions"])
+                    result["cache_hit"] = True
+                    return result
+                region_hits = []
             
-            # Try LaTeX OCR first (best for equations)
-            if self.latex_model:
-                try:
-                    latex_code = self.latex_model(img)
-                    if latex_code and latex_code.strip():
-                        result["equations"].append({
-                            "latex": latex_code,
-                            "method": "pix2tex",
-                            "confidence": "high"
-                        })
-                        print(f"Extracted LaTeX: {latex_code}", file=sys.stderr)
-                except Exception as e:
-                    print(f"LaTeX OCR failed: {e}", file=sys.stderr)
-            
-            # Fallback to basic text OCR
-            if not result["equations"] and PYTESSERACT_AVAILABLE:
-                try:
-                    text = pytesseract.image_to_string(img)
-                    if text and text.strip():
-                        result["equations"].append({
-                            "text": text.strip(),
-                            "method": "pytesseract",
-                            "confidence": "medium"
-                        })
-                        print(f"Extracted text: {text.strip()[:100]}", file=sys.stderr)
-                except Exception as e:
-                    print(f"Text OCR failed: {e}", file=sys.stderr)
+            presence_score = None
+            if self.gate is not None:
+                passes, presence_score = self.gate.check(img)
+                if not passes:
+                    return ocr_result(label, [], GATE_ERROR, presence_score=presence_score)
             
-            if not result["equations"]:
-                result["success"] = False
-                result["error"] = "No equations detected"
+            regions = None
+            error = None
+            failures = []
+            if self.crop_regions:
+                regions = find_regions(img)
+                if regions:
+                    equations, _ = region_equations(self.latex_model, img, regions, self.use_text, self.cache,
+                                                    region_hits if self.cache is not None else None, failures)
+                else:
+                    equations, error = [], NO_REGIONS_ERROR
+            else:
+                # Try LaTeX OCR first (best for equations)
+                equations = latex_equations(self.latex_model, img, failures)
+                
+                # Fallback to basic text OCR
+                if not equations and self.use_text:
+                    equations = text_equations(img, failures)
             
+            result = ocr_result(label, equations, error, regions, presence_score)
+            if self.cache is not None:
+                # A backend failure is not a final answer, so it is never cached
+                if not failures:
+                    self.cache.put(namespace, key, {"equations": equations, "error": error, "regions": regions})
+                result["cache_hit"] = False
+                if self.crop_regions:
+                    result["region_cache_hits"] = len(region_hits)
             return result
             
         except Exception as e:
             return {
-                "image": image_path,
+                "image": label,
                 "success": False,
                 "error": str(e),
                 "equations": []
             }
     
-    def extract_from_folder(self, folder_path, file_pattern="*.jpg"):
+    def extract_parallel(self, image_paths, workers, text_workers=None):
+        """
+        OCR many images with a process pool for LaTeX OCR and threads for tesseract
+        
+        Each worker process loads its own LatexOCR model once, so memory grows
+        with the worker count. Images without LaTeX go to the tesseract thread
+        pool as soon as their LaTeX OCR finishes.
+        
+        Args:
+            image_paths: Image file paths
+            workers: Number of LaTeX OCR processes
+            text_workers: Number of tesseract threads (default: same as workers)
+        
+        Returns:
+            list: One result per image, in input order
+        """
+        equations = [[] for _ in image_paths]
+        errors = [None] * len(image_paths)
+        regions = [None] * len(image_paths)
+        scores = [None] * len(image_paths)
+        cache_hits = [None] * len(image_paths)
+        failed = [False] * len(image_paths)
+        text_futures = {}
+        done = 0
+        
+        # Near-duplicate frames are answered from the cache, or share the OCR
+        # of an earlier frame in this batch, and never reach the workers
+        pending = list(range(len(image_paths)))
+        keys = {}
+        duplicates = {}
+        if self.cache is not None:
+            namespace = self._frame_namespace()
+            pending = []
+            for index, path in enumerate(image_paths):
+                try:
+                    with Image.open(path) as img:
+                        keys[index] = image_key(img)
+                except Exception as e:
+                    errors[index] = str(e)
+                    continue
+                cached = self.cache.get(namespace, keys[index])
+                cache_hits[index] = cached is not None
+                if cached is not None:
+                    equations[index], errors[index], regions[index] = cached["equations"], cached["error"], cached["regions"]
+                    continue
+                original = self.cache.closest(keys[index], [keys[other] for other in pending])
+                if original is None:
+                    pending.append(index)
+                else:
+                    duplicates[index] = next(other for other in pending if keys[other] == original)
+                    cache_hits[index] = True
+            print(f"OCR cache: {len(image_paths) - len(pending)}/{len(image_paths)} frames reused", file=sys.stderr)
+        
+        with ThreadPoolExecutor(max_workers=text_workers or workers) as text_pool:
+            # Region detection and the presence gate also run in the workers, even without pix2tex
+            if self.use_latex or self.crop_regions or self.gate is not None:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_ocr_worker,
+                                         initargs=(self.gate, self.use_latex)) as latex_pool:
+                    futures = {
+                        latex_pool.submit(_latex_ocr_file, image_paths[index], self.crop_regions): index
+                        for index in pending
+                    }
+                    for future in as_completed(futures):
+                        index = futures[future]
+                        found = future.result()
+                        equations[index], errors[index], regions[index] = found["equations"], found["error"], found["regions"]
+                        scores[index] = found["presence_score"]
+                        failed[index] = found["ocr_failed"]
+                        done += 1
+                        print(f"LaTeX OCR {done}/{len(pending)}: {Path(image_paths[index]).name}", file=sys.stderr)
+                        
+                        # None means the whole image still needs text OCR
+                        text_regions = found["text_regions"]
+                        needs_text = not equations[index] if text_regions is None else bool(text_regions)
+                        if needs_text and errors[index] is None and self.use_text:
+                            text_futures[index] = text_pool.submit(_text_ocr_file, image_paths[index], text_regions)
+            elif self.use_text:
+                text_futures = {index: text_pool.submit(_text_ocr_file, image_paths[index]) for index in pending}
+            
+            for index, future in text_futures.items():
+                found, error, text_failed = future.result()
+                equations[index] = equations[index] + found
+                errors[index] = errors[index] or error
+                failed[index] = failed[index] or text_failed
+        
+        for index, original in duplicates.items():
+            equations[index] = copy.deepcopy(equations[original])
+            errors[index] = errors[original]
+            regions[index] = copy.deepcopy(regions[original])
+        
+        for index, found in enumerate(equations):
+            if regions[index] is not None:
+                # Keep region results in reading order, as the serial path does
+                found.sort(key=lambda equation: (equation["bbox"]["y"], equation["bbox"]["x"]))
+        
+        for index in pending:
+            # Only finished OCR is cached, not read or backend failures or gate skips
+            if self.cache is not None and errors[index] in (None, NO_REGIONS_ERROR) and not failed[index]:
+                self.cache.put(namespace, keys[index],
+                               {"equations": equations[index], "error": errors[index], "regions": regions[index]})
+        
+        results = [
+            ocr_result(path, equations[index], errors[index], regions[index], scores[index])
+            for index, path in enumerate(image_paths)
+        ]
+        for index, result in enumerate(results):
+            if cache_hits[index] is not None:
+                result["cache_hit"] = cache_hits[index]
+        return results
+    
+    def extract_from_folder(self, folder_path, file_pattern="*.jpg", workers=1):
         """
         Extract equations from all images in a folder
         
         Args:
             folder_path: Path to folder containing images
             file_pattern: File pattern to match (default: *.jpg)
+            workers: Number of OCR worker processes (1 = OCR in this process)
         
         Returns:
             dict: Results for all images
@@ -126,21 +598,27 @@ class EquationExtractor:
             
             print(f"Processing {len(image_files)} images...", file=sys.stderr)
             
-            for i, img_path in enumerate(image_files):
-                print(f"Processing {i+1}/{len(image_files)}: {img_path.name}", file=sys.stderr)
-                result = self.extract_from_image(str(img_path))
-                results.append(result)
-                
-                if result["success"]:
-                    total_equations += len(result["equations"])
+            if workers > 1:
+                results = self.extract_parallel([str(img_path) for img_path in image_files], workers)
+            else:
+                for i, img_path in enumerate(image_files):
+                    print(f"Processing {i+1}/{len(image_files)}: {img_path.name}", file=sys.stderr)
+                    results.append(self.extract_from_image(str(img_path)))
             
-            return {
+            total_equations = sum(len(result["equations"]) for result in results if result["success"])
+            
+            output = {
                 "success": True,
                 "folder": folder_path,
                 "images_processed": len(image_files),
                 "total_equations": total_equations,
                 "results": results
             }
+            if self.gate is not None:
+                output["gate"] = gate_summary(results, self.gate.threshold)
+            if self.cache is not None:
+                output["cache"] = cache_summary(results, self.cache)
+            return output
             
         except Exception as e:
             return {
@@ -149,26 +627,33 @@ class EquationExtractor:
                 "results": []
             }
 
-def detect_equation_regions(image_path):
+def detect_equation_regions(image, dilate_kernel=None, min_size=(50, 20)):
     """
     Detect regions in image that likely contain equations
     Uses basic image processing to find text/equation regions
     
     Args:
-        image_path: Path to image file
+        image: Path to image file, or a BGR/grayscale NumPy array
+        dilate_kernel: (width, height) used to join nearby glyphs into
+            lines before finding contours (None = no dilation)
+        min_size: (width, height) a box must exceed to be kept
     
     Returns:
         list: Bounding boxes of detected regions
     """
     try:
         import cv2
-        import numpy as np
         
-        img = cv2.imread(image_path)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        img = cv2.imread(image) if isinstance(image, (str, Path)) else image
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
         
-        # Apply threshold to get binary image
-        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        # Apply threshold to get binary image (ink becomes white whether
+        # the slide is light-on-dark or dark-on-light)
+        flags = cv2.THRESH_BINARY if gray.mean() < 128 else cv2.THRESH_BINARY_INV
+        _, binary = cv2.threshold(gray, 0, 255, flags + cv2.THRESH_OTSU)
+        
+        if dilate_kernel:
+            binary = cv2.dilate(binary, cv2.getStructuringElement(cv2.MORPH_RECT, tuple(dilate_kernel)))
         
         # Find contours
         contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
@@ -177,7 +662,7 @@ def detect_equation_regions(image_path):
         for contour in contours:
             x, y, w, h = cv2.boundingRect(contour)
             # Filter small regions
-            if w > 50 and h > 20:
+            if w > min_size[0] and h > min_size[1]:
                 regions.append({
                     "x": int(x),
                     "y": int(y),
@@ -191,30 +676,469 @@ def detect_equation_regions(image_path):
         print(f"Region detection failed: {e}", file=sys.stderr)
         return []
 
+def merge_regions(regions, gap):
+    """
+    Merge boxes that overlap or lie within gap pixels of each other
+    
+    Args:
+        regions: Boxes as dicts with x, y, width, height
+        gap: Maximum (horizontal, vertical) distance in pixels between boxes that are merged
+    
+    Returns:
+        list: Merged boxes sorted top-to-bottom, left-to-right
+    """
+    gap_x, gap_y = gap
+    boxes = [[r["x"], r["y"], r["x"] + r["width"], r["y"] + r["height"]] for r in regions]
+    
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for box in boxes:
+            for other in result:
+                if (box[0] <= other[2] + gap_x and other[0] <= box[2] + gap_x and
+                        box[1] <= other[3] + gap_y and other[1] <= box[3] + gap_y):
+                    other[0] = min(other[0], box[0])
+                    other[1] = min(other[1], box[1])
+                    other[2] = max(other[2], box[2])
+                    other[3] = max(other[3], box[3])
+                    merged = True
+                    break
+            else:
+                result.append(list(box))
+        boxes = result
+    
+    boxes.sort(key=lambda box: (box[1], box[0]))
+    return [
+        {"x": x0, "y": y0, "width": x1 - x0, "height": y1 - y0}
+        for x0, y0, x1, y1 in boxes
+    ]
+
+def find_regions(img):
+    """
+    Find merged candidate equation regions in a PIL image
+    
+    Returns:
+        list: Boxes worth sending to OCR (empty when the frame has none)
+    """
+    import numpy as np
+    
+    gray = np.asarray(img.convert("L"))
+    height, width = gray.shape
+    # Merge every glyph cluster first so small pieces like "= y" join their line
+    pieces = detect_equation_regions(gray, REGION_DILATE_KERNEL, min_size=(0, 0))
+    merged = merge_regions(pieces, (REGION_MERGE_GAP[0] * width, REGION_MERGE_GAP[1] * height))
+    return [
+        region for region in merged
+        if region["width"] > REGION_MIN_SIZE[0] and region["height"] > REGION_MIN_SIZE[1]
+        # A box covering most of the frame is a slide border, not content
+        and region["width"] * region["height"] <= REGION_MAX_AREA_RATIO * width * height
+    ]
+
+def crop_region(img, region, padding=REGION_PADDING):
+    """Crop a region (plus padding) out of a PIL image"""
+    return img.crop((
+        max(0, region["x"] - padding),
+        max(0, region["y"] - padding),
+        min(img.width, region["x"] + region["width"] + padding),
+        min(img.height, region["y"] + region["height"] + padding)
+    ))
+
+# OCR server: jobs waiting for a worker before new ones are rejected
+SERVER_QUEUE_SIZE = 32
+
+# Serialises JSON lines written to stdout by the server's worker threads
+_output_lock = threading.Lock()
+
+def emit(message):
+    """Write one JSON message line to stdout"""
+    with _output_lock:
+        print(json.dumps(message), flush=True)
+
+def decode_image_bytes(data):
+    """Decode encoded image bytes (JPEG, PNG, ...) to a BGR array"""
+    import cv2
+    import numpy as np
+    
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Could not decode image bytes")
+    return frame
+
+class OCRPool:
+    """
+    Worker threads serving OCR jobs from a bounded queue
+
+    Each worker owns an EquationExtractor whose models are loaded once at
+    start(), so a job only pays for decoding and inference. The result cache
+    and presence gate, when given, are shared by all workers.
+    """
+
+    def __init__(self, size=1, queue_size=SERVER_QUEUE_SIZE, on_full="reject", **extractor_options):
+        """
+        Args:
+            size: Worker threads, each with its own LaTeX OCR model
+            queue_size: Jobs waiting for a worker
+            on_full: "reject" new jobs or "wait" for room when the queue is full
+            **extractor_options: EquationExtractor settings (crop_regions, gate, cache, backend)
+        """
+        self.size = max(1, size)
+        self.on_full = on_full
+        self.extractor_options = extractor_options
+        self.extractors = []
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.threads = []
+        self.lock = threading.Lock()
+        self.started_at = None
+        self.warm_up_seconds = 0.0
+        self.busy = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        # Jobs taken off the queue; total_wait is summed over exactly these
+        self.started = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_ocr = 0.0
+
+    def start(self):
+        """Load the models for every worker and start the worker threads"""
+        started = time.perf_counter()
+        # Models are loaded up front so the first jobs do not pay for them
+        self.extractors = [EquationExtractor(**self.extractor_options) for _ in range(self.size)]
+        for extractor in self.extractors:
+            extractor.warm_up()
+        self.warm_up_seconds = time.perf_counter() - started
+        self.started_at = time.monotonic()
+
+        for index, extractor in enumerate(self.extractors):
+            thread = threading.Thread(target=self._work, args=(extractor,), name=f"ocr-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, job, reply):
+        """
+        Queue a job; reply is called with the job's result message
+
+        Returns:
+            bool: True if the job was queued
+        """
+        job["enqueued_at"] = time.monotonic()
+        if self.on_full == "wait":
+            self.jobs.put((job, reply))
+            return True
+
+        try:
+            self.jobs.put_nowait((job, reply))
+            return True
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+            reply({
+                "id": job.get("id"),
+                "status": "error",
+                "reason": "queue_full",
+                "message": "OCR queue is full. Please try again shortly.",
+                "queue_depth": self.jobs.qsize()
+            })
+            return False
+
+    def health(self):
+        """Return whether the workers are up and their models loaded"""
+        alive = sum(1 for thread in self.threads if thread.is_alive())
+        return {
+            "ok": alive == self.size,
+            "workers_alive": alive,
+            "workers": self.size,
+            "latex_model_loaded": any(extractor.latex_model is not None for extractor in self.extractors),
+            "backend": self.extractors[0].backend if self.extractors else None,
+            "uptime_seconds": round(time.monotonic() - self.started_at, 1) if self.started_at else 0.0
+        }
+
+    def stats(self):
+        """Return queue depth, utilisation, latency and cache statistics"""
+        cache = self.extractor_options.get("cache")
+        gate = self.extractor_options.get("gate")
+        with self.lock:
+            finished = self.completed + self.failed
+            return {
+                "workers": self.size,
+                "busy_workers": self.busy,
+                "queue_depth": self.jobs.qsize(),
+                "queue_capacity": self.jobs.maxsize,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait / self.started * 1000, 1) if self.started else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+                "avg_ocr_ms": round(self.total_ocr / finished * 1000, 1) if finished else 0.0,
+                "warm_up_ms": round(self.warm_up_seconds * 1000, 1),
+                "startup": startup_report(),
+                "cache": cache.stats() if cache is not None else None,
+                "gate": gate.stats() if gate is not None else None
+            }
+
+    def shutdown(self):
+        """Let queued jobs finish, then stop the worker threads"""
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.extractor_options.get("cache") is not None:
+            self.extractor_options["cache"].close()
+
+    def _work(self, extractor):
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                break
+            self._run(extractor, *item)
+
+    def _run(self, extractor, job, reply):
+        started = time.monotonic()
+        wait = started - job["enqueued_at"]
+        with self.lock:
+            self.busy += 1
+            self.started += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+        success = False
+        try:
+            label = job.get("label") or job.get("image_path") or job.get("id")
+            if job.get("image_base64"):
+                frame = decode_image_bytes(base64.b64decode(job["image_base64"]))
+                result = extractor.extract_from_array(frame, label)
+            elif job.get("image_path"):
+                result = extractor.extract_from_image(job["image_path"])
+            else:
+                raise ValueError("Job needs an image_path or image_base64")
+            success = True
+            reply({
+                "id": job.get("id"),
+                "status": "complete",
+                "result": result,
+                "queue_wait_ms": round(wait * 1000, 1),
+                "ocr_ms": round((time.monotonic() - started) * 1000, 1)
+            })
+        except Exception as e:
+            reply({"id": job.get("id"), "status": "error", "message": f"OCR failed: {str(e)}"})
+        finally:
+            with self.lock:
+                self.busy -= 1
+                self.total_ocr += time.monotonic() - started
+                if success:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+def handle_message(pool, line, reply):
+    """
+    Handle one protocol line: a job or a health/stats/shutdown command
+
+    Returns:
+        bool: False once a shutdown command has been received
+    """
+    line = line.strip()
+    if not line:
+        return True
+    try:
+        job = json.loads(line)
+    except json.JSONDecodeError as e:
+        reply({"status": "error", "message": f"Invalid job: {str(e)}"})
+        return True
+    if not isinstance(job, dict):
+        reply({"status": "error", "message": f"Invalid job: expected a JSON object, got {type(job).__name__}"})
+        return True
+
+    command = job.get("command")
+    if command == "shutdown":
+        return False
+    if command == "health":
+        reply({"id": job.get("id"), "status": "health", **pool.health()})
+    elif command == "stats":
+        reply({"id": job.get("id"), "status": "stats", **pool.stats()})
+    elif command:
+        reply({"id": job.get("id"), "status": "error", "message": f"Unknown command: {command}"})
+    else:
+        pool.submit(job, reply)
+    return True
+
+class _ConnectionHandler(socketserver.StreamRequestHandler):
+    """Serve protocol lines from one socket client, replying on the same connection"""
+
+    def handle(self):
+        lock = threading.Condition()
+        pending = [0]
+
+        def reply(message):
+            with lock:
+                try:
+                    self.wfile.write((json.dumps(message) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                except (OSError, ValueError):
+                    pass
+                if message.get("status") in ("complete", "error") and "id" in message:
+                    pending[0] = max(0, pending[0] - 1)
+                    lock.notify_all()
+
+        keep_serving = True
+        for raw in self.rfile:
+            line = raw.decode("utf-8", errors="replace")
+            try:
+                is_job = not json.loads(line).get("command")
+            except (ValueError, AttributeError):
+                is_job = False
+            if is_job:
+                with lock:
+                    pending[0] += 1
+            keep_serving = handle_message(self.server.pool, line, reply)
+            if not keep_serving:
+                break
+
+        # Replies go to this connection, so keep it open until its jobs finish
+        with lock:
+            lock.wait_for(lambda: pending[0] == 0)
+        if not keep_serving:
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+def run_server(pool, socket_path=None):
+    """
+    Serve OCR jobs over line-delimited JSON until shutdown
+
+    Jobs look like {"id": "1", "image_path": "frame.jpg"} or carry the encoded
+    image bytes as {"id": "2", "image_base64": "..."}. Each gets one reply
+    with the same id: {"status": "complete", "result": {...}} (the per-image
+    result of the one-shot CLI) or {"status": "error", "message": ...}.
+    {"command": "health"} and {"command": "stats"} report on the pool, and
+    {"command": "shutdown"} (or EOF on stdin) stops the server once queued
+    jobs have finished.
+
+    Args:
+        pool: OCRPool to run jobs on
+        socket_path: Listen on this Unix socket instead of stdin/stdout
+    """
+    pool.start()
+    ready = {"status": "server_ready", "message": "Equation OCR server ready for jobs", **pool.health()}
+
+    if socket_path is None:
+        emit(ready)
+        for line in sys.stdin:
+            if not handle_message(pool, line, emit):
+                break
+        pool.shutdown()
+        return
+
+    if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+        raise RuntimeError("Unix sockets are not supported on this platform; use stdin/stdout")
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    with socketserver.ThreadingUnixStreamServer(socket_path, _ConnectionHandler) as server:
+        server.daemon_threads = True
+        server.pool = pool
+        emit({**ready, "socket": socket_path})
+        try:
+            server.serve_forever()
+        finally:
+            pool.shutdown()
+            os.unlink(socket_path)
+
+def parse_args(argv=None):
+    """Parse command line arguments (positional form kept for existing callers)"""
+    parser = argparse.ArgumentParser(description="Extract equations from an image or a folder of images")
+    parser.add_argument("input_path", nargs="?", help="Image file or folder of images (omit with --server)")
+    parser.add_argument("mode", nargs="?", default="auto", choices=list(OCR_BACKENDS) + list(BACKEND_ALIASES),
+                        help="OCR backend: auto (LaTeX with text fallback), latex/pix2tex or text/tesseract")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="OCR worker processes for folders, each with its own LaTeX OCR model (0 = one per CPU core)")
+    parser.add_argument("--pattern", default="*.jpg", help="Image file pattern for folders")
+    parser.add_argument("--regions", action="store_true",
+                        help="OCR only detected equation regions and skip frames without any")
+    parser.add_argument("--backend", choices=list(OCR_BACKENDS) + list(BACKEND_ALIASES),
+                        help="Same as mode, for use with --server")
+    parser.add_argument("--server", action="store_true",
+                        help="Keep models loaded and serve OCR jobs as line-delimited JSON on stdin/stdout")
+    parser.add_argument("--socket", help="With --server, listen on this Unix socket instead of stdin/stdout")
+    parser.add_argument("--server-workers", type=int, default=1,
+                        help="Concurrent OCR jobs in server mode, each worker with its own LaTeX OCR model")
+    parser.add_argument("--queue-size", type=int, default=SERVER_QUEUE_SIZE,
+                        help="Jobs waiting for a server worker")
+    parser.add_argument("--on-full", choices=["reject", "wait"], default="reject",
+                        help="What to do with new jobs when the server queue is full")
+    add_gate_args(parser)
+    add_cache_args(parser)
+    return parser.parse_args(argv)
+
+def add_cache_args(parser):
+    """Add the OCR result cache options to a command line parser"""
+    parser.add_argument("--cache", action="store_true",
+                        help="Reuse OCR results for near-duplicate frames and regions")
+    parser.add_argument("--cache-tolerance", type=int, default=CACHE_TOLERANCE,
+                        help="Maximum perceptual hash distance (bits of 64) between duplicates")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Results kept in memory")
+    parser.add_argument("--cache-db", help="SQLite file that keeps cached results between runs")
+
+def cache_from_args(args):
+    """Build the OCR result cache requested on the command line (None = no cache)"""
+    if not (args.cache or args.cache_db):
+        return None
+    return OCRResultCache(args.cache_tolerance, args.cache_size, args.cache_db)
+
+def add_gate_args(parser):
+    """Add the equation presence gate options to a command line parser"""
+    parser.add_argument("--gate", action="store_true",
+                        help="Skip OCR on frames the equation presence classifier scores below the threshold")
+    parser.add_argument("--gate-threshold", type=float, default=GATE_THRESHOLD,
+                        help="Presence score a frame needs to be OCR'd (0-1)")
+    parser.add_argument("--gate-weights", help="Classifier weights JSON written by equation_classifier.py train")
+
+def gate_from_args(args):
+    """Build the presence gate requested on the command line (None = no gate)"""
+    if not (args.gate or args.gate_weights):
+        return None
+    return EquationPresenceClassifier(args.gate_threshold, args.gate_weights)
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print(json.dumps({
             "success": False,
-            "error": "Usage: python equation_ocr.py <image_path_or_folder> [mode]"
+            "error": "Usage: python equation_ocr.py <image_path_or_folder> [mode] [--workers N] | --server"
         }))
         sys.exit(1)
     
-    input_path = sys.argv[1]
-    mode = sys.argv[2] if len(sys.argv) > 2 else "auto"
+    args = parse_args()
+    input_path = args.input_path
+    workers = args.workers or os.cpu_count() or 1
+    backend = args.backend or args.mode
     
-    extractor = EquationExtractor()
+    if args.server:
+        pool = OCRPool(args.server_workers, args.queue_size, args.on_full, crop_regions=args.regions,
+                       gate=gate_from_args(args), cache=cache_from_args(args), backend=backend)
+        run_server(pool, args.socket)
+        sys.exit(0)
     
-    # Check if input is a file or folder
+    if not input_path:
+        print(json.dumps({"success": False, "error": "No image path or folder provided"}))
+        sys.exit(1)
+    
+    # Folder workers load their own models, so never load one here
     path = Path(input_path)
+    extractor = EquationExtractor(load_model=not (path.is_dir() and workers > 1), crop_regions=args.regions,
+                                  gate=gate_from_args(args), cache=cache_from_args(args), backend=backend)
     
+    # Check if input is a file or folder
     if path.is_file():
         result = extractor.extract_from_image(input_path)
     elif path.is_dir():
-        result = extractor.extract_from_folder(input_path)
+        result = extractor.extract_from_folder(input_path, args.pattern, workers)
     else:
         result = {
             "success": False,
             "error": f"Path not found: {input_path}"
         }
     
+    result["backend"] = extractor.backend
+    result["startup"] = startup_report()
     print(json.dumps(result, indent=2))
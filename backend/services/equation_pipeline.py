@@ -0,0 +1,382 @@
+"""
+Equation Pipeline
+Extracts frames from a video and runs equation OCR on them in one process.
+Decoded frames are handed to the OCR stage through a bounded queue (or a
+shared-memory frame ring when OCR runs in worker processes), so no JPEG
+files are written unless requested and frame timestamps stay attached.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+
+from equation_ocr import (OCR_BACKENDS, BACKEND_ALIASES, EquationExtractor, add_cache_args, add_gate_args,
+                          cache_from_args, cache_summary, gate_from_args, gate_summary, startup_report)
+from frame_extractor import SAMPLING_STRATEGIES, iter_video_frames
+from frame_ring import FrameRing, RingClosed
+from scene_detectors import DETECTORS, ADAPTIVE_WINDOW, ADAPTIVE_SENSITIVITY, DOWNSCALE_WIDTH
+
+# Decoded frames waiting for OCR; full-resolution frames are large, so keep this small
+DEFAULT_QUEUE_SIZE = 8
+
+# Frame ring slots per OCR process when none are given
+RING_SLOTS_PER_PROCESS = 2
+
+# How often a producer waiting for a free ring slot checks that OCR workers are alive
+RING_PUT_TIMEOUT = 1
+
+_DONE = object()
+
+def _produce(frames, frame_queue, stop, state):
+    """Decode frames into the queue until the video ends or the consumer stops"""
+    try:
+        for item in frames:
+            started = time.perf_counter()
+            while not stop.is_set():
+                try:
+                    frame_queue.put(item, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            state["producer_wait_seconds"] += time.perf_counter() - started
+            if stop.is_set():
+                break
+    except Exception as e:
+        state["error"] = e
+    finally:
+        frames.close()
+        # Once the consumer has stopped nobody reads the queue, so never block on it
+        while not stop.is_set():
+            try:
+                frame_queue.put(_DONE, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+
+def _save_frame(item, frame, save_folder):
+    """Write a frame to the save folder and record its filename and path"""
+    item["filename"] = f"frame_{item['frame_number']:04d}.jpg"
+    item["path"] = os.path.join(save_folder, item["filename"])
+    cv2.imwrite(item["path"], frame)
+
+def _ocr_worker(ring, results, crop_regions, gate, cache, backend):
+    """OCR frames from the ring until the producer closes it"""
+    # The cache pickles by its settings, so every worker starts its own LRU
+    extractor = EquationExtractor(crop_regions=crop_regions, gate=gate, cache=cache, backend=backend)
+    while True:
+        try:
+            slot, frame, meta = ring.get()
+        except RingClosed:
+            break
+
+        started = time.perf_counter()
+        try:
+            result = extractor.extract_from_array(frame, meta["label"])
+        finally:
+            # The view points into the slot, so drop it before handing the slot back
+            del frame
+            ring.release(slot)
+
+        result["frame_number"] = meta["frame_number"]
+        result["timestamp"] = meta["timestamp"]
+        result["ocr_seconds"] = time.perf_counter() - started
+        results.put(result)
+
+    ring.close()
+    results.put(None)
+
+def _put_frame(ring, frame, meta, workers):
+    """Publish a frame to the ring, failing instead of hanging if every OCR worker has exited"""
+    while True:
+        try:
+            return ring.put(frame, meta, timeout=RING_PUT_TIMEOUT)
+        except queue.Empty:
+            if not any(worker.is_alive() for worker in workers):
+                raise RuntimeError("All OCR worker processes exited; no frame ring slots will be freed")
+
+def _ocr_in_processes(frames, processes, ring_slots, save_folder, crop_regions=False, gate=None, cache=None,
+                      backend="auto"):
+    """
+    Decode frames in this process and OCR them in worker processes
+
+    Frames travel through a FrameRing, so only slot indices and metadata are
+    pickled. The ring is sized from the first frame. If every worker dies the
+    pipeline fails rather than waiting on the ring; the shared memory is
+    freed either way.
+
+    Returns:
+        tuple: (frame infos, OCR results ordered by frame, ring stats, OCR seconds)
+    """
+    context = multiprocessing.get_context()
+    results = context.Queue()
+    ring = None
+    workers = []
+    frame_items = []
+
+    try:
+        try:
+            for item in frames:
+                frame = item.pop("frame")
+                if ring is None:
+                    ring = FrameRing(ring_slots or processes * RING_SLOTS_PER_PROCESS, frame.nbytes, context)
+                    workers = [context.Process(target=_ocr_worker,
+                                               args=(ring, results, crop_regions, gate, cache, backend),
+                                               daemon=True)
+                               for _ in range(processes)]
+                    for worker in workers:
+                        worker.start()
+
+                if save_folder:
+                    _save_frame(item, frame, save_folder)
+                frame_items.append(item)
+                _put_frame(ring, frame, {
+                    "frame_number": item["frame_number"],
+                    "timestamp": item["timestamp"],
+                    "label": item.get("path", f"frame_{item['frame_number']:04d}")
+                }, workers)
+        finally:
+            if ring is not None:
+                ring.close_producer(len(workers))
+
+        ocr_results = []
+        finished = 0
+        while finished < len(workers):
+            try:
+                result = results.get(timeout=1)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    break
+                continue
+            if result is None:
+                finished += 1
+            else:
+                ocr_results.append(result)
+
+        for worker in workers:
+            worker.join()
+    except BaseException:
+        # Workers may be blocked on the ring or the results queue
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        raise
+    finally:
+        ring_stats = ring.stats() if ring is not None else None
+        if ring is not None:
+            ring.close()
+
+    if len(ocr_results) < len(frame_items):
+        print(f"OCR workers returned {len(ocr_results)} of {len(frame_items)} frames", file=sys.stderr)
+
+    ocr_results.sort(key=lambda result: result["frame_number"])
+    ocr_seconds = sum(result.pop("ocr_seconds") for result in ocr_results)
+    return frame_items, ocr_results, ring_stats, ocr_seconds
+
+def run_pipeline(video_path, method="scene", save_folder=None, queue_size=DEFAULT_QUEUE_SIZE,
+                 extractor=None, ocr_processes=0, ring_slots=None, crop_regions=False, gate=None, cache=None,
+                 ocr_backend="auto", **options):
+    """
+    Extract frames and equations from a video without a temp-folder round trip
+
+    Args:
+        video_path: Path to video file
+        method: Frame selection method: "scene", "interval" or "smart"
+        save_folder: Also write each frame here as JPEG (None = keep frames in memory only)
+        queue_size: Maximum decoded frames waiting for OCR
+        extractor: EquationExtractor to reuse (a new one is created if omitted)
+        ocr_processes: Run OCR in this many worker processes fed by a shared-memory
+            frame ring (0 = OCR in this process)
+        ring_slots: Frame ring size (default: 2 slots per OCR process)
+        crop_regions: OCR only detected equation regions (ignored when an
+            extractor is passed in)
+        gate: EquationPresenceClassifier that decides which frames are OCR'd
+            (ignored when an extractor is passed in)
+        cache: OCRResultCache for near-duplicate frames (ignored when an
+            extractor is passed in)
+        ocr_backend: "auto", "latex" or "text" (ignored when an extractor is passed in)
+        **options: Frame selection settings passed to iter_video_frames
+
+    Returns:
+        dict: Frames, per-frame OCR results carrying timestamps, and stage timings
+    """
+    try:
+        if save_folder:
+            os.makedirs(save_folder, exist_ok=True)
+
+        info = {}
+        if ocr_processes > 0:
+            started = time.perf_counter()
+            frames, results, ring_stats, ocr_seconds = _ocr_in_processes(
+                iter_video_frames(video_path, method, info, **options), ocr_processes, ring_slots, save_folder,
+                crop_regions, gate, cache, ocr_backend
+            )
+            elapsed = time.perf_counter() - started
+            total_equations = sum(len(result["equations"]) for result in results if result["success"])
+            return _pipeline_result(video_path, method, save_folder, info, frames, results, total_equations, {
+                "total_seconds": round(elapsed, 3),
+                "ocr_seconds": round(ocr_seconds, 3),
+                "ocr_processes": ocr_processes,
+                "frames_per_second": round(len(frames) / elapsed, 2) if elapsed > 0 else None,
+                "frame_ring": ring_stats
+            }, gate, cache)
+
+        extractor = extractor or EquationExtractor(crop_regions=crop_regions, gate=gate, cache=cache,
+                                                   backend=ocr_backend)
+        frame_queue = queue.Queue(maxsize=max(1, queue_size))
+        stop = threading.Event()
+        state = {"producer_wait_seconds": 0.0, "error": None}
+
+        started = time.perf_counter()
+        producer = threading.Thread(
+            target=_produce,
+            args=(iter_video_frames(video_path, method, info, **options), frame_queue, stop, state),
+            daemon=True
+        )
+        producer.start()
+
+        frames = []
+        results = []
+        total_equations = 0
+        consumer_wait = 0.0
+        ocr_seconds = 0.0
+
+        try:
+            while True:
+                wait_start = time.perf_counter()
+                item = frame_queue.get()
+                consumer_wait += time.perf_counter() - wait_start
+                if item is _DONE:
+                    break
+
+                frame = item.pop("frame")
+                label = f"frame_{item['frame_number']:04d}"
+                if save_folder:
+                    _save_frame(item, frame, save_folder)
+                frames.append(item)
+
+                print(f"OCR frame {item['frame_number']} at {item['timestamp']:.2f}s", file=sys.stderr)
+                ocr_start = time.perf_counter()
+                result = extractor.extract_from_array(frame, item.get("path", label))
+                ocr_seconds += time.perf_counter() - ocr_start
+
+                result["frame_number"] = item["frame_number"]
+                result["timestamp"] = item["timestamp"]
+                results.append(result)
+                if result["success"]:
+                    total_equations += len(result["equations"])
+        finally:
+            stop.set()
+            producer.join()
+
+        if state["error"] is not None:
+            raise state["error"]
+
+        elapsed = time.perf_counter() - started
+        return _pipeline_result(video_path, method, save_folder, info, frames, results, total_equations, {
+            "total_seconds": round(elapsed, 3),
+            "ocr_seconds": round(ocr_seconds, 3),
+            "ocr_wait_seconds": round(consumer_wait, 3),
+            "decode_wait_seconds": round(state["producer_wait_seconds"], 3),
+            "frames_per_second": round(len(frames) / elapsed, 2) if elapsed > 0 else None
+        }, extractor.gate, extractor.cache)
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "frames_extracted": 0,
+            "equations_found": 0
+        }
+
+def _pipeline_result(video_path, method, save_folder, info, frames, results, total_equations, timings,
+                     gate=None, cache=None):
+    """Assemble the pipeline's JSON result"""
+    result = {
+        "success": True,
+        "video_path": video_path,
+        "frames_extracted": len(frames),
+        "equations_found": total_equations,
+        "total_equations": total_equations,
+        "video_duration": info.get("video_duration"),
+        "fps": info.get("fps"),
+        "method": info.get("method", method),
+        "output_folder": save_folder,
+        "frames": frames,
+        "equations": results,
+        "timings": timings
+    }
+    if gate is not None:
+        result["gate"] = gate_summary(results, gate.threshold)
+    if cache is not None:
+        result["cache"] = cache_summary(results, cache)
+    return result
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Extract frames and equations from a video in one pass")
+    parser.add_argument("video_path")
+    parser.add_argument("method", nargs="?", default="scene", help="scene, interval or smart")
+    parser.add_argument("param", nargs="?", type=float, default=5,
+                        help="Interval in seconds (interval) or number of frames (smart)")
+    parser.add_argument("--save-frames", metavar="DIR",
+                        help="Also write the selected frames to this folder")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Maximum decoded frames waiting for OCR")
+    parser.add_argument("--ocr-processes", type=int, default=0,
+                        help="Run OCR in worker processes fed through a shared-memory frame ring")
+    parser.add_argument("--ring-slots", type=int, default=None,
+                        help="Frame ring slots (default: 2 per OCR process)")
+    parser.add_argument("--regions", action="store_true",
+                        help="OCR only detected equation regions and skip frames without any")
+    parser.add_argument("--ocr-backend", choices=list(OCR_BACKENDS) + list(BACKEND_ALIASES), default="auto",
+                        help="auto (LaTeX with text fallback), latex/pix2tex or text/tesseract")
+    add_gate_args(parser)
+    add_cache_args(parser)
+    parser.add_argument("--max-frames", type=int, default=50)
+    parser.add_argument("--min-gap-seconds", type=int, default=10)
+    parser.add_argument("--strategy", choices=SAMPLING_STRATEGIES, default="auto")
+    parser.add_argument("--stride", type=int, default=1)
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--detector", choices=list(DETECTORS), default="absdiff")
+    parser.add_argument("--adaptive", action="store_true")
+    parser.add_argument("--adaptive-window", type=int, default=ADAPTIVE_WINDOW)
+    parser.add_argument("--adaptive-sensitivity", type=float, default=ADAPTIVE_SENSITIVITY)
+    parser.add_argument("--downscale-width", type=int, default=DOWNSCALE_WIDTH)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    result = run_pipeline(
+        args.video_path,
+        args.method,
+        save_folder=args.save_frames,
+        queue_size=args.queue_size,
+        ocr_processes=args.ocr_processes,
+        ring_slots=args.ring_slots,
+        crop_regions=args.regions,
+        gate=gate_from_args(args),
+        cache=cache_from_args(args),
+        ocr_backend=args.ocr_backend,
+        interval=args.param,
+        num_frames=int(args.param),
+        max_frames=args.max_frames,
+        min_gap_seconds=args.min_gap_seconds,
+        strategy=args.strategy,
+        stride=args.stride,
+        threshold=args.threshold,
+        detector=args.detector,
+        adaptive=args.adaptive,
+        window=args.adaptive_window,
+        sensitivity=args.adaptive_sensitivity,
+        downscale_width=args.downscale_width
+    )
+
+    result["startup"] = startup_report()
+    print(json.dumps(result))
@@ -2,10 +2,32 @@
 Equation and Transcript Merger
 Combines extracted equations with video transcripts
 """
+import argparse
+import bisect
+import contextlib
+import gzip
+import heapq
+import io
 import json
+import math
 import sys
+from collections import deque
 from pathlib import Path
 
+# NumPy is only needed by the columnar merge engine
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+MERGE_ENGINES = ("python", "numpy")
+
+OUTPUT_FORMATS = ("json", "markdown", "ndjson", "summary")
+
+# Same as the gzip tool; level 9 is several times slower for a few percent
+GZIP_LEVEL = 6
+
 def parse_timestamp(timestamp_str):
     """
     Convert timestamp string to seconds
@@ -34,7 +56,7 @@ def format_timestamp(seconds):
     else:
         return f"{minutes:02d}:{secs:02d}"
 
-def merge_equations_with_transcript(equations_data, transcript_data, time_window=10):
+def merge_equations_with_transcript(equations_data, transcript_data, time_window=10, engine="python"):
     """
     Merge equations with transcript based on timestamps
     
@@ -42,31 +64,40 @@ def merge_equations_with_transcript(equations_data, transcript_data, time_window
         equations_data: List of equation results with timestamps
         transcript_data: Transcript with timestamps (Whisper format or custom)
         time_window: Time window in seconds to match equations with speech
+        engine: "python", or "numpy" for the columnar engine (same output,
+            faster on very large inputs; see merge_columnar)
     
     Returns:
         dict: Merged timeline with equations and speech
     """
+    if engine == "numpy":
+        return merge_columnar(equations_data, transcript_data, time_window)
+    if engine != "python":
+        return {
+            "success": False,
+            "error": f"Unknown merge engine: '{engine}'. Choose from: {', '.join(MERGE_ENGINES)}",
+            "timeline": []
+        }
+    
     try:
         merged_timeline = []
         
+        # Frames with equations, matched to transcript segments in one sweep
+        eq_items = [
+            eq_item for eq_item in equations_data
+            if eq_item.get("success") and eq_item.get("equations", [])
+        ]
+        matches = match_transcript_segments(
+            [eq_item.get("timestamp", 0) for eq_item in eq_items],
+            transcript_data,
+            time_window
+        )
+        
         # Process equations
-        for eq_item in equations_data:
-            if not eq_item.get("success"):
-                continue
-            
+        for eq_item, matching_speech in zip(eq_items, matches):
             timestamp = eq_item.get("timestamp", 0)
             equations = eq_item.get("equations", [])
             
-            if not equations:
-                continue
-            
-            # Find matching transcript segment
-            matching_speech = find_matching_transcript(
-                timestamp, 
-                transcript_data, 
-                time_window
-            )
-            
             for eq in equations:
                 entry = {
                     "timestamp": timestamp,
@@ -82,15 +113,14 @@ def merge_equations_with_transcript(equations_data, transcript_data, time_window
         
         # Add transcript-only segments
         if isinstance(transcript_data, list):
+            nearby = TimestampGrid(item["timestamp"] for item in merged_timeline)
             for segment in transcript_data:
                 timestamp = segment.get("start", segment.get("timestamp", 0))
                 text = segment.get("text", "")
                 
-                # Check if this timestamp already has an equation
-                has_equation = any(
-                    abs(item["timestamp"] - timestamp) < 1 
-                    for item in merged_timeline
-                )
+                # Check if this timestamp already has an equation (or an
+                # earlier speech entry)
+                has_equation = nearby.has_within_one_second(timestamp)
                 
                 if not has_equation and text.strip():
                     entry = {
@@ -101,6 +131,7 @@ def merge_equations_with_transcript(equations_data, transcript_data, time_window
                         "equation": None
                     }
                     merged_timeline.append(entry)
+                    nearby.add(timestamp)
         
         # Sort by timestamp
         merged_timeline.sort(key=lambda x: x["timestamp"])
@@ -118,6 +149,281 @@ def merge_equations_with_transcript(equations_data, transcript_data, time_window
             "timeline": []
         }
 
+class TimestampGrid:
+    """
+    Timeline timestamps bucketed by whole second
+
+    Any timestamp less than a second from t lies in t's bucket or one of its
+    two neighbours, so the "within one second" check only looks at those.
+    """
+    
+    def __init__(self, timestamps=()):
+        self.buckets = {}
+        for timestamp in timestamps:
+            self.add(timestamp)
+    
+    def add(self, timestamp):
+        self.buckets.setdefault(math.floor(timestamp), []).append(timestamp)
+    
+    def has_within_one_second(self, timestamp):
+        """Same as any(abs(t - timestamp) < 1 for t in the added timestamps)"""
+        bucket = math.floor(timestamp)
+        return any(
+            abs(other - timestamp) < 1
+            for key in (bucket - 1, bucket, bucket + 1)
+            for other in self.buckets.get(key, ())
+        )
+
+def match_transcript_segments(timestamps, transcript_data, time_window):
+    """
+    Find the matching transcript text for many timestamps at once
+    
+    Gives the same answers as calling find_matching_transcript() for each
+    timestamp (the first segment, in transcript order, whose span widened by
+    time_window contains it) in O((E + S) log S) instead of O(E * S): the
+    timestamps are visited in time order while segment spans are added as
+    their start is passed, and a heap keyed on transcript position yields the
+    earliest segment still covering the timestamp.
+    
+    Args:
+        timestamps: Times in seconds
+        transcript_data: Transcript data
+        time_window: Time window for matching
+    
+    Returns:
+        list: Matching transcript text (or empty string) per timestamp
+    """
+    if not transcript_data or not isinstance(transcript_data, (str, list)):
+        return ["" for _ in timestamps]
+    if isinstance(transcript_data, str):
+        return [transcript_data for _ in timestamps]
+    if not timestamps:
+        return []
+    
+    starts = []
+    ends = []
+    for segment in transcript_data:
+        seg_start = segment.get("start", segment.get("timestamp", 0))
+        starts.append(seg_start)
+        ends.append(segment.get("end", seg_start + 5))
+    
+    return [
+        transcript_data[index].get("text", "") if index >= 0 else ""
+        for index in first_covering_segments(timestamps, starts, ends, time_window)
+    ]
+
+def first_covering_segments(timestamps, starts, ends, time_window):
+    """
+    Index of the first segment whose widened span contains each timestamp
+    
+    Args:
+        timestamps: Times in seconds
+        starts: Segment start times, in transcript order
+        ends: Segment end times, in transcript order
+        time_window: Padding added on both sides of every segment
+    
+    Returns:
+        list: Segment index per timestamp, or -1 where no segment matches
+    """
+    spans = sorted(
+        (start - time_window, index, end + time_window)
+        for index, (start, end) in enumerate(zip(starts, ends))
+    )
+    
+    matches = [-1] * len(timestamps)
+    active = []
+    next_span = 0
+    for position in sorted(range(len(timestamps)), key=lambda position: timestamps[position]):
+        timestamp = timestamps[position]
+        while next_span < len(spans) and spans[next_span][0] <= timestamp:
+            _, index, window_end = spans[next_span]
+            heapq.heappush(active, (index, window_end))
+            next_span += 1
+        # Timestamps only increase, so a span that ended before this one is done
+        while active and active[0][1] < timestamp:
+            heapq.heappop(active)
+        if active:
+            matches[position] = active[0][0]
+    
+    return matches
+
+def format_timestamps(seconds):
+    """Vectorised format_timestamp() over a float array; returns a list of strings"""
+    # The formatted time only depends on the whole second, so each distinct
+    # second of the lecture is formatted once
+    whole, inverse = np.unique(np.floor(seconds).astype(np.int64), return_inverse=True)
+    hours = np.floor_divide(whole, 3600).tolist()
+    minutes = np.floor_divide(np.mod(whole, 3600), 60).tolist()
+    secs = np.mod(whole, 60).tolist()
+    labels = np.array([
+        f"{h:02d}:{m:02d}:{s:02d}" if h > 0 else f"{m:02d}:{s:02d}"
+        for h, m, s in zip(hours, minutes, secs)
+    ], dtype=object)
+    return labels[inverse.ravel()].tolist()
+
+def _near_any(values, sorted_others):
+    """Mask of values less than one second from any of sorted_others"""
+    if not len(sorted_others):
+        return np.zeros(len(values), dtype=bool)
+    index = np.searchsorted(sorted_others, values, side="left")
+    right = sorted_others[np.minimum(index, len(sorted_others) - 1)]
+    left = sorted_others[np.maximum(index - 1, 0)]
+    return (
+        ((index < len(sorted_others)) & (np.abs(right - values) < 1)) |
+        ((index > 0) & (np.abs(values - left) < 1))
+    )
+
+def merge_columnar(equations_data, transcript_data, time_window=10, output="rows"):
+    """
+    Columnar merge engine: same result as merge_equations_with_transcript()
+    
+    Timestamps, segment starts and ends are loaded into NumPy arrays once.
+    Equation-to-segment matching uses searchsorted when segment starts are in
+    time order (as Whisper produces), and falls back to the heap sweep of
+    first_covering_segments() otherwise.
+    Output dicts are only built at the end, or skipped entirely with
+    output="columns".
+    
+    Args:
+        equations_data: List of equation results with timestamps
+        transcript_data: Transcript with timestamps (Whisper format or custom)
+        time_window: Time window in seconds to match equations with speech
+        output: "rows" for the usual timeline of dicts, or "columns" for one
+            list per field (fields an entry type lacks are None)
+    
+    Returns:
+        dict: Merged timeline with equations and speech
+    """
+    try:
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("The numpy merge engine needs NumPy (pip install numpy)")
+        
+        # Equation columns, one row per equation
+        eq_items = [
+            eq_item for eq_item in equations_data
+            if eq_item.get("success") and eq_item.get("equations", [])
+        ]
+        item_times = [eq_item.get("timestamp", 0) for eq_item in eq_items]
+        item_seconds = np.array(item_times, dtype=np.float64)
+        counts = [len(eq_item.get("equations", [])) for eq_item in eq_items]
+        
+        segments = transcript_data if isinstance(transcript_data, list) else []
+        starts = [segment.get("start", segment.get("timestamp", 0)) for segment in segments]
+        
+        # Speech text per frame with equations
+        if isinstance(transcript_data, list) and transcript_data and eq_items:
+            ends = [
+                segment.get("end", start + 5) for segment, start in zip(segments, starts)
+            ]
+            start_seconds = np.array(starts, dtype=np.float64)
+            end_seconds = np.array(ends, dtype=np.float64)
+            window_starts = start_seconds - time_window
+            window_ends = end_seconds + time_window
+            if np.all(np.diff(start_seconds) >= 0):
+                # Segments starting by t are a prefix; the first of them still
+                # running at t is the first whose running maximum end reaches t
+                first = np.searchsorted(np.maximum.accumulate(window_ends), item_seconds, side="left")
+                last = np.searchsorted(window_starts, item_seconds, side="right")
+                matches = np.where(first < last, first, -1).tolist()
+            else:
+                matches = first_covering_segments(item_times, starts, ends, time_window)
+            item_speech = [segments[index].get("text", "") if index >= 0 else "" for index in matches]
+        elif isinstance(transcript_data, str) and transcript_data:
+            item_speech = [transcript_data] * len(eq_items)
+        else:
+            item_speech = [""] * len(eq_items)
+        
+        eq_rows = [
+            (position, eq)
+            for position, eq_item in enumerate(eq_items)
+            for eq in eq_item.get("equations", [])
+        ]
+        eq_positions = np.repeat(np.arange(len(eq_items)), counts)
+        
+        # Transcript-only segments: non-empty text, not within a second of an
+        # equation, nor of a speech entry added before it in transcript order
+        texts = [segment.get("text", "").strip() for segment in segments]
+        start_seconds = np.array(starts, dtype=np.float64)
+        candidates = np.array([bool(text) for text in texts], dtype=bool)
+        if len(segments):
+            candidates &= ~_near_any(start_seconds, np.sort(item_seconds))
+        
+        kept = []
+        if np.all(np.diff(start_seconds) >= 0):
+            # In time order the nearest earlier entry is the last one kept
+            last = None
+            for index, value in zip(np.flatnonzero(candidates).tolist(), start_seconds[candidates].tolist()):
+                if last is None or not abs(last - value) < 1:
+                    kept.append(index)
+                    last = value
+        else:
+            nearby = TimestampGrid()
+            for index in np.flatnonzero(candidates).tolist():
+                if not nearby.has_within_one_second(starts[index]):
+                    kept.append(index)
+                    nearby.add(starts[index])
+        
+        # Stable sort by time over equations followed by speech, as the
+        # Python engine appends them
+        all_seconds = np.concatenate([item_seconds[eq_positions], start_seconds[kept]])
+        order = np.argsort(all_seconds, kind="stable").tolist()
+        formatted = format_timestamps(all_seconds)
+        eq_count = len(eq_rows)
+        
+        if output == "columns":
+            columns = {name: [] for name in ("timestamp", "formatted_time", "type", "equation", "method",
+                                             "confidence", "speech", "frame")}
+            for row in order:
+                if row < eq_count:
+                    position, eq = eq_rows[row]
+                    values = (item_times[position], formatted[row], "equation",
+                              eq.get("latex") or eq.get("text", ""), eq.get("method", "unknown"),
+                              eq.get("confidence", "unknown"), item_speech[position],
+                              eq_items[position].get("frame_number"))
+                else:
+                    index = kept[row - eq_count]
+                    values = (starts[index], formatted[row], "speech", None, None, None, texts[index], None)
+                for column, value in zip(columns.values(), values):
+                    column.append(value)
+            return {"success": True, "total_entries": len(order), "columns": columns}
+        
+        merged_timeline = []
+        for row in order:
+            if row < eq_count:
+                position, eq = eq_rows[row]
+                merged_timeline.append({
+                    "timestamp": item_times[position],
+                    "formatted_time": formatted[row],
+                    "type": "equation",
+                    "equation": eq.get("latex") or eq.get("text", ""),
+                    "method": eq.get("method", "unknown"),
+                    "confidence": eq.get("confidence", "unknown"),
+                    "speech": item_speech[position],
+                    "frame": eq_items[position].get("frame_number")
+                })
+            else:
+                index = kept[row - eq_count]
+                merged_timeline.append({
+                    "timestamp": starts[index],
+                    "formatted_time": formatted[row],
+                    "type": "speech",
+                    "speech": texts[index],
+                    "equation": None
+                })
+        
+        return {
+            "success": True,
+            "total_entries": len(merged_timeline),
+            "timeline": merged_timeline
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "timeline": []
+        }
+
 def find_matching_transcript(timestamp, transcript_data, time_window):
     """
     Find transcript segment that matches the given timestamp
@@ -148,40 +454,474 @@ def find_matching_transcript(timestamp, transcript_data, time_window):
     
     return ""
 
-def generate_markdown_summary(merged_data, include_timestamps=True):
+def equation_entries(eq_item, timestamp, speech):
+    """Timeline entries for one OCR result, as merge_equations_with_transcript() builds them"""
+    return [
+        {
+            "timestamp": timestamp,
+            "formatted_time": format_timestamp(timestamp),
+            "type": "equation",
+            "equation": eq.get("latex") or eq.get("text", ""),
+            "method": eq.get("method", "unknown"),
+            "confidence": eq.get("confidence", "unknown"),
+            "speech": speech,
+            "frame": eq_item.get("frame_number")
+        }
+        for eq in eq_item.get("equations", [])
+    ]
+
+class StreamingMerger:
     """
-    Generate a markdown summary from merged data
+    Incremental merge of OCR results and transcript segments as they arrive
+    
+    Equations and segments are fed in whatever interleaving the producers
+    deliver them, each source roughly in time order. Every source has a
+    watermark: the time below which no more of its events are expected. It
+    follows the latest event time minus lateness, can be advanced explicitly
+    and jumps to infinity when the source finishes. Entries come back from
+    each call as soon as nothing still to arrive could change or precede
+    them, and overall come out exactly as merge_equations_with_transcript()
+    would order them, provided no event arrives below its source watermark.
+    
+    Only state near the watermarks is kept: equations waiting for a covering
+    segment (at most time_window seconds of them), segments that could still
+    cover a future equation, segments waiting on equations within a second,
+    and timestamps for the one-second duplicate check. Entries wait for the
+    slower source, so memory follows the lag between OCR and transcription
+    rather than the video length.
+    """
+    
+    def __init__(self, time_window=10, lateness=0):
+        """
+        Args:
+            time_window: Time window in seconds to match equations with speech
+            lateness: Seconds an event may arrive behind the latest one of its
+                source and still be merged in order
+        """
+        self.time_window = time_window
+        self.lateness = lateness
+        self.latest = {"equations": -math.inf, "transcript": -math.inf}
+        self.marks = {"equations": -math.inf, "transcript": -math.inf}
+        # Equations with no covering segment yet: (timestamp, seq, item)
+        self.waiting_equations = []
+        # Segments that may still cover a future equation: (start, end, text)
+        self.segments = deque()
+        # Segments waiting for equations within a second: (start, seq, text)
+        self.undecided = deque()
+        # Sorted equation and kept speech times for the one-second check
+        self.nearby = []
+        # Finished entries waiting for both watermarks: (timestamp, kind, seq, entry)
+        self.ready = []
+        self.seq = 0
+        self.events = 0
+        self.late_events = 0
+        self.emitted = 0
+        self.max_buffered = 0
+    
+    def watermark(self, source):
+        """Time below which no more events are expected from a source"""
+        return max(self.marks[source], self.latest[source] - self.lateness)
+    
+    def advance(self, source, timestamp):
+        """
+        Declare that no more events below timestamp will come from a source
+        
+        Args:
+            source: "equations" or "transcript"
+            timestamp: New watermark in seconds (math.inf when finished)
+        
+        Returns:
+            list: Timeline entries now final, in timeline order
+        """
+        if source not in self.marks:
+            raise ValueError(f"Unknown source: '{source}'. Choose from: equations, transcript")
+        self.marks[source] = max(self.marks[source], timestamp)
+        return self._drain()
+    
+    def finish(self, source=None):
+        """Mark one source (or both) as finished; returns the entries now final"""
+        for name in [source] if source else list(self.marks):
+            self.marks[name] = math.inf
+        return self._drain()
+    
+    def _observe(self, source, timestamp):
+        self.events += 1
+        if timestamp < self.watermark(source):
+            self.late_events += 1
+        self.latest[source] = max(self.latest[source], timestamp)
+    
+    def _push(self, timestamp, kind, entries):
+        for entry in entries:
+            heapq.heappush(self.ready, (timestamp, kind, self.seq, entry))
+            self.seq += 1
+    
+    def _near(self, timestamp):
+        index = bisect.bisect_left(self.nearby, timestamp)
+        return (
+            (index < len(self.nearby) and abs(self.nearby[index] - timestamp) < 1) or
+            (index > 0 and abs(timestamp - self.nearby[index - 1]) < 1)
+        )
+    
+    def _covers(self, start, end, timestamp):
+        return start - self.time_window <= timestamp <= end + self.time_window
+    
+    def add_equation(self, eq_item):
+        """
+        Add one OCR result (an element of equations_data)
+        
+        Returns:
+            list: Timeline entries now final, in timeline order
+        """
+        timestamp = eq_item.get("timestamp", 0)
+        self._observe("equations", timestamp)
+        if eq_item.get("success") and eq_item.get("equations", []):
+            bisect.insort(self.nearby, timestamp)
+            # Segments arrive in transcript order, so the first retained one
+            # covering the equation is the one the batch merge would pick
+            for start, end, text in self.segments:
+                if self._covers(start, end, timestamp):
+                    self._push(timestamp, 0, equation_entries(eq_item, timestamp, text))
+                    break
+            else:
+                self.waiting_equations.append((timestamp, self.seq, eq_item))
+                self.seq += 1
+        return self._drain()
+    
+    def add_segment(self, segment):
+        """
+        Add one transcript segment (Whisper format)
+        
+        Returns:
+            list: Timeline entries now final, in timeline order
+        """
+        start = segment.get("start", segment.get("timestamp", 0))
+        end = segment.get("end", start + 5)
+        text = segment.get("text", "")
+        self._observe("transcript", start)
+        
+        self.segments.append((start, end, text))
+        still_waiting = []
+        for waiting in self.waiting_equations:
+            if self._covers(start, end, waiting[0]):
+                self._push(waiting[0], 0, equation_entries(waiting[2], waiting[0], text))
+            else:
+                still_waiting.append(waiting)
+        self.waiting_equations = still_waiting
+        
+        self.undecided.append((start, self.seq, text.strip()))
+        self.seq += 1
+        return self._drain()
+    
+    def _drain(self):
+        equations_mark = self.watermark("equations")
+        transcript_mark = self.watermark("transcript")
+        
+        # No future segment can start early enough to cover these
+        still_waiting = []
+        for waiting in self.waiting_equations:
+            if transcript_mark > waiting[0] + self.time_window:
+                self._push(waiting[0], 0, equation_entries(waiting[2], waiting[0], ""))
+            else:
+                still_waiting.append(waiting)
+        self.waiting_equations = still_waiting
+        
+        # A segment is decided once every equation within a second has arrived
+        while self.undecided and equations_mark >= self.undecided[0][0] + 1:
+            start, _, text = self.undecided.popleft()
+            if text and not self._near(start):
+                self._push(start, 1, [{
+                    "timestamp": start,
+                    "formatted_time": format_timestamp(start),
+                    "type": "speech",
+                    "speech": text,
+                    "equation": None
+                }])
+                bisect.insort(self.nearby, start)
+        
+        # Forget what no future event can need
+        while self.segments and self.segments[0][1] + self.time_window < equations_mark:
+            self.segments.popleft()
+        horizon = min([transcript_mark] + [start for start, _, _ in self.undecided])
+        del self.nearby[:bisect.bisect_left(self.nearby, horizon - 1)]
+        
+        # Nothing still to come can sort before this time
+        emit_before = min(
+            [equations_mark, transcript_mark] +
+            [waiting[0] for waiting in self.waiting_equations] +
+            [start for start, _, _ in self.undecided]
+        )
+        
+        self.max_buffered = max(self.max_buffered, self.buffered())
+        entries = []
+        while self.ready and self.ready[0][0] < emit_before:
+            entries.append(heapq.heappop(self.ready)[3])
+        self.emitted += len(entries)
+        return entries
+    
+    def buffered(self):
+        """Number of equations, segments, timestamps and entries held in memory"""
+        return (len(self.waiting_equations) + len(self.segments) + len(self.undecided) +
+                len(self.nearby) + len(self.ready))
+    
+    def stats(self):
+        """Return event, emission and buffering counters"""
+        return {
+            "events": self.events,
+            "late_events": self.late_events,
+            "entries_emitted": self.emitted,
+            "buffered": self.buffered(),
+            "max_buffered": self.max_buffered,
+            "watermarks": {
+                source: self.watermark(source) if math.isfinite(self.watermark(source)) else None
+                for source in self.marks
+            }
+        }
+
+def run_stream(lines, output, time_window=10, lateness=0):
+    """
+    Run a StreamingMerger over NDJSON events, writing NDJSON entries
+    
+    Each input line is one event:
+        {"type": "equation", ...OCR result...}
+        {"type": "segment", "start": ..., "end": ..., "text": ...}
+        {"type": "watermark", "source": "equations"|"transcript", "time": ...}
+        {"type": "end", "source": "equations"|"transcript"} (no source = both)
+    
+    Every finished timeline entry is written and flushed as one line; a final
+    line with "done": true carries the totals. Input ending counts as both
+    sources finishing.
     
     Args:
-        merged_data: Merged timeline data
+        lines: Iterable of NDJSON lines (e.g. sys.stdin)
+        output: Text stream to write to
+        time_window: Time window in seconds to match equations with speech
+        lateness: See StreamingMerger
+    
+    Returns:
+        dict: Final summary
+    """
+    merger = StreamingMerger(time_window, lateness)
+    invalid = 0
+    
+    def write(entries):
+        for entry in entries:
+            output.write(json.dumps(entry) + "\n")
+        if entries:
+            output.flush()
+    
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            event = json.loads(line)
+            kind = event.get("type")
+            if kind == "equation":
+                write(merger.add_equation(event))
+            elif kind == "segment":
+                write(merger.add_segment(event))
+            elif kind == "watermark":
+                write(merger.advance(event["source"], event["time"]))
+            elif kind == "end":
+                write(merger.finish(event.get("source")))
+            else:
+                raise ValueError(f"Unknown event type: {kind}")
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            invalid += 1
+            print(f"Skipping invalid event: {e}", file=sys.stderr)
+    
+    write(merger.finish())
+    summary = {
+        "success": True,
+        "done": True,
+        "total_entries": merger.emitted,
+        "invalid_events": invalid,
+        "stats": merger.stats()
+    }
+    output.write(json.dumps(summary) + "\n")
+    output.flush()
+    return summary
+
+def markdown_entry(item, include_timestamps=True):
+    """Markdown section for one timeline entry"""
+    parts = []
+    if include_timestamps:
+        parts.append(f"## 🕒 {item['formatted_time']}\n\n")
+    
+    if item.get("equation"):
+        parts.append(f"**Equation:** `{item['equation']}`\n\n")
+        if item.get("speech"):
+            parts.append(f"**Context:** {item['speech']}\n\n")
+    else:
+        parts.append(f"{item.get('speech', '')}\n\n")
+    
+    parts.append("---\n\n")
+    return "".join(parts)
+
+def write_markdown_summary(merged_data, output, include_timestamps=True):
+    """
+    Write the markdown summary one entry at a time
+    
+    Args:
+        merged_data: Merged timeline data; its "timeline" may be any iterable
+            of entries (e.g. a StreamingMerger feed)
+        output: Text stream to write to
         include_timestamps: Whether to include timestamps
     
     Returns:
-        str: Markdown formatted summary
+        int: Number of entries written
     """
     if not merged_data.get("success"):
-        return "# Error\n\nFailed to generate summary."
+        output.write("# Error\n\nFailed to generate summary.")
+        return 0
     
     timeline = merged_data.get("timeline", [])
+    total = len(timeline) if hasattr(timeline, "__len__") else None
     
-    markdown = "# Video Summary with Equations\n\n"
-    markdown += f"**Total Entries:** {len(timeline)}\n\n"
-    markdown += "---\n\n"
+    output.write("# Video Summary with Equations\n\n")
+    if total is not None:
+        output.write(f"**Total Entries:** {total}\n\n")
+    output.write("---\n\n")
     
+    count = 0
     for item in timeline:
-        if include_timestamps:
-            markdown += f"## 🕒 {item['formatted_time']}\n\n"
-        
-        if item.get("equation"):
-            markdown += f"**Equation:** `{item['equation']}`\n\n"
-            if item.get("speech"):
-                markdown += f"**Context:** {item['speech']}\n\n"
-        else:
-            markdown += f"{item.get('speech', '')}\n\n"
-        
-        markdown += "---\n\n"
+        output.write(markdown_entry(item, include_timestamps))
+        count += 1
     
-    return markdown
+    # An entry iterator is only counted once it is exhausted
+    if total is None:
+        output.write(f"**Total Entries:** {count}\n\n")
+    return count
+
+def write_timeline_json(merged_data, output):
+    """
+    Write the merged result as compact JSON, one timeline entry per line
+    
+    Parses to the same object as json.dumps(merged_data) without building the
+    whole document in memory.
+    
+    Args:
+        merged_data: Merged timeline data
+        output: Text stream to write to
+    
+    Returns:
+        int: Number of entries written
+    """
+    header = {key: value for key, value in merged_data.items() if key != "timeline"}
+    output.write(json.dumps(header)[:-1])
+    output.write(", " if header else "")
+    output.write('"timeline": [')
+    
+    count = 0
+    for item in merged_data.get("timeline", []):
+        output.write(",\n" if count else "\n")
+        output.write(json.dumps(item))
+        count += 1
+    
+    output.write("\n]}\n" if count else "]}\n")
+    return count
+
+def write_timeline_ndjson(entries, output):
+    """
+    Write timeline entries as NDJSON, one entry per line
+    
+    Returns:
+        int: Number of entries written
+    """
+    count = 0
+    for item in entries:
+        output.write(json.dumps(item) + "\n")
+        count += 1
+    return count
+
+def summary_equation(item):
+    """JSON summary item for one equation entry"""
+    return {"time": item["formatted_time"], "equation": item["equation"], "context": item.get("speech", "")}
+
+def summary_segment(item):
+    """JSON summary item for one transcript entry"""
+    return {"time": item["formatted_time"], "text": item["speech"]}
+
+def write_json_summary(merged_data, output):
+    """
+    Write generate_json_summary() output as compact JSON, one item at a time
+    
+    The timeline is read three times (counts, equations, transcript) instead
+    of being copied into intermediate lists, so it must be a list.
+    
+    Args:
+        merged_data: Merged timeline data
+        output: Text stream to write to
+    
+    Returns:
+        int: Number of equations written
+    """
+    timeline = merged_data.get("timeline", [])
+    
+    def write_items(items):
+        output.write("[")
+        for index, item in enumerate(items):
+            output.write(",\n" if index else "\n")
+            output.write(json.dumps(item))
+        output.write("]")
+    
+    total_equations = sum(1 for item in timeline if item.get("equation"))
+    output.write('{"summary": {')
+    output.write(f'"total_equations": {total_equations}, "total_segments": {len(timeline)}, "equations": ')
+    write_items(summary_equation(item) for item in timeline if item.get("equation"))
+    output.write(', "transcript": ')
+    write_items(summary_segment(item) for item in timeline if item.get("speech") and not item.get("equation"))
+    output.write("}}\n")
+    return total_equations
+
+@contextlib.contextmanager
+def open_output(path=None, compress=None):
+    """
+    Open a text stream for a writer: a file, or stdout when path is None or "-"
+    
+    Args:
+        path: Output file path
+        compress: Gzip the output (None = only when path ends in .gz)
+    
+    Yields:
+        Text stream (UTF-8)
+    """
+    to_stdout = path in (None, "-")
+    if compress is None:
+        compress = not to_stdout and str(path).endswith(".gz")
+    
+    if to_stdout and not compress:
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+    
+    if to_stdout:
+        raw = gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb", compresslevel=GZIP_LEVEL)
+    elif compress:
+        raw = gzip.open(path, "wb", compresslevel=GZIP_LEVEL)
+    else:
+        raw = open(path, "wb")
+    stream = io.TextIOWrapper(raw, encoding="utf-8", newline="\n")
+    try:
+        yield stream
+    finally:
+        stream.close()
+        if to_stdout:
+            sys.stdout.buffer.flush()
+
+def generate_markdown_summary(merged_data, include_timestamps=True):
+    """
+    Generate a markdown summary from merged data
+    
+    Args:
+        merged_data: Merged timeline data
+        include_timestamps: Whether to include timestamps
+    
+    Returns:
+        str: Markdown formatted summary
+    """
+    output = io.StringIO()
+    write_markdown_summary(merged_data, output, include_timestamps)
+    return output.getvalue()
 
 def generate_json_summary(merged_data):
     """
@@ -195,20 +935,10 @@ def generate_json_summary(merged_data):
     """
     timeline = merged_data.get("timeline", [])
     
-    equations = [
-        {
-            "time": item["formatted_time"],
-            "equation": item["equation"],
-            "context": item.get("speech", "")
-        }
-        for item in timeline if item.get("equation")
-    ]
+    equations = [summary_equation(item) for item in timeline if item.get("equation")]
     
     transcript_segments = [
-        {
-            "time": item["formatted_time"],
-            "text": item["speech"]
-        }
+        summary_segment(item)
         for item in timeline if item.get("speech") and not item.get("equation")
     ]
     
@@ -222,32 +952,54 @@ def generate_json_summary(merged_data):
     }
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print(json.dumps({
-            "success": False,
-            "error": "Usage: python equation_transcript_merger.py <equations_json> <transcript_json> [output_format]"
-        }))
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Merge extracted equations with a lecture transcript")
+    parser.add_argument("equations_json", nargs="?")
+    parser.add_argument("transcript_json", nargs="?")
+    parser.add_argument("output_format", nargs="?", default="json", choices=OUTPUT_FORMATS,
+                        help="json (the merged result), markdown, ndjson (one entry per line) or "
+                             "summary (the structured JSON summary)")
+    parser.add_argument("--engine", default="python", choices=MERGE_ENGINES,
+                        help="Merge engine; numpy is faster on very long lectures")
+    parser.add_argument("--stream", action="store_true",
+                        help="Merge NDJSON events from stdin incrementally, writing NDJSON entries")
+    parser.add_argument("--time-window", type=float, default=10)
+    parser.add_argument("--lateness", type=float, default=0,
+                        help="Seconds an event may lag its source in --stream mode")
+    parser.add_argument("--output", help="Write to this file instead of stdout (.gz is compressed)")
+    parser.add_argument("--gzip", action="store_true", help="Gzip the output")
+    args = parser.parse_args()
+    compress = True if args.gzip else None
     
-    equations_file = sys.argv[1]
-    transcript_file = sys.argv[2]
-    output_format = sys.argv[3] if len(sys.argv) > 3 else "json"
+    if args.stream:
+        with open_output(args.output, compress) as output:
+            run_stream(sys.stdin, output, args.time_window, args.lateness)
+        sys.exit(0)
+    
+    if not args.equations_json or not args.transcript_json:
+        parser.error("equations_json and transcript_json are required unless --stream is given")
     
     # Load data
-    with open(equations_file, 'r') as f:
+    with open(args.equations_json, 'r') as f:
         equations_data = json.load(f)
     
-    with open(transcript_file, 'r') as f:
+    with open(args.transcript_json, 'r') as f:
         transcript_data = json.load(f)
     
     # Merge data
     merged = merge_equations_with_transcript(
         equations_data.get("results", []),
-        transcript_data
+        transcript_data,
+        args.time_window,
+        engine=args.engine
     )
     
-    # Output in requested format
-    if output_format == "markdown":
-        print(generate_markdown_summary(merged))
-    else:
-        print(json.dumps(merged, indent=2))
+    # Output in requested format, one entry at a time
+    with open_output(args.output, compress) as output:
+        if args.output_format == "markdown":
+            write_markdown_summary(merged, output)
+        elif args.output_format == "ndjson":
+            write_timeline_ndjson(merged.get("timeline", []), output)
+        elif args.output_format == "summary":
+            write_json_summary(merged, output)
+        else:
+            write_timeline_json(merged, output)
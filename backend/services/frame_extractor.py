@@ -6,9 +6,162 @@ import cv2
 import os
 import sys
 import json
+import time
+import argparse
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def extract_frames_smart(video_path, output_folder, num_frames=10, min_gap_seconds=10):
+from scene_detectors import DETECTORS, DOWNSCALE_WIDTH, ADAPTIVE_WINDOW, ADAPTIVE_SENSITIVITY, create_detector
+
+# Seeking decodes forward from the nearest keyframe (typically 2-10 s apart in
+# H.264), so it only beats decoding forward when samples are further apart
+SEEK_MIN_GAP_SECONDS = 10.0
+
+# When samples are this dense nearly every frame is kept anyway, so plain
+# read() in a single forward pass is cheapest
+SEQUENTIAL_MAX_GAP_FRAMES = 2
+
+SAMPLING_STRATEGIES = ["auto", "seek", "grab", "sequential"]
+
+# Sharded extraction never splits the video into ranges shorter than this,
+# since each shard pays for its own capture open and keyframe seek
+MIN_SHARD_FRAMES = 250
+
+# Scene shards spool detector signatures to a file in batches of this many, so
+# neither the worker nor the parent ever holds a whole shard's worth
+SIGNATURE_BATCH = 256
+
+def choose_sampling_strategy(positions, fps):
+    """
+    Pick how to reach a sorted list of frame positions
+
+    Args:
+        positions: Sorted frame indices to sample
+        fps: Video frame rate
+
+    Returns:
+        str: "seek" (keyframe-aligned seek per sample), "grab" (one forward
+        pass that decodes skipped frames without colour conversion) or
+        "sequential" (one forward pass reading every frame)
+    """
+    if len(positions) < 2:
+        return "seek"
+
+    average_gap = (positions[-1] - positions[0]) / (len(positions) - 1)
+
+    if average_gap >= SEEK_MIN_GAP_SECONDS * fps:
+        return "seek"
+    if average_gap <= SEQUENTIAL_MAX_GAP_FRAMES:
+        return "sequential"
+    return "grab"
+
+def read_frames_at(cap, positions, strategy, stats):
+    """
+    Yield (position, frame) for each requested frame position
+
+    Args:
+        cap: Open cv2.VideoCapture
+        positions: Sorted frame indices to sample
+        strategy: "seek", "grab" or "sequential"
+        stats: Dict updated with "decode_seconds" spent reaching and decoding frames
+
+    Yields:
+        tuple: (actual frame position, BGR frame)
+    """
+    stats.setdefault("decode_seconds", 0.0)
+
+    if strategy == "seek":
+        for target in positions:
+            started = time.perf_counter()
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            ret, frame = cap.read()
+            # The decoder may land near rather than on the target; report
+            # where it actually is so timestamps stay accurate
+            actual = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+            stats["decode_seconds"] += time.perf_counter() - started
+
+            if not ret:
+                print(f"Failed to read frame at position {target}", file=sys.stderr)
+                continue
+            yield (actual if actual >= 0 else target), frame
+        return
+
+    started = time.perf_counter()
+    current = 0
+    if positions and positions[0] > 0:
+        # One seek to the first sample, then decode forward from there
+        cap.set(cv2.CAP_PROP_POS_FRAMES, positions[0])
+        current = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+
+    for target in positions:
+        ok = True
+        while current < target:
+            # grab() decodes without the BGR conversion/copy that read() does
+            ok = cap.read()[0] if strategy == "sequential" else cap.grab()
+            if not ok:
+                break
+            current += 1
+
+        if not ok:
+            break
+
+        ret, frame = cap.read()
+        current += 1
+        stats["decode_seconds"] += time.perf_counter() - started
+
+        if not ret:
+            print(f"Failed to read frame at position {target}", file=sys.stderr)
+            break
+        yield current - 1, frame
+        started = time.perf_counter()
+
+def smart_positions(total_frames, fps, num_frames=10, min_gap_seconds=10):
+    """
+    Sorted frame positions sampled evenly across the video for smart extraction
+
+    Args:
+        total_frames: Number of frames in the video
+        fps: Video frame rate
+        num_frames: Maximum number of frames to sample
+        min_gap_seconds: Minimum time gap between frames in seconds (best-effort)
+
+    Returns:
+        list: Unique frame indices in ascending order
+    """
+    duration = total_frames / fps
+
+    # Respect the minimum gap as an upper bound on how many frames
+    # we can reasonably sample.
+    if min_gap_seconds > 0:
+        max_by_gap = max(1, int(duration // min_gap_seconds) + 1)
+    else:
+        max_by_gap = num_frames
+
+    target_frames = max(1, min(num_frames, max_by_gap))
+
+    # Compute evenly spaced timestamps across the video, avoiding
+    # the very beginning and very end by using N+1 segments and
+    # sampling the internal points.
+    timestamps = []
+    if target_frames == 1:
+        timestamps = [duration / 2.0]
+    else:
+        segment = duration / float(target_frames + 1)
+        for i in range(1, target_frames + 1):
+            timestamps.append(segment * i)
+
+    frame_positions = []
+    for t in timestamps:
+        frame_idx = int(t * fps)
+        frame_idx = max(0, min(frame_idx, total_frames - 1))
+        frame_positions.append(frame_idx)
+
+    # Remove any accidental duplicates
+    return sorted(set(frame_positions))
+
+def extract_frames_smart(video_path, output_folder, num_frames=10, min_gap_seconds=10, strategy="auto"):
     """Extract a small number of frames, evenly distributed across the video.
 
     This is used for "smart" visual analysis: a limited set of
@@ -20,6 +173,8 @@ def extract_frames_smart(video_path, output_folder, num_frames=10, min_gap_secon
         output_folder: Directory to save extracted frames
         num_frames: Maximum number of frames to extract (default: 10)
         min_gap_seconds: Minimum time gap between frames in seconds (best-effort)
+        strategy: How to reach each sample: "seek", "grab", "sequential" or
+            "auto" to choose from the sampling density
 
     Returns:
         dict: Information about extracted frames
@@ -50,41 +205,10 @@ def extract_frames_smart(video_path, output_folder, num_frames=10, min_gap_secon
                 "frames_extracted": 0
             }
 
-        # Respect the minimum gap as an upper bound on how many frames
-        # we can reasonably sample.
-        if min_gap_seconds > 0:
-            max_by_gap = max(1, int(duration // min_gap_seconds) + 1)
-        else:
-            max_by_gap = num_frames
-
-        target_frames = max(1, min(num_frames, max_by_gap))
+        frame_positions = smart_positions(total_frames, fps, num_frames, min_gap_seconds)
 
-        # Compute evenly spaced timestamps across the video, avoiding
-        # the very beginning and very end by using N+1 segments and
-        # sampling the internal points.
-        timestamps = []
-        if target_frames == 1:
-            timestamps = [duration / 2.0]
-        else:
-            segment = duration / float(target_frames + 1)
-            for i in range(1, target_frames + 1):
-                timestamps.append(segment * i)
-
-        frame_positions = []
-        for t in timestamps:
-            frame_idx = int(t * fps)
-            frame_idx = max(0, min(frame_idx, total_frames - 1))
-            frame_positions.append(frame_idx)
-
-        # Remove any accidental duplicates while preserving order
-        seen = set()
-        unique_positions = []
-        for pos in frame_positions:
-            if pos not in seen:
-                seen.add(pos)
-                unique_positions.append(pos)
-
-        frame_positions = unique_positions
+        if strategy == "auto":
+            strategy = choose_sampling_strategy(frame_positions, fps)
 
         print(f"Video FPS: {fps}", file=sys.stderr)
         print(f"Total frames: {total_frames}", file=sys.stderr)
@@ -92,19 +216,13 @@ def extract_frames_smart(video_path, output_folder, num_frames=10, min_gap_secon
         print(f"Smart frame extraction - requested: {num_frames}, using: {len(frame_positions)}", file=sys.stderr)
         print(f"Minimum gap (seconds): {min_gap_seconds}", file=sys.stderr)
         print(f"Frame positions (indices): {frame_positions}", file=sys.stderr)
+        print(f"Sampling strategy: {strategy}", file=sys.stderr)
 
         saved = 0
         frame_info = []
+        decode_stats = {}
 
-        for idx, target_frame in enumerate(frame_positions):
-            # Seek to target frame
-            cap.set(cv2.CAP_PROP_POS_FRAMES, target_frame)
-            ret, frame = cap.read()
-
-            if not ret:
-                print(f"Failed to read frame at position {target_frame}", file=sys.stderr)
-                continue
-
+        for target_frame, frame in read_frames_at(cap, frame_positions, strategy, decode_stats):
             timestamp = target_frame / fps
             frame_name = f"frame_{saved:04d}.jpg"
             frame_path = os.path.join(output_folder, frame_name)
@@ -124,6 +242,8 @@ def extract_frames_smart(video_path, output_folder, num_frames=10, min_gap_secon
 
         cap.release()
 
+        decode_seconds = decode_stats.get("decode_seconds", 0.0)
+
         return {
             "success": True,
             "frames_extracted": saved,
@@ -131,6 +251,9 @@ def extract_frames_smart(video_path, output_folder, num_frames=10, min_gap_secon
             "fps": fps,
             "total_video_frames": total_frames,
             "method": "smart_even_distribution",
+            "sampling_strategy": strategy,
+            "decode_seconds": round(decode_seconds, 3),
+            "decode_ms_per_frame": round(decode_seconds / saved * 1000, 2) if saved else None,
             "num_frames_requested": num_frames,
             "min_gap_seconds": min_gap_seconds,
             "output_folder": output_folder,
@@ -144,6 +267,74 @@ def extract_frames_smart(video_path, output_folder, num_frames=10, min_gap_secon
             "frames_extracted": 0
         }
 
+def interval_frames(cap, fps, interval, max_frames):
+    """
+    Yield (position, frame) every interval seconds from the start of the video
+
+    Skipped frames are only grabbed (decoded, never converted to BGR).
+    """
+    frame_interval = max(1, int(fps * interval))
+    count = 0
+    yielded = 0
+    
+    while cap.isOpened() and yielded < max_frames:
+        if count % frame_interval != 0:
+            if not cap.grab():
+                break
+            count += 1
+            continue
+        
+        ret, frame = cap.read()
+        if not ret:
+            break
+        
+        yield count, frame
+        yielded += 1
+        count += 1
+
+def scene_frames(cap, scene_detector, stride, max_frames, stats):
+    """
+    Yield (position, frame, distance) for the first frame and every scene change
+
+    Args:
+        cap: Open cv2.VideoCapture positioned at the first frame
+        scene_detector: SceneDetector deciding what counts as a change
+        stride: Compare every Nth frame; frames in between are only grabbed
+        max_frames: Maximum number of frames to yield
+        stats: Dict updated with "frames_compared" and "detect_seconds"
+
+    Yields:
+        tuple: (frame position, BGR frame, distance or None for the first frame)
+    """
+    stats.setdefault("frames_compared", 0)
+    stats.setdefault("detect_seconds", 0.0)
+    count = 0
+    yielded = 0
+    
+    while cap.isOpened() and yielded < max_frames:
+        # Frames between strides are grabbed without being retrieved
+        if count % stride != 0:
+            if not cap.grab():
+                break
+            count += 1
+            continue
+        
+        ret, frame = cap.read()
+        if not ret:
+            break
+        
+        # Compare a downscaled signature against the last scene change
+        detect_start = time.perf_counter()
+        changed, distance = scene_detector.observe(scene_detector.signature(frame))
+        stats["detect_seconds"] += time.perf_counter() - detect_start
+        stats["frames_compared"] += 1
+        
+        if changed:
+            yield count, frame, distance
+            yielded += 1
+        
+        count += 1
+
 def extract_frames(video_path, output_folder, interval=3, max_frames=50):
     """
     Extract frames from video at regular intervals
@@ -176,8 +367,6 @@ def extract_frames(video_path, output_folder, interval=3, max_frames=50):
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         duration = total_frames / fps if fps > 0 else 0
         
-        frame_interval = fps * interval
-        count = 0
         saved = 0
         frame_info = []
         
@@ -186,30 +375,23 @@ def extract_frames(video_path, output_folder, interval=3, max_frames=50):
         print(f"Duration: {duration:.2f} seconds", file=sys.stderr)
         print(f"Extracting frames every {interval} seconds...", file=sys.stderr)
         
-        while cap.isOpened() and saved < max_frames:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
+        for position, frame in interval_frames(cap, fps, interval, max_frames):
             # Save frame at specified interval
-            if count % frame_interval == 0:
-                timestamp = count / fps
-                frame_name = f"frame_{saved:04d}.jpg"
-                frame_path = os.path.join(output_folder, frame_name)
-                
-                cv2.imwrite(frame_path, frame)
-                
-                frame_info.append({
-                    "frame_number": saved,
-                    "timestamp": timestamp,
-                    "filename": frame_name,
-                    "path": frame_path
-                })
-                
-                print(f"Saved frame {saved} at {timestamp:.2f}s", file=sys.stderr)
-                saved += 1
+            timestamp = position / fps
+            frame_name = f"frame_{saved:04d}.jpg"
+            frame_path = os.path.join(output_folder, frame_name)
             
-            count += 1
+            cv2.imwrite(frame_path, frame)
+            
+            frame_info.append({
+                "frame_number": saved,
+                "timestamp": timestamp,
+                "filename": frame_name,
+                "path": frame_path
+            })
+            
+            print(f"Saved frame {saved} at {timestamp:.2f}s", file=sys.stderr)
+            saved += 1
         
         cap.release()
         
@@ -230,21 +412,34 @@ def extract_frames(video_path, output_folder, interval=3, max_frames=50):
             "frames_extracted": 0
         }
 
-def extract_frames_with_scene_detection(video_path, output_folder, threshold=30.0, max_frames=50):
+def extract_frames_with_scene_detection(video_path, output_folder, threshold=None, max_frames=50, stride=1,
+                                        detector="absdiff", adaptive=False, window=ADAPTIVE_WINDOW,
+                                        sensitivity=ADAPTIVE_SENSITIVITY, downscale_width=DOWNSCALE_WIDTH):
     """
     Extract frames based on scene changes (more intelligent extraction)
     
     Args:
         video_path: Path to video file
         output_folder: Directory to save extracted frames
-        threshold: Scene change threshold (higher = less sensitive)
+        threshold: Scene change threshold in the detector's units (None = detector default)
         max_frames: Maximum number of frames to extract
+        stride: Compare every Nth frame; frames in between are only grabbed
+        detector: absdiff, histogram, dhash or phash
+        adaptive: Raise/lower the threshold from rolling distance statistics
+        window: Number of recent distances used in adaptive mode
+        sensitivity: Standard deviations above the rolling mean for a change
+        downscale_width: Width frames are shrunk to before comparison
     
     Returns:
         dict: Information about extracted frames
     """
     try:
         os.makedirs(output_folder, exist_ok=True)
+        stride = max(1, int(stride))
+        scene_detector = create_detector(
+            detector, threshold=threshold, adaptive=adaptive, window=window,
+            sensitivity=sensitivity, downscale_width=downscale_width
+        )
         
         cap = cv2.VideoCapture(video_path)
         
@@ -259,79 +454,54 @@ def extract_frames_with_scene_detection(video_path, output_folder, threshold=30.
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         duration = total_frames / fps if fps > 0 else 0
         
-        ret, prev_frame = cap.read()
-        if not ret:
-            return {
-                "success": False,
-                "error": "Failed to read first frame",
-                "frames_extracted": 0
-            }
-        
-        prev_gray = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-        
-        count = 1
         saved = 0
         frame_info = []
+        stats = {}
         
-        # Save first frame
-        frame_name = f"frame_{saved:04d}.jpg"
-        frame_path = os.path.join(output_folder, frame_name)
-        cv2.imwrite(frame_path, prev_frame)
-        frame_info.append({
-            "frame_number": saved,
-            "timestamp": 0.0,
-            "filename": frame_name,
-            "path": frame_path,
-            "scene_change": True
-        })
-        saved += 1
-        
-        print(f"Detecting scene changes (threshold: {threshold})...", file=sys.stderr)
+        print(f"Detecting scene changes (detector: {scene_detector.name}, threshold: {scene_detector.threshold}, "
+              f"adaptive: {adaptive}, stride: {stride})...", file=sys.stderr)
         
-        while cap.isOpened() and saved < max_frames:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Convert to grayscale for comparison
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            # Calculate frame difference
-            frame_diff = cv2.absdiff(prev_gray, gray)
-            mean_diff = frame_diff.mean()
+        for position, frame, distance in scene_frames(cap, scene_detector, stride, max_frames, stats):
+            timestamp = position / fps
+            frame_name = f"frame_{saved:04d}.jpg"
+            frame_path = os.path.join(output_folder, frame_name)
             
-            # If significant change detected, save frame
-            if mean_diff > threshold:
-                timestamp = count / fps
-                frame_name = f"frame_{saved:04d}.jpg"
-                frame_path = os.path.join(output_folder, frame_name)
-                
-                cv2.imwrite(frame_path, frame)
-                
-                frame_info.append({
-                    "frame_number": saved,
-                    "timestamp": timestamp,
-                    "filename": frame_name,
-                    "path": frame_path,
-                    "scene_change": True,
-                    "diff_score": float(mean_diff)
-                })
-                
-                print(f"Scene change detected at {timestamp:.2f}s (diff: {mean_diff:.2f})", file=sys.stderr)
-                saved += 1
-                prev_gray = gray
+            cv2.imwrite(frame_path, frame)
             
-            count += 1
+            info = {
+                "frame_number": saved,
+                "timestamp": timestamp,
+                "filename": frame_name,
+                "path": frame_path,
+                "scene_change": True
+            }
+            if distance is not None:
+                info["diff_score"] = distance
+                print(f"Scene change detected at {timestamp:.2f}s (diff: {distance:.2f})", file=sys.stderr)
+            frame_info.append(info)
+            saved += 1
         
         cap.release()
         
+        if not saved:
+            return {
+                "success": False,
+                "error": "Failed to read first frame",
+                "frames_extracted": 0
+            }
+        
+        compared = stats["frames_compared"]
+        
         return {
             "success": True,
             "frames_extracted": saved,
             "video_duration": duration,
             "fps": fps,
             "method": "scene_detection",
-            "threshold": threshold,
+            **scene_detector.describe(),
+            "stride": stride,
+            "frames_compared": compared,
+            "detect_ms_per_frame": round(stats["detect_seconds"] * 1000 / compared, 3),
             "output_folder": output_folder,
             "frames": frame_info
         }
@@ -343,6 +513,447 @@ def extract_frames_with_scene_detection(video_path, output_folder, threshold=30.
             "frames_extracted": 0
         }
 
+def scene_detector_settings(options):
+    """Split scene options into a detector name and create_detector() keyword arguments"""
+    return options.get("detector", "absdiff"), {
+        "threshold": options.get("threshold"),
+        "adaptive": options.get("adaptive", False),
+        "window": options.get("window", ADAPTIVE_WINDOW),
+        "sensitivity": options.get("sensitivity", ADAPTIVE_SENSITIVITY),
+        "downscale_width": options.get("downscale_width", DOWNSCALE_WIDTH)
+    }
+
+def iter_video_frames(video_path, method="scene", info=None, **options):
+    """
+    Yield extracted frames as decoded arrays instead of writing JPEG files
+
+    Args:
+        video_path: Path to video file
+        method: "scene", "interval" or "smart"
+        info: Optional dict filled with fps, total_frames, video_duration and
+            the method's settings and decode statistics
+        **options: Settings of the matching extractor (interval, max_frames,
+            num_frames, min_gap_seconds, strategy, threshold, stride, detector, ...)
+
+    Yields:
+        dict: frame_number, timestamp, video_position, frame (BGR ndarray) and
+        diff_score for scene changes after the first frame
+    """
+    info = info if info is not None else {}
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError("Failed to open video file")
+
+    try:
+        fps = int(cap.get(cv2.CAP_PROP_FPS))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if fps == 0:
+            raise RuntimeError("Invalid video file (no fps)")
+        info.update({"fps": fps, "total_frames": total_frames, "video_duration": total_frames / fps})
+
+        if method == "smart":
+            positions = smart_positions(total_frames, fps, options.get("num_frames", 10),
+                                        options.get("min_gap_seconds", 10))
+            strategy = options.get("strategy", "auto")
+            if strategy == "auto":
+                strategy = choose_sampling_strategy(positions, fps)
+            info.update({"method": "smart_even_distribution", "sampling_strategy": strategy})
+            frames = ((position, frame, None) for position, frame in read_frames_at(cap, positions, strategy, info))
+        elif method == "scene":
+            stride = max(1, int(options.get("stride", 1)))
+            detector_name, detector_options = scene_detector_settings(options)
+            scene_detector = create_detector(detector_name, **detector_options)
+            info.update({"method": "scene_detection", **scene_detector.describe(), "stride": stride})
+            frames = scene_frames(cap, scene_detector, stride, options.get("max_frames", 50), info)
+        else:
+            info.update({"interval": options.get("interval", 3)})
+            frames = (
+                (position, frame, None)
+                for position, frame in interval_frames(cap, fps, options.get("interval", 3), options.get("max_frames", 50))
+            )
+
+        for frame_number, (position, frame, distance) in enumerate(frames):
+            item = {
+                "frame_number": frame_number,
+                "timestamp": position / fps,
+                "video_position": position,
+                "frame": frame
+            }
+            if distance is not None:
+                item["diff_score"] = distance
+            yield item
+    finally:
+        cap.release()
+
+def plan_shards(total_frames, workers, min_shard_frames=MIN_SHARD_FRAMES):
+    """
+    Split the frame range [0, total_frames) into contiguous shards
+
+    Args:
+        total_frames: Number of frames in the video
+        workers: Desired number of shards
+        min_shard_frames: Shards are never made shorter than this
+
+    Returns:
+        list: (start, end) frame ranges covering the whole video in order
+    """
+    shards = max(1, min(workers, total_frames // max(1, min_shard_frames)))
+    bounds = [round(total_frames * i / shards) for i in range(shards + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(shards)]
+
+def _seek(cap, position):
+    """Seek to a frame position and return where the decoder actually is"""
+    if position > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+    current = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    # Decode forward if the seek landed short of the target
+    while current < position and cap.grab():
+        current += 1
+    return current
+
+def _extract_shard(task):
+    """
+    Decode one shard of a video in a worker process
+
+    "positions" tasks save the requested frames under their final names.
+    "scene" tasks compute a detector signature for every stride-th frame,
+    spool them to a temporary file in SIGNATURE_BATCH batches, and save up to
+    max_writes of the frames this shard considers scene changes under
+    temporary names; the parent replays the signatures from the file to make
+    the global decision and re-reads any kept frame the shard did not save.
+
+    Args:
+        task: Dict with video_path, output_folder, start, end, mode and the
+            mode's settings (positions/strategy or stride/detector/max_writes)
+
+    Returns:
+        dict: Saved frames, the signature file (scene mode, None otherwise)
+        and decode timing
+    """
+    started = time.perf_counter()
+    cap = cv2.VideoCapture(task["video_path"])
+    if not cap.isOpened():
+        raise RuntimeError(f"Failed to open video file in shard {task['start']}-{task['end']}")
+
+    result = {"start": task["start"], "end": task["end"], "frames": [], "signatures": None}
+
+    if task["mode"] == "positions":
+        names = dict(task["positions"])
+        stats = {}
+        for position, frame in read_frames_at(cap, sorted(names), task["strategy"], stats):
+            frame_name = names.get(position) or names[min(names, key=lambda target: abs(target - position))]
+            cv2.imwrite(os.path.join(task["output_folder"], frame_name), frame)
+            result["frames"].append((position, frame_name))
+        result["frames_decoded"] = len(result["frames"])
+    else:
+        stride = task["stride"]
+        local_detector = create_detector(task["detector"], **task["detector_options"])
+        handle, result["signatures"] = tempfile.mkstemp(
+            prefix=f"signatures_{task['start']:08d}_", suffix=".pkl", dir=task["output_folder"]
+        )
+        try:
+            with os.fdopen(handle, "wb") as spool:
+                batch = []
+                position = _seek(cap, task["start"])
+                decoded = 0
+                while position < task["end"]:
+                    if position % stride != 0:
+                        if not cap.grab():
+                            break
+                        position += 1
+                        continue
+
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    signature = local_detector.signature(frame)
+                    batch.append((position, signature))
+                    if len(batch) >= SIGNATURE_BATCH:
+                        pickle.dump(batch, spool, pickle.HIGHEST_PROTOCOL)
+                        batch = []
+                    changed, _ = local_detector.observe(signature)
+                    # No more than max_frames of these can be kept globally
+                    if changed and len(result["frames"]) < task["max_writes"]:
+                        frame_name = f"scene_{position:08d}.jpg"
+                        cv2.imwrite(os.path.join(task["output_folder"], frame_name), frame)
+                        result["frames"].append((position, frame_name))
+                    decoded += 1
+                    position += 1
+                if batch:
+                    pickle.dump(batch, spool, pickle.HIGHEST_PROTOCOL)
+        except BaseException:
+            os.remove(result["signatures"])
+            raise
+        result["frames_decoded"] = decoded
+
+    cap.release()
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+def _read_signatures(path):
+    """Yield the (position, signature) pairs a scene shard spooled, one batch in memory at a time"""
+    with open(path, "rb") as spool:
+        while True:
+            try:
+                batch = pickle.load(spool)
+            except EOFError:
+                return
+            yield from batch
+
+def extract_frames_sharded(video_path, output_folder, method="scene", workers=None, **options):
+    """
+    Extract frames by decoding contiguous ranges of the video in parallel processes
+
+    Each worker opens its own capture and decodes one range. Interval and smart
+    frames are numbered up front, so workers save them under their final names.
+    For scene detection, workers spool a signature for every compared frame
+    to a temporary file; the parent streams each shard's file back in order,
+    as soon as that shard and all before it are done, through a single
+    detector so scene state carries across shard boundaries, and then deletes
+    it. Once max_frames
+    frames are kept, shards not yet started are cancelled. The kept frames
+    are renamed (or re-read when a shard did not save them) and the rest
+    deleted.
+
+    Args:
+        video_path: Path to video file
+        output_folder: Directory to save extracted frames
+        method: "scene", "interval" or "smart"
+        workers: Number of processes (None = one per CPU core)
+        **options: Settings of the matching single-process extractor
+
+    Returns:
+        dict: Same shape as the single-process extractor, plus shard timings
+    """
+    try:
+        os.makedirs(output_folder, exist_ok=True)
+        workers = workers or os.cpu_count() or 1
+
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            return {
+                "success": False,
+                "error": "Failed to open video file",
+                "frames_extracted": 0
+            }
+
+        fps = int(cap.get(cv2.CAP_PROP_FPS))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        duration = total_frames / fps if fps > 0 else 0
+
+        if total_frames == 0 or fps == 0:
+            cap.release()
+            return {
+                "success": False,
+                "error": "Invalid video file (no frames or fps)",
+                "frames_extracted": 0
+            }
+
+        shards = plan_shards(total_frames, workers)
+        base_task = {"video_path": video_path, "output_folder": output_folder}
+        result = {"success": True, "video_duration": duration, "fps": fps, "output_folder": output_folder}
+
+        if method == "scene":
+            stride = max(1, int(options.get("stride", 1)))
+            max_frames = options.get("max_frames", 50)
+            detector_name, detector_options = scene_detector_settings(options)
+            tasks = [
+                dict(base_task, start=start, end=end, mode="scene", stride=stride,
+                     detector=detector_name, detector_options=detector_options, max_writes=max_frames)
+                for start, end in shards
+            ]
+        else:
+            if method == "interval":
+                frame_interval = max(1, int(fps * options.get("interval", 3)))
+                positions = list(range(0, total_frames, frame_interval))[:options.get("max_frames", 50)]
+                strategy = "grab"
+                result.update({"interval": options.get("interval", 3)})
+            else:
+                positions = smart_positions(total_frames, fps, options.get("num_frames", 10),
+                                            options.get("min_gap_seconds", 10))
+                strategy = options.get("strategy", "auto")
+                if strategy == "auto":
+                    strategy = choose_sampling_strategy(positions, fps)
+                result.update({
+                    "method": "smart_even_distribution",
+                    "sampling_strategy": strategy,
+                    "total_video_frames": total_frames
+                })
+
+            names = {position: f"frame_{index:04d}.jpg" for index, position in enumerate(positions)}
+            tasks = []
+            for start, end in shards:
+                shard_positions = [(position, names[position]) for position in positions if start <= position < end]
+                if shard_positions:
+                    tasks.append(dict(base_task, start=start, end=end, mode="positions",
+                                      positions=shard_positions, strategy=strategy))
+
+        print(f"Decoding {total_frames} frames in {len(tasks)} shards with {workers} workers...", file=sys.stderr)
+
+        if method == "scene":
+            scene_detector = create_detector(detector_name, **detector_options)
+        kept = []
+        compared = 0
+        last_position = -1
+        cancelled = 0
+
+        started = time.perf_counter()
+        shard_results = []
+        with ProcessPoolExecutor(max_workers=min(workers, max(1, len(tasks)))) as executor:
+            futures = [executor.submit(_extract_shard, task) for task in tasks]
+            for future in futures:
+                done = method == "scene" and len(kept) >= max_frames
+                if done and future.cancel():
+                    cancelled += 1
+                    continue
+                # Shards already running when max_frames was reached are
+                # still collected so their temporary frames get deleted
+                shard = future.result()
+                signature_path = shard.pop("signatures")
+                shard_results.append(shard)
+                if signature_path is None:
+                    continue
+
+                # Replay this shard's signatures through the one detector for
+                # the global decision, then delete them
+                signatures = _read_signatures(signature_path)
+                try:
+                    for position, signature in () if done else signatures:
+                        if position <= last_position:
+                            continue
+                        last_position = position
+                        compared += 1
+                        changed, distance = scene_detector.observe(signature)
+                        if changed:
+                            kept.append((position, distance))
+                            if len(kept) >= max_frames:
+                                break
+                finally:
+                    # Close the file before deleting it (Windows keeps open files)
+                    signatures.close()
+                    os.remove(signature_path)
+        decode_seconds = time.perf_counter() - started
+
+        frame_info = []
+        if method == "scene":
+            shard_files = {position: name for shard in shard_results for position, name in shard["frames"]}
+            kept_positions = {position for position, _ in kept}
+            refetched = 0
+
+            for saved, (position, distance) in enumerate(kept):
+                frame_name = f"frame_{saved:04d}.jpg"
+                frame_path = os.path.join(output_folder, frame_name)
+                if position in shard_files:
+                    os.replace(os.path.join(output_folder, shard_files[position]), frame_path)
+                else:
+                    # The shard judged this frame against a different reference
+                    _seek(cap, position)
+                    ret, frame = cap.read()
+                    if not ret:
+                        print(f"Failed to re-read frame at position {position}", file=sys.stderr)
+                        continue
+                    cv2.imwrite(frame_path, frame)
+                    refetched += 1
+
+                info = {
+                    "frame_number": saved,
+                    "timestamp": position / fps,
+                    "filename": frame_name,
+                    "path": frame_path,
+                    "scene_change": True
+                }
+                if distance is not None:
+                    info["diff_score"] = distance
+                frame_info.append(info)
+
+            # Frames a shard flagged that the global pass did not keep
+            discarded = 0
+            for position, name in shard_files.items():
+                if position not in kept_positions:
+                    try:
+                        os.remove(os.path.join(output_folder, name))
+                        discarded += 1
+                    except OSError:
+                        pass
+
+            result.update({
+                "method": "scene_detection",
+                **scene_detector.describe(),
+                "stride": stride,
+                "frames_compared": compared,
+                "refetched_frames": refetched,
+                "discarded_frames": discarded,
+                "cancelled_shards": cancelled
+            })
+        else:
+            saved_frames = sorted(
+                (int(name[len("frame_"):-len(".jpg")]), position, name)
+                for shard in shard_results for position, name in shard["frames"]
+            )
+            for frame_number, position, name in saved_frames:
+                frame_info.append({
+                    "frame_number": frame_number,
+                    "timestamp": position / fps,
+                    "filename": name,
+                    "path": os.path.join(output_folder, name),
+                    "video_position": position
+                })
+
+        cap.release()
+
+        decoded = sum(shard["frames_decoded"] for shard in shard_results)
+        result.update({
+            "frames_extracted": len(frame_info),
+            "frames": frame_info,
+            "workers": workers,
+            "shards": [
+                {"start": shard["start"], "end": shard["end"], "seconds": shard["seconds"]}
+                for shard in shard_results
+            ],
+            "decode_seconds": round(decode_seconds, 3),
+            "video_frames_per_second": round(total_frames / decode_seconds, 1) if decode_seconds > 0 else None,
+            "frames_decoded": decoded
+        })
+        return result
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "frames_extracted": 0
+        }
+
+def parse_args(argv=None):
+    """Parse command line arguments (positional form kept for existing callers)"""
+    parser = argparse.ArgumentParser(description="Extract frames from a video")
+    parser.add_argument("video_path")
+    parser.add_argument("output_folder")
+    parser.add_argument("param", nargs="?", type=int, default=10,
+                        help="Number of frames (smart) or interval in seconds (interval)")
+    parser.add_argument("method", nargs="?", default="smart",
+                        help="smart, scene or interval")
+    parser.add_argument("min_gap_seconds", nargs="?", type=int, default=10,
+                        help="Minimum gap between frames for smart extraction")
+    parser.add_argument("--strategy", choices=SAMPLING_STRATEGIES, default="auto",
+                        help="How smart extraction reaches each sampled frame")
+    parser.add_argument("--stride", type=int, default=1,
+                        help="Compare every Nth frame in scene detection")
+    parser.add_argument("--max-frames", type=int, default=50,
+                        help="Maximum frames to extract (scene and interval)")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Scene change threshold (default depends on the detector)")
+    parser.add_argument("--detector", choices=list(DETECTORS), default="absdiff",
+                        help="Scene change detector")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Use a rolling-statistics threshold for scene detection")
+    parser.add_argument("--adaptive-window", type=int, default=ADAPTIVE_WINDOW)
+    parser.add_argument("--adaptive-sensitivity", type=float, default=ADAPTIVE_SENSITIVITY)
+    parser.add_argument("--downscale-width", type=int, default=DOWNSCALE_WIDTH,
+                        help="Width frames are shrunk to before scene comparison")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Decode the video in this many parallel shards (0 = one per CPU core)")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
     if len(sys.argv) < 3:
         print(json.dumps({
@@ -351,18 +962,39 @@ if __name__ == "__main__":
         }))
         sys.exit(1)
     
-    video_path = sys.argv[1]
-    output_folder = sys.argv[2]
-    param = int(sys.argv[3]) if len(sys.argv) > 3 else 10
-    method = sys.argv[4] if len(sys.argv) > 4 else "smart"
-    min_gap_seconds = int(sys.argv[5]) if len(sys.argv) > 5 else 10
+    args = parse_args()
+    video_path = args.video_path
+    output_folder = args.output_folder
+    param = args.param
+    method = args.method
+    min_gap_seconds = args.min_gap_seconds
+    
+    scene_options = {
+        "threshold": args.threshold,
+        "max_frames": args.max_frames,
+        "stride": args.stride,
+        "detector": args.detector,
+        "adaptive": args.adaptive,
+        "window": args.adaptive_window,
+        "sensitivity": args.adaptive_sensitivity,
+        "downscale_width": args.downscale_width
+    }
     
-    if method == "smart":
-        result = extract_frames_smart(video_path, output_folder, param, min_gap_seconds)
+    if args.workers != 1:
+        # Sharded extraction; 0 means one worker per CPU core
+        if method == "smart":
+            options = {"num_frames": param, "min_gap_seconds": min_gap_seconds, "strategy": args.strategy}
+        elif method == "scene":
+            options = scene_options
+        else:
+            options = {"interval": param, "max_frames": args.max_frames}
+        result = extract_frames_sharded(video_path, output_folder, method, args.workers or None, **options)
+    elif method == "smart":
+        result = extract_frames_smart(video_path, output_folder, param, min_gap_seconds, args.strategy)
     elif method == "scene":
-        result = extract_frames_with_scene_detection(video_path, output_folder)
+        result = extract_frames_with_scene_detection(video_path, output_folder, **scene_options)
     else:
         # interval method
-        result = extract_frames(video_path, output_folder, param)
+        result = extract_frames(video_path, output_folder, param, args.max_frames)
     
     print(json.dumps(result))
@@ -0,0 +1,199 @@
+"""
+Frame Ring Buffer
+Fixed-size ring of frame slots in shared memory for passing decoded frames
+between processes without pickling them
+"""
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Indices into the shared metrics array
+_IN_USE = 0
+_PEAK_IN_USE = 1
+_OCCUPANCY_SUM = 2
+_PUBLISHED = 3
+_PRODUCER_STALLS = 4
+_PRODUCER_STALL_SECONDS = 5
+_CONSUMER_STALLS = 6
+_CONSUMER_STALL_SECONDS = 7
+_METRIC_COUNT = 8
+
+class RingClosed(Exception):
+    """Raised by get() once the producer has closed the ring"""
+
+class FrameRing:
+    """
+    Shared-memory ring of equally sized frame slots
+
+    Every slot is in exactly one state:
+        free     - index waits in the free queue
+        writing  - returned by acquire(), owned by the producer
+        filled   - published with its metadata on the filled queue
+        reading  - returned by get(), owned by one consumer until release()
+
+    acquire() blocks while every slot is in use and get() blocks while none
+    is filled, which is the backpressure between the two sides. Time spent
+    blocked is recorded as producer/consumer stalls. get() hands consumers a
+    NumPy view over the shared block (no copy); the view must not be used
+    after release().
+
+    The ring pickles by name, so it can be passed to worker processes started
+    by the creating process; only the creator unlinks the shared memory in
+    close().
+    """
+
+    def __init__(self, slots, slot_bytes, context=None):
+        context = context or multiprocessing.get_context()
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.free = context.Queue()
+        self.filled = context.Queue()
+        self.metrics = context.Array("d", _METRIC_COUNT)
+        # Forked children inherit this object as-is, so ownership goes by pid
+        self.owner_pid = os.getpid()
+
+        for slot in range(slots):
+            self.free.put(slot)
+
+    def __getstate__(self):
+        return {
+            "slots": self.slots,
+            "slot_bytes": self.slot_bytes,
+            "name": self.shm.name,
+            "free": self.free,
+            "filled": self.filled,
+            "metrics": self.metrics
+        }
+
+    def __setstate__(self, state):
+        self.slots = state["slots"]
+        self.slot_bytes = state["slot_bytes"]
+        self.shm = shared_memory.SharedMemory(name=state["name"])
+        self.free = state["free"]
+        self.filled = state["filled"]
+        self.metrics = state["metrics"]
+        self.owner_pid = None
+
+    def _add(self, index, amount):
+        with self.metrics.get_lock():
+            self.metrics[index] += amount
+
+    def _slot_array(self, slot, shape, dtype):
+        if not 0 <= slot < self.slots:
+            raise IndexError(f"Slot {slot} out of range")
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def acquire(self, timeout=None):
+        """
+        Take a free slot for writing, waiting while every slot is in use
+
+        Returns:
+            int: Slot index
+
+        Raises:
+            queue.Empty: No slot came free within timeout
+        """
+        try:
+            slot = self.free.get_nowait()
+        except queue.Empty:
+            started = time.perf_counter()
+            try:
+                slot = self.free.get(timeout=timeout)
+            finally:
+                # Timed-out waits count towards stall time; the stall itself
+                # is counted once a slot is obtained
+                self._add(_PRODUCER_STALL_SECONDS, time.perf_counter() - started)
+            self._add(_PRODUCER_STALLS, 1)
+
+        with self.metrics.get_lock():
+            self.metrics[_IN_USE] += 1
+            self.metrics[_PEAK_IN_USE] = max(self.metrics[_PEAK_IN_USE], self.metrics[_IN_USE])
+        return slot
+
+    def write(self, slot, frame):
+        """Copy a frame into an acquired slot"""
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of {frame.nbytes} bytes does not fit a {self.slot_bytes}-byte slot")
+        self._slot_array(slot, frame.shape, frame.dtype)[...] = frame
+
+    def publish(self, slot, frame, meta=None):
+        """Hand a written slot to the consumers along with its metadata"""
+        with self.metrics.get_lock():
+            self.metrics[_PUBLISHED] += 1
+            self.metrics[_OCCUPANCY_SUM] += self.metrics[_IN_USE]
+        self.filled.put((slot, frame.shape, frame.dtype.str, meta or {}))
+
+    def put(self, frame, meta=None, timeout=None):
+        """Acquire a slot, copy the frame in and publish it"""
+        slot = self.acquire(timeout)
+        try:
+            self.write(slot, frame)
+        except Exception:
+            self.release(slot)
+            raise
+        self.publish(slot, frame, meta)
+        return slot
+
+    def get(self, timeout=None):
+        """
+        Take the next filled slot, waiting while none is ready
+
+        Returns:
+            tuple: (slot, frame view, meta)
+
+        Raises:
+            RingClosed: The producer has closed the ring
+        """
+        try:
+            item = self.filled.get_nowait()
+        except queue.Empty:
+            started = time.perf_counter()
+            item = self.filled.get(timeout=timeout)
+            with self.metrics.get_lock():
+                self.metrics[_CONSUMER_STALLS] += 1
+                self.metrics[_CONSUMER_STALL_SECONDS] += time.perf_counter() - started
+
+        if item is None:
+            raise RingClosed()
+
+        slot, shape, dtype, meta = item
+        return slot, self._slot_array(slot, shape, np.dtype(dtype)), meta
+
+    def release(self, slot):
+        """Return a slot to the free queue once its frame has been used"""
+        self._add(_IN_USE, -1)
+        self.free.put(slot)
+
+    def close_producer(self, consumers=1):
+        """Tell each consumer that no more frames will be published"""
+        for _ in range(consumers):
+            self.filled.put(None)
+
+    def stats(self):
+        """Return slot occupancy and stall metrics"""
+        with self.metrics.get_lock():
+            metrics = list(self.metrics)
+        published = int(metrics[_PUBLISHED])
+        return {
+            "slots": self.slots,
+            "slot_bytes": self.slot_bytes,
+            "frames_published": published,
+            "slots_in_use": int(metrics[_IN_USE]),
+            "peak_slots_in_use": int(metrics[_PEAK_IN_USE]),
+            "average_occupancy": round(metrics[_OCCUPANCY_SUM] / published / self.slots, 3) if published else 0.0,
+            "producer_stalls": int(metrics[_PRODUCER_STALLS]),
+            "producer_stall_seconds": round(metrics[_PRODUCER_STALL_SECONDS], 3),
+            "consumer_stalls": int(metrics[_CONSUMER_STALLS]),
+            "consumer_stall_seconds": round(metrics[_CONSUMER_STALL_SECONDS], 3)
+        }
+
+    def close(self):
+        """Detach from the shared memory (and free it in the creating process)"""
+        self.shm.close()
+        if self.owner_pid == os.getpid():
+            self.shm.unlink()
@@ -6,66 +6,205 @@ import fs from "fs";
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
 
+const PYTHON_SCRIPT = path.join(__dirname, "whisper_service_simple.py");
+
+// ONLY allow these 5 languages - reject all others
+const SUPPORTED_LANGUAGES = ['tamil', 'telugu', 'kannada', 'hindi', 'english'];
+
+// Set WHISPER_WORKER=false to spawn a fresh Python process per transcription
+const USE_PERSISTENT_WORKER = process.env.WHISPER_WORKER !== "false";
+
+// Worker pool sizing; leave unset to let the Python side size it from cores/memory
+const WHISPER_POOL_SIZE = process.env.WHISPER_POOL_SIZE;
+const WHISPER_QUEUE_SIZE = process.env.WHISPER_QUEUE_SIZE || "8";
+
+// Set WHISPER_CHUNKED=true to transcribe long audio as parallel chunks
+const WHISPER_CHUNKED = process.env.WHISPER_CHUNKED === "true";
+
+// Long-lived Whisper process shared by all transcriptions (model stays loaded)
+let whisperWorker = null;
+let nextJobId = 1;
+
 /**
- * Transcribe audio using local Whisper large model
- * @param {string} audioFilePath - Path to the audio file
- * @param {Function} progressCallback - Optional callback for progress updates (message, percent)
- * @param {string} language - Target language for transcription (tamil, telugu, kannada, hindi, english)
- * @returns {Promise<string>} - Transcribed text
+ * Forward a parsed Whisper status message to the job's callbacks
  */
-export async function transcribeWithLocalWhisper(audioFilePath, progressCallback = null, language = 'english') {
-  return new Promise((resolve, reject) => {
-    // ONLY allow these 5 languages - reject all others
-    const SUPPORTED_LANGUAGES = ['tamil', 'telugu', 'kannada', 'hindi', 'english'];
-    
-    if (!SUPPORTED_LANGUAGES.includes(language.toLowerCase())) {
-      return reject(new Error(
-        `Unsupported language: '${language}'. Only Tamil, Telugu, Kannada, Hindi, and English are supported for transcription.`
-      ));
+function handleJobMessage(job, parsed) {
+  const { progressCallback, onSegment } = job;
+
+  if (parsed.status === "stats") {
+    job.resolve(parsed);
+    return true;
+  }
+
+  // Segments are streamed as soon as Whisper decodes them
+  if (parsed.status === "segment") {
+    if (onSegment) {
+      onSegment(parsed.segment);
     }
-    
-    // Check if audio file exists
-    if (!fs.existsSync(audioFilePath)) {
-      return reject(new Error(`Audio file not found: ${audioFilePath}`));
+    return false;
+  }
+
+  // Send progress updates to callback
+  if (progressCallback && parsed.status === "progress") {
+    progressCallback(parsed.message, parsed.percent || null);
+  } else if (progressCallback && parsed.status === "loading") {
+    progressCallback(parsed.message, null);
+  } else if (progressCallback && parsed.status === "transcribing") {
+    progressCallback(parsed.message, null);
+  }
+
+  if (parsed.status === "complete" && parsed.transcript) {
+    job.resolve(job.withSegments
+      ? { transcript: parsed.transcript, segments: parsed.segments || [] }
+      : parsed.transcript);
+    return true;
+  } else if (parsed.status === "error") {
+    job.reject(new Error(parsed.message));
+    return true;
+  }
+  return false;
+}
+
+/**
+ * Start (or reuse) the persistent Whisper worker process
+ */
+function getWhisperWorker() {
+  if (whisperWorker) {
+    return whisperWorker;
+  }
+
+  console.log("Starting persistent Whisper worker...");
+
+  const args = ["-3.10", PYTHON_SCRIPT, "--worker", "--queue-size", WHISPER_QUEUE_SIZE];
+  if (WHISPER_POOL_SIZE) {
+    args.push("--workers", WHISPER_POOL_SIZE);
+  }
+  if (WHISPER_CHUNKED) {
+    args.push("--chunked");
+  }
+
+  const workerProcess = spawn("py", args);
+  const worker = { process: workerProcess, jobs: new Map(), stdoutBuffer: "", errorBuffer: "" };
+
+  workerProcess.stdout.on("data", (data) => {
+    worker.stdoutBuffer += data.toString();
+
+    // Only parse complete lines; keep any partial line for the next chunk
+    const lines = worker.stdoutBuffer.split("\n");
+    worker.stdoutBuffer = lines.pop();
+
+    lines.filter(line => line.trim()).forEach(line => {
+      let parsed;
+      try {
+        parsed = JSON.parse(line);
+      } catch (e) {
+        // Not JSON, just log it
+        console.log(`[Whisper] ${line}`);
+        return;
+      }
+
+      if (parsed.status !== "segment") {
+        console.log(`[Whisper]${parsed.id ? ` (${parsed.id})` : ""} ${parsed.status}: ${parsed.message || ""}`);
+      }
+
+      if (parsed.id === undefined) {
+        // Model loading messages apply to every job waiting on the worker
+        if (parsed.status === "loading") {
+          worker.jobs.forEach(job => handleJobMessage(job, parsed));
+        }
+        return;
+      }
+
+      const job = worker.jobs.get(parsed.id);
+      if (job && handleJobMessage(job, parsed)) {
+        worker.jobs.delete(parsed.id);
+      }
+    });
+  });
+
+  workerProcess.stderr.on("data", (data) => {
+    worker.errorBuffer = (worker.errorBuffer + data.toString()).slice(-4000);
+    console.error(`[Whisper Error] ${data.toString()}`);
+  });
+
+  const failPendingJobs = (error) => {
+    if (whisperWorker === worker) {
+      whisperWorker = null;
     }
+    worker.jobs.forEach(job => job.reject(error));
+    worker.jobs.clear();
+  };
+
+  workerProcess.stdin.on("error", (err) => {
+    console.error(`[Whisper Error] Failed to write to worker: ${err.message}`);
+  });
 
-    const pythonScript = path.join(__dirname, "whisper_service_simple.py");
-    const absoluteAudioPath = path.resolve(audioFilePath);
+  workerProcess.on("close", (code) => {
+    console.log(`Whisper worker exited with code ${code}`);
+    failPendingJobs(new Error(`Whisper process exited with code ${code}. Error: ${worker.errorBuffer}`));
+  });
+
+  workerProcess.on("error", (err) => {
+    failPendingJobs(new Error(`Failed to start Python process: ${err.message}`));
+  });
+
+  whisperWorker = worker;
+  return worker;
+}
+
+/**
+ * Get queue depth, wait times and worker utilisation from the Whisper worker
+ * @returns {Promise<Object>} - Pool statistics
+ */
+export function getWhisperWorkerStats() {
+  return new Promise((resolve, reject) => {
+    const worker = getWhisperWorker();
+    const id = `stats-${nextJobId++}`;
+
+    worker.jobs.set(id, { progressCallback: null, resolve, reject });
+    worker.process.stdin.write(JSON.stringify({ id, command: "stats" }) + "\n");
+  });
+}
 
-    console.log(`Starting FAST Whisper transcription for: ${absoluteAudioPath}`);
-    console.log(`Transcription language: ${language}`);
+/**
+ * Stop the persistent Whisper worker (e.g. on server shutdown)
+ */
+export function stopWhisperWorker() {
+  if (whisperWorker) {
+    whisperWorker.process.stdin.end(JSON.stringify({ command: "shutdown" }) + "\n");
+    whisperWorker = null;
+  }
+}
 
+/**
+ * Transcribe by spawning a dedicated Python process (loads the model every time)
+ */
+function transcribeWithProcess(absoluteAudioPath, progressCallback, language, options) {
+  return new Promise((resolve, reject) => {
     // Spawn Python process with language parameter
-    const pythonProcess = spawn("py", ["-3.10", pythonScript, absoluteAudioPath, language]);
+    const args = ["-3.10", PYTHON_SCRIPT, absoluteAudioPath, language];
+    if (options.wordTimestamps) {
+      args.push("--word-timestamps");
+    }
+    const pythonProcess = spawn("py", args);
+    const job = { progressCallback, resolve, reject, ...options };
 
     let outputBuffer = "";
     let errorBuffer = "";
 
     pythonProcess.stdout.on("data", (data) => {
-      const output = data.toString();
-      outputBuffer += output;
-      
-      // Try to parse each line as JSON for progress updates
-      const lines = output.split("\n").filter(line => line.trim());
-      lines.forEach(line => {
+      outputBuffer += data.toString();
+
+      // Segment messages can be large, so only parse complete lines
+      const lines = outputBuffer.split("\n");
+      outputBuffer = lines.pop();
+      lines.filter(line => line.trim()).forEach(line => {
         try {
           const parsed = JSON.parse(line);
-          console.log(`[Whisper] ${parsed.status}: ${parsed.message}`);
-          
-          // Send progress updates to callback
-          if (progressCallback && parsed.status === "progress") {
-            progressCallback(parsed.message, parsed.percent || null);
-          } else if (progressCallback && parsed.status === "loading") {
-            progressCallback(parsed.message, null);
-          } else if (progressCallback && parsed.status === "transcribing") {
-            progressCallback(parsed.message, null);
-          }
-          
-          if (parsed.status === "complete" && parsed.transcript) {
-            resolve(parsed.transcript);
-          } else if (parsed.status === "error") {
-            reject(new Error(parsed.message));
+          if (parsed.status !== "segment") {
+            console.log(`[Whisper] ${parsed.status}: ${parsed.message}`);
           }
+          handleJobMessage(job, parsed);
         } catch (e) {
           // Not JSON, just log it
           console.log(`[Whisper] ${line}`);
@@ -89,3 +228,55 @@ export async function transcribeWithLocalWhisper(audioFilePath, progressCallback
     });
   });
 }
+
+/**
+ * Transcribe by submitting a job to the persistent Whisper worker
+ */
+function transcribeWithWorker(absoluteAudioPath, progressCallback, language, options) {
+  return new Promise((resolve, reject) => {
+    const worker = getWhisperWorker();
+    const id = String(nextJobId++);
+
+    worker.jobs.set(id, { progressCallback, resolve, reject, ...options });
+    worker.process.stdin.write(JSON.stringify({
+      id,
+      audio_path: absoluteAudioPath,
+      language,
+      word_timestamps: Boolean(options.wordTimestamps)
+    }) + "\n");
+  });
+}
+
+/**
+ * Transcribe audio using local Whisper large model
+ * @param {string} audioFilePath - Path to the audio file
+ * @param {Function} progressCallback - Optional callback for progress updates (message, percent)
+ * @param {string} language - Target language for transcription (tamil, telugu, kannada, hindi, english)
+ * @param {Object} options - Optional settings
+ * @param {Function} options.onSegment - Called with each timestamped segment as soon as it is decoded
+ * @param {boolean} options.withSegments - Resolve with { transcript, segments } instead of the text only
+ * @param {boolean} options.wordTimestamps - Include per-word timings in each segment
+ * @returns {Promise<string|Object>} - Transcribed text (or text plus segments)
+ */
+export async function transcribeWithLocalWhisper(audioFilePath, progressCallback = null, language = 'english', options = {}) {
+  if (!SUPPORTED_LANGUAGES.includes(language.toLowerCase())) {
+    throw new Error(
+      `Unsupported language: '${language}'. Only Tamil, Telugu, Kannada, Hindi, and English are supported for transcription.`
+    );
+  }
+
+  // Check if audio file exists
+  if (!fs.existsSync(audioFilePath)) {
+    throw new Error(`Audio file not found: ${audioFilePath}`);
+  }
+
+  const absoluteAudioPath = path.resolve(audioFilePath);
+
+  console.log(`Starting FAST Whisper transcription for: ${absoluteAudioPath}`);
+  console.log(`Transcription language: ${language}`);
+
+  if (USE_PERSISTENT_WORKER) {
+    return transcribeWithWorker(absoluteAudioPath, progressCallback, language, options);
+  }
+  return transcribeWithProcess(absoluteAudioPath, progressCallback, language, options);
+}
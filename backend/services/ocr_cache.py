@@ -0,0 +1,280 @@
+"""
+OCR Result Cache
+Perceptual-hash keyed cache of equation OCR results, so near-duplicate
+frames (the same slide sampled again and again) and repeated equation
+regions reuse an earlier LaTeX/text result instead of being OCR'd again
+"""
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# Images whose 64-bit pHashes differ in at most this many bits are duplicates
+DEFAULT_TOLERANCE = 4
+
+# Entries kept in memory per process
+DEFAULT_MAX_ENTRIES = 512
+
+# Entries kept in the on-disk store before the least recently used are dropped
+DEFAULT_MAX_DISK_ENTRIES = 100000
+
+# Share of the on-disk store dropped at once when it overflows, so the table
+# is not counted and trimmed again on the next few writes
+DISK_EVICT_FRACTION = 0.1
+
+# Duplicates must also match in size within this fraction, so two different
+# equation lines that happen to hash alike are not confused
+SIZE_TOLERANCE = 0.05
+
+# The disk store indexes the hash split into five bands of 12-13 bits; any two
+# hashes within four bits (the default tolerance) share at least one band, so
+# lookups up to that tolerance use the index instead of scanning the namespace
+_BANDS = DEFAULT_TOLERANCE + 1
+_BAND_EDGES = [round(band * 64 / _BANDS) for band in range(_BANDS + 1)]
+_COLUMNS = ["namespace", "hash", "width", "height"] + [f"b{band}" for band in range(_BANDS)] + ["value", "last_used"]
+
+def image_key(img):
+    """
+    Perceptual key for a PIL image or NumPy array
+
+    Returns:
+        tuple: (64-bit pHash, width, height)
+    """
+    # Imported on use so equation_ocr can import this module without OpenCV
+    import numpy as np
+    from scene_detectors import phash
+
+    array = img if isinstance(img, np.ndarray) else np.asarray(img.convert("L"))
+    height, width = array.shape[:2]
+    return phash(array), width, height
+
+def _bands(value):
+    return [(value >> low) & ((1 << (high - low)) - 1) for low, high in zip(_BAND_EDGES, _BAND_EDGES[1:])]
+
+def _same_size(key, other):
+    return (abs(key[1] - other[1]) <= SIZE_TOLERANCE * max(key[1], other[1]) and
+            abs(key[2] - other[2]) <= SIZE_TOLERANCE * max(key[2], other[2]))
+
+class OCRResultCache:
+    """
+    Reuse OCR results for perceptually near-identical images
+
+    Entries live in an in-process LRU and, when db_path is given, in a SQLite
+    file shared between runs and worker processes. Every entry belongs to a
+    namespace (e.g. whole frames vs region crops, and which OCR backends were
+    available), so results are never reused across incompatible settings.
+    Values are stored as JSON and handed back as fresh copies.
+
+    The cache pickles by its settings only, so each worker process gets an
+    empty LRU of its own and opens its own connection to the disk store.
+    """
+
+    def __init__(self, tolerance=DEFAULT_TOLERANCE, max_entries=DEFAULT_MAX_ENTRIES, db_path=None,
+                 max_disk_entries=DEFAULT_MAX_DISK_ENTRIES):
+        """
+        Args:
+            tolerance: Maximum pHash Hamming distance between duplicates (0 = exact hash match)
+            max_entries: In-memory LRU size
+            db_path: SQLite file for the persistent store (None = memory only)
+            max_disk_entries: Persistent store size
+        """
+        self.tolerance = tolerance
+        self.max_entries = max_entries
+        self.db_path = str(db_path) if db_path else None
+        self.max_disk_entries = max_disk_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db = None
+        self._disk_count = 0
+
+    def __getstate__(self):
+        return {
+            "tolerance": self.tolerance,
+            "max_entries": self.max_entries,
+            "db_path": self.db_path,
+            "max_disk_entries": self.max_disk_entries
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _connection(self):
+        if self._db is None and self.db_path:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(ocr_results)")]
+            if columns and columns != _COLUMNS:
+                # Store written with another band layout; it is only a cache, so start over
+                self._db.execute("DROP TABLE ocr_results")
+            bands = "".join(f"b{band} INTEGER, " for band in range(_BANDS))
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_results ("
+                "namespace TEXT, hash TEXT, width INTEGER, height INTEGER, "
+                f"{bands}value TEXT, last_used REAL, "
+                "PRIMARY KEY (namespace, hash, width, height))"
+            )
+            for band in range(_BANDS):
+                self._db.execute(
+                    f"CREATE INDEX IF NOT EXISTS ocr_results_b{band} ON ocr_results (namespace, b{band})"
+                )
+            self._db.commit()
+            self._disk_count = self._db.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+        return self._db
+
+    def closest(self, key, candidates, namespace=None):
+        """
+        Pick the nearest duplicate of key among candidate keys
+
+        Returns:
+            The closest matching candidate (prefixed with namespace when one is
+            given), or None when none is within tolerance
+        """
+        from scene_detectors import hamming
+
+        best = None
+        for other in candidates:
+            if not _same_size(key, other):
+                continue
+            distance = hamming(key[0], other[0])
+            # Ties go to the smaller key, so the choice never depends on candidate order
+            if distance <= self.tolerance and (best is None or (distance, other) < best):
+                best = (distance, other)
+        if best is None:
+            return None
+        return best[1] if namespace is None else (namespace,) + best[1]
+
+    def _find_memory(self, namespace, key):
+        exact = (namespace,) + key
+        if exact in self.entries:
+            return exact
+        if self.tolerance <= 0:
+            return None
+        return self.closest(key, [entry[1:] for entry in self.entries if entry[0] == namespace], namespace)
+
+    def _find_disk(self, namespace, key):
+        db = self._connection()
+        if db is None:
+            return None
+
+        # Only the keys are read for the candidate search; the value is fetched for the winner
+        if self.tolerance < _BANDS:
+            # One SELECT per band so each uses its own (namespace, band) index
+            query = " UNION ".join(
+                f"SELECT hash, width, height FROM ocr_results WHERE namespace = ? AND b{band} = ?"
+                for band in range(_BANDS)
+            )
+            rows = db.execute(query, [value for band in _bands(key[0]) for value in (namespace, band)])
+        else:
+            rows = db.execute("SELECT hash, width, height FROM ocr_results WHERE namespace = ?", (namespace,))
+
+        other = self.closest(key, [(int(value_hash, 16), width, height) for value_hash, width, height in rows])
+        if other is None:
+            return None
+        where = (namespace, f"{other[0]:016x}", other[1], other[2])
+        row = db.execute(
+            "SELECT value FROM ocr_results WHERE namespace = ? AND hash = ? AND width = ? AND height = ?", where
+        ).fetchone()
+        if row is None:
+            # Evicted by another process since the candidate search
+            return None
+        db.execute(
+            "UPDATE ocr_results SET last_used = ? WHERE namespace = ? AND hash = ? AND width = ? AND height = ?",
+            (time.time(),) + where
+        )
+        db.commit()
+        return other, row[0]
+
+    def _remember(self, entry, value):
+        self.entries[entry] = value
+        self.entries.move_to_end(entry)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, namespace, key):
+        """
+        Look up the result for an image key (see image_key)
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        with self.lock:
+            entry = self._find_memory(namespace, key)
+            if entry is not None:
+                self.entries.move_to_end(entry)
+                self.hits += 1
+                return json.loads(self.entries[entry])
+
+            try:
+                found = self._find_disk(namespace, key)
+            except sqlite3.Error as e:
+                print(f"OCR cache lookup failed: {e}", file=sys.stderr)
+                found = None
+
+            if found is None:
+                self.misses += 1
+                return None
+
+            other, value = found
+            self._remember((namespace,) + other, value)
+            self.hits += 1
+            self.disk_hits += 1
+            return json.loads(value)
+
+    def put(self, namespace, key, value):
+        """Store a JSON-serialisable result for an image key"""
+        encoded = json.dumps(value)
+        with self.lock:
+            self._remember((namespace,) + key, encoded)
+            try:
+                db = self._connection()
+                if db is None:
+                    return
+                db.execute(
+                    f"INSERT OR REPLACE INTO ocr_results VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    [namespace, f"{key[0]:016x}", key[1], key[2]] + _bands(key[0]) + [encoded, time.time()]
+                )
+                # Running estimate (replacements and other processes' writes make it
+                # approximate); the table is only counted again once it passes the
+                # limit, and then trimmed a batch below it so that stays rare
+                self._disk_count += 1
+                if self._disk_count > self.max_disk_entries:
+                    count = db.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+                    keep = self.max_disk_entries - int(self.max_disk_entries * DISK_EVICT_FRACTION)
+                    if count > self.max_disk_entries:
+                        db.execute(
+                            "DELETE FROM ocr_results WHERE rowid IN "
+                            "(SELECT rowid FROM ocr_results ORDER BY last_used LIMIT ?)",
+                            (count - keep,)
+                        )
+                        count = keep
+                    self._disk_count = count
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Failed to write OCR cache entry: {e}", file=sys.stderr)
+
+    def stats(self):
+        """Return hit/miss counters for this process"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self.entries),
+                "tolerance": self.tolerance,
+                "db_path": self.db_path
+            }
+
+    def close(self):
+        """Close the disk store connection"""
+        with self.lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
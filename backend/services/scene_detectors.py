@@ -0,0 +1,203 @@
+"""
+Scene Change Detectors
+Pluggable frame comparison for scene-based frame extraction. Every detector
+works on a downscaled copy of the frame and splits detection into
+signature(frame) and distance(a, b), so a sequence of signatures can be
+replayed through observe() without touching the video again.
+"""
+from collections import deque
+
+import cv2
+import numpy as np
+
+# Frames are shrunk to this width (aspect kept) before any comparison
+DOWNSCALE_WIDTH = 160
+
+# Adaptive mode: rolling window of recent distances and how many standard
+# deviations above their mean a distance must be to count as a scene change
+ADAPTIVE_WINDOW = 30
+ADAPTIVE_SENSITIVITY = 3.0
+# The adaptive threshold never drops below this fraction of the base threshold
+ADAPTIVE_FLOOR = 0.5
+# Distances needed before the rolling statistics replace the base threshold
+ADAPTIVE_MIN_HISTORY = 5
+
+def downscale(frame, width=DOWNSCALE_WIDTH):
+    """Shrink a BGR frame to the given width, keeping its aspect ratio"""
+    height, frame_width = frame.shape[:2]
+    if frame_width <= width:
+        return frame
+    new_height = max(1, round(height * width / frame_width))
+    return cv2.resize(frame, (width, new_height), interpolation=cv2.INTER_AREA)
+
+def to_gray(frame):
+    """Convert a BGR frame to grayscale (grayscale frames pass through)"""
+    if frame.ndim == 2:
+        return frame
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+def hamming(a, b):
+    """Number of differing bits between two integer hashes"""
+    return bin(a ^ b).count("1")
+
+def phash(frame, width=DOWNSCALE_WIDTH):
+    """64-bit DCT perceptual hash of a BGR or grayscale frame"""
+    gray = to_gray(downscale(frame, width))
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    # Skip the DC term, which only reflects overall brightness
+    bits = low > np.median(low.flatten()[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+class SceneDetector:
+    """
+    Base class for scene change detectors
+
+    Subclasses implement signature() and distance() and set default_threshold.
+    observe() keeps the signature of the last scene change as the reference,
+    so replaying the same signatures always flags the same frames.
+    """
+
+    name = None
+    default_threshold = None
+
+    def __init__(self, threshold=None, adaptive=False, window=ADAPTIVE_WINDOW,
+                 sensitivity=ADAPTIVE_SENSITIVITY, downscale_width=DOWNSCALE_WIDTH):
+        self.threshold = float(threshold) if threshold is not None else self.default_threshold
+        self.adaptive = adaptive
+        self.sensitivity = sensitivity
+        self.downscale_width = downscale_width
+        self.history = deque(maxlen=window)
+        self.reference = None
+
+    def signature(self, frame):
+        """Compute the compact representation compared between frames"""
+        raise NotImplementedError
+
+    def distance(self, a, b):
+        """Distance between two signatures (0 means identical)"""
+        raise NotImplementedError
+
+    def current_threshold(self):
+        """Threshold in effect for the next comparison"""
+        if not self.adaptive or len(self.history) < ADAPTIVE_MIN_HISTORY:
+            return self.threshold
+        history = np.asarray(self.history, dtype=np.float64)
+        rolling = history.mean() + self.sensitivity * history.std()
+        return max(self.threshold * ADAPTIVE_FLOOR, rolling)
+
+    def is_change(self, distance):
+        """Whether a distance from the reference counts as a scene change"""
+        return distance > self.current_threshold()
+
+    def observe(self, signature):
+        """
+        Compare a signature with the last scene change
+
+        The first signature observed is always a scene change.
+
+        Returns:
+            tuple: (is_change, distance) where distance is None for the first signature
+        """
+        if self.reference is None:
+            self.reference = signature
+            return True, None
+
+        distance = float(self.distance(self.reference, signature))
+        changed = self.is_change(distance)
+        if changed:
+            self.reference = signature
+        else:
+            # Only unchanged frames feed the rolling noise estimate
+            self.history.append(distance)
+        return changed, distance
+
+    def reset(self):
+        """Forget the reference signature and rolling statistics"""
+        self.reference = None
+        self.history.clear()
+
+    def describe(self):
+        """Settings reported alongside extraction results"""
+        return {
+            "detector": self.name,
+            "threshold": self.threshold,
+            "adaptive": self.adaptive,
+            "downscale_width": self.downscale_width
+        }
+
+class AbsDiffDetector(SceneDetector):
+    """Mean absolute grayscale difference (0-255), the original detector"""
+
+    name = "absdiff"
+    default_threshold = 30.0
+
+    def signature(self, frame):
+        return to_gray(downscale(frame, self.downscale_width))
+
+    def distance(self, a, b):
+        return cv2.absdiff(a, b).mean()
+
+class HistogramDetector(SceneDetector):
+    """Bhattacharyya distance (0-1) between HSV colour histograms"""
+
+    name = "histogram"
+    default_threshold = 0.2
+
+    def signature(self, frame):
+        small = downscale(frame, self.downscale_width)
+        if small.ndim == 2:
+            small = cv2.cvtColor(small, cv2.COLOR_GRAY2BGR)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1, 2], None, [8, 4, 4], [0, 180, 0, 256, 0, 256])
+        return cv2.normalize(hist, hist).flatten()
+
+    def distance(self, a, b):
+        return cv2.compareHist(a, b, cv2.HISTCMP_BHATTACHARYYA)
+
+class DHashDetector(SceneDetector):
+    """Hamming distance (0-64) between 64-bit difference hashes"""
+
+    name = "dhash"
+    default_threshold = 8.0
+
+    def signature(self, frame):
+        gray = to_gray(downscale(frame, self.downscale_width))
+        small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+        bits = small[:, 1:] > small[:, :-1]
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+    def distance(self, a, b):
+        return hamming(a, b)
+
+class PHashDetector(SceneDetector):
+    """Hamming distance (0-64) between 64-bit DCT perceptual hashes"""
+
+    name = "phash"
+    default_threshold = 10.0
+
+    def signature(self, frame):
+        return phash(frame, self.downscale_width)
+
+    def distance(self, a, b):
+        return hamming(a, b)
+
+DETECTORS = {
+    detector.name: detector
+    for detector in (AbsDiffDetector, HistogramDetector, DHashDetector, PHashDetector)
+}
+
+def create_detector(name="absdiff", **kwargs):
+    """
+    Build a scene detector by name
+
+    Args:
+        name: One of DETECTORS (absdiff, histogram, dhash, phash)
+        **kwargs: threshold, adaptive, window, sensitivity, downscale_width
+
+    Returns:
+        SceneDetector: A fresh detector
+    """
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown scene detector: '{name}'. Choose from: {', '.join(DETECTORS)}")
+    return DETECTORS[name](**kwargs)
@@ -0,0 +1,185 @@
+"""
+Transcription Cache
+Disk-backed, content-addressed cache of Whisper transcription results
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Default cache location, next to the Whisper model cache
+CACHE_DIR = Path(__file__).parent / "transcription_cache"
+
+# Eviction trims the cache to this share of max_bytes, so the directory is not
+# scanned again on the next few writes
+EVICT_TARGET = 0.9
+
+def hash_file(path, block_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class TranscriptionCache:
+    """
+    Cache transcription segments keyed by audio content and decode settings
+
+    Each entry is a JSON file named after a SHA-256 of the audio bytes, the
+    model name, compute type, language and decode parameters, so identical
+    audio transcribed with identical settings is served from disk. Entry
+    modification times track recency; when the cache grows past max_bytes the
+    least recently used entries are evicted.
+
+    The cache size is tracked in memory from one directory scan and the bytes
+    written since, so the directory is only scanned again once that estimate
+    passes max_bytes.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=1024 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Estimated size on disk (None until first needed)
+        self._size = None
+
+    def make_key(self, audio_path, model_name, compute_type, language, params):
+        """
+        Build the cache key for an audio file and its decode settings
+
+        Args:
+            audio_path: Path to the audio file
+            model_name: Whisper model name or path
+            compute_type: CTranslate2 compute type (int8, float16, ...)
+            language: Whisper language code
+            params: JSON-serialisable decode parameters
+
+        Returns:
+            str: Hex digest identifying the transcription
+        """
+        settings = json.dumps({
+            "model": model_name,
+            "compute_type": compute_type,
+            "language": language,
+            "params": params
+        }, sort_keys=True, default=str)
+
+        digest = hashlib.sha256()
+        digest.update(hash_file(audio_path).encode())
+        digest.update(settings.encode())
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """
+        Look up cached segments
+
+        Returns:
+            list: Cached segments, or None on a miss
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                segments = json.load(f)["segments"]
+        except (OSError, ValueError, KeyError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        with self.lock:
+            self.hits += 1
+        return segments
+
+    def put(self, key, segments):
+        """Store segments for a key and evict old entries if over budget"""
+        path = self._entry_path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        # Write to a temp file first so readers never see a partial entry
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "segments": segments}, f)
+            written = temp_path.stat().st_size
+            try:
+                replaced = path.stat().st_size
+            except OSError:
+                replaced = 0
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Failed to write transcription cache entry: {e}", file=sys.stderr)
+            try:
+                temp_path.unlink()
+            except OSError:
+                pass
+            return
+
+        with self.lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += written - replaced
+            over_budget = self._size > self.max_bytes
+
+        if over_budget:
+            self.evict()
+
+    def _entries(self):
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Rescan the cache and, if it is over max_bytes, delete least recently used entries down to EVICT_TARGET"""
+        with self.lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            if total > self.max_bytes:
+                target = self.max_bytes * EVICT_TARGET
+                for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+                    if total <= target:
+                        break
+                    try:
+                        path.unlink()
+                        total -= size
+                        self.evictions += 1
+                    except OSError:
+                        continue
+            self._size = total
+
+    def stats(self):
+        """Return hit/miss counters for this process and the cache's disk usage"""
+        entries = self._entries()
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(entries),
+                "size_bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+                "cache_dir": str(self.cache_dir)
+            }
@@ -0,0 +1,87 @@
+"""
+Whisper Performance Profiles
+Named model/quantization settings shared by the Whisper service and downloader
+"""
+import os
+
+# compute_type applies on CPU; GPUs always use float16 unless overridden
+PROFILES = {
+    "fast": {
+        "model": "tiny",
+        "compute_type": "int8",
+        "beam_size": 1,
+        "cpu_threads": 4,
+        "num_workers": 1,
+        "batch_size": 16
+    },
+    "balanced": {
+        "model": "base",
+        "compute_type": "int8",
+        "beam_size": 5,
+        "cpu_threads": 4,
+        "num_workers": 2,
+        "batch_size": 8
+    },
+    "accurate": {
+        "model": "small",
+        "compute_type": "float32",
+        "beam_size": 5,
+        "cpu_threads": 8,
+        "num_workers": 1,
+        "batch_size": 4
+    }
+}
+
+DEFAULT_PROFILE = "balanced"
+
+COMPUTE_TYPES = ["int8", "int8_float32", "int8_float16", "float16", "float32"]
+
+# Environment variables that override individual profile settings
+ENV_OVERRIDES = {
+    "model": ("WHISPER_MODEL", str),
+    "compute_type": ("WHISPER_COMPUTE_TYPE", str),
+    "beam_size": ("WHISPER_BEAM_SIZE", int),
+    "cpu_threads": ("WHISPER_CPU_THREADS", int),
+    "num_workers": ("WHISPER_NUM_WORKERS", int),
+    "batch_size": ("WHISPER_BATCH_SIZE", int)
+}
+
+def resolve_profile(name=None, overrides=None):
+    """
+    Build the effective settings for a profile
+
+    The profile name comes from the argument, then WHISPER_PROFILE, then the
+    default. Individual settings are overridden by WHISPER_* environment
+    variables and then by explicit (e.g. CLI) overrides.
+
+    Args:
+        name: Profile name (fast, balanced, accurate)
+        overrides: Dict of settings that take precedence over everything
+
+    Returns:
+        dict: Settings plus "profile" and "compute_type_explicit"
+    """
+    name = name or os.environ.get("WHISPER_PROFILE") or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown Whisper profile: '{name}'. Choose from: {', '.join(PROFILES)}")
+
+    settings = dict(PROFILES[name])
+    explicit = set()
+
+    for key, (env_name, convert) in ENV_OVERRIDES.items():
+        value = os.environ.get(env_name)
+        if value:
+            settings[key] = convert(value)
+            explicit.add(key)
+
+    for key, value in (overrides or {}).items():
+        if value is not None:
+            settings[key] = value
+            explicit.add(key)
+
+    if settings["compute_type"] not in COMPUTE_TYPES:
+        raise ValueError(f"Unknown compute type: '{settings['compute_type']}'. Choose from: {', '.join(COMPUTE_TYPES)}")
+
+    settings["profile"] = name
+    settings["compute_type_explicit"] = "compute_type" in explicit
+    return settings
@@ -2,193 +2,1212 @@
 """
 Simple Whisper Service - GPU Accelerated Transcription
 """
+import time
+_PROCESS_START = time.perf_counter()
+
+import os
 import sys
 import json
-from faster_whisper import WhisperModel
-import os
+import argparse
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
+import numpy as np
+from faster_whisper import WhisperModel
+from faster_whisper.audio import decode_audio
+from faster_whisper.tokenizer import Tokenizer
+from faster_whisper.transcribe import get_suppressed_tokens
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+from transcription_cache import CACHE_DIR, TranscriptionCache
+from whisper_profiles import PROFILES, COMPUTE_TYPES, resolve_profile
+
+# Per-phase startup costs, reported with --profile-startup
+STARTUP_TIMINGS = {"imports": time.perf_counter() - _PROCESS_START}
+PROFILE_STARTUP = False
 
 # Model cache directory
 MODEL_DIR = Path(__file__).parent / "whisper_models"
 MODEL_DIR.mkdir(exist_ok=True)
 
+# Serialises writes to stdout and tags messages with the job being processed
+# when running as a long-lived worker (see run_worker).
+_output_lock = threading.Lock()
+_job_context = threading.local()
+
+# Approximate resident memory of one loaded model plus decoding buffers,
+# used to size the worker pool so it never overcommits RAM
+MODEL_MEMORY_MB = {
+    "tiny": 512,
+    "base": 1024,
+    "small": 2048,
+    "medium": 4096
+}
+LARGE_MODEL_MEMORY_MB = 8192
+
+# Accepted WHISPER_DEVICE values; "auto" (or unset) detects the device
+DEVICES = ("cpu", "cuda", "auto")
+
+# faster-whisper decodes everything to 16 kHz mono
+SAMPLE_RATE = 16000
+
+# ONLY allow these 5 languages - reject all others
+SUPPORTED_LANGUAGES = {
+    'tamil': 'ta',
+    'telugu': 'te',
+    'kannada': 'kn',
+    'hindi': 'hi',
+    'english': 'en'
+}
+
+def emit(message):
+    """Print a status message as one JSON line, tagged with the current job id"""
+    job_id = getattr(_job_context, "job_id", None)
+    if job_id is not None:
+        message = {"id": job_id, **message}
+    with _output_lock:
+        print(json.dumps(message), flush=True)
+
+def record_timing(phase, seconds):
+    """Record the first occurrence of a startup phase and report it when profiling"""
+    if phase in STARTUP_TIMINGS:
+        return
+    STARTUP_TIMINGS[phase] = seconds
+    if PROFILE_STARTUP:
+        emit({
+            "status": "profile",
+            "phase": phase,
+            "seconds": round(seconds, 3),
+            "since_start": round(time.perf_counter() - _PROCESS_START, 3)
+        })
+
+@contextmanager
+def job_context(job_id):
+    """Tag messages emitted inside the block with job_id"""
+    previous = getattr(_job_context, "job_id", None)
+    _job_context.job_id = job_id
+    try:
+        yield
+    finally:
+        _job_context.job_id = previous
+
 def detect_device():
-    """Detect available hardware acceleration"""
+    """
+    Detect available hardware acceleration
+
+    Uses CTranslate2's own device query instead of importing torch, which is
+    slow to import and large in memory on CPU-only machines. WHISPER_DEVICE
+    (cpu or cuda) skips detection entirely; any value outside DEVICES is
+    reported as an error and stops the service.
+    """
+    forced_device = os.environ.get("WHISPER_DEVICE", "").strip().lower()
+    if forced_device and forced_device not in DEVICES:
+        emit({
+            "status": "error",
+            "message": f"Invalid WHISPER_DEVICE '{os.environ['WHISPER_DEVICE']}'. Use one of: {', '.join(DEVICES)}."
+        })
+        sys.exit(1)
+    if forced_device and forced_device != "auto":
+        compute_type = "float16" if forced_device == "cuda" else "int8"
+        emit({
+            "status": "info",
+            "message": f"Using {forced_device} from WHISPER_DEVICE"
+        })
+        return forced_device, compute_type
+
     try:
-        import torch
+        import ctranslate2
         
         # Check for CUDA (NVIDIA GPU)
-        if torch.cuda.is_available():
+        cuda_devices = ctranslate2.get_cuda_device_count()
+        if cuda_devices > 0:
             device = "cuda"
-            compute_type = "float16"  # Use float16 for faster computation on GPU
-            device_name = f"CUDA ({torch.cuda.get_device_name(0)})"
-            print(json.dumps({
+            supported = ctranslate2.get_supported_compute_types("cuda")
+            # Use float16 for faster computation on GPU when the card supports it
+            compute_type = "float16" if "float16" in supported else "float32"
+            emit({
                 "status": "info",
-                "message": f"GPU detected: {device_name}"
-            }), flush=True)
-            return device, compute_type
-        
-        # Check for MPS (Apple Silicon)
-        elif hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
-            device = "mps"
-            compute_type = "float16"
-            device_name = "Apple Metal Performance Shaders (MPS)"
-            print(json.dumps({
-                "status": "info",
-                "message": f"GPU detected: {device_name}"
-            }), flush=True)
+                "message": f"GPU detected: CUDA ({cuda_devices} device(s))"
+            })
             return device, compute_type
         
         # Fallback to CPU with int8 quantization
-        else:
-            device = "cpu"
-            compute_type = "int8"
-            print(json.dumps({
-                "status": "info",
-                "message": "No GPU detected. Using CPU with int8 quantization."
-            }), flush=True)
-            return device, compute_type
+        device = "cpu"
+        compute_type = "int8"
+        emit({
+            "status": "info",
+            "message": "No GPU detected. Using CPU with int8 quantization."
+        })
+        return device, compute_type
             
     except Exception as e:
-        print(json.dumps({
+        emit({
             "status": "warning",
             "message": f"Could not detect GPU: {str(e)}. Falling back to CPU."
-        }), flush=True)
+        })
         return "cpu", "int8"
 
-def load_model():
-    """Load Whisper model with GPU acceleration if available"""
-    print(json.dumps({"status": "loading", "message": "Detecting hardware acceleration..."}), flush=True)
+def load_model(profile=None, cpu_threads=None, num_workers=None):
+    """
+    Load Whisper model with GPU acceleration if available
+
+    Args:
+        profile: Settings from resolve_profile() (default: balanced)
+        cpu_threads: Override the profile's CPU thread count
+        num_workers: Override the profile's concurrent decode count
+    """
+    profile = profile or resolve_profile()
+    model_name = profile["model"]
+
+    emit({"status": "loading", "message": "Detecting hardware acceleration..."})
     
+    phase_start = time.perf_counter()
     device, compute_type = detect_device()
+    record_timing("device_detection", time.perf_counter() - phase_start)
+    # The profile's quantization is for CPU; GPUs keep float16 unless asked otherwise
+    if device == "cpu" or profile["compute_type_explicit"]:
+        compute_type = profile["compute_type"]
     
-    print(json.dumps({
+    emit({
         "status": "loading",
-        "message": f"Loading Whisper model on {device} with {compute_type}..."
-    }), flush=True)
+        "message": f"Loading Whisper '{model_name}' model ({profile['profile']} profile) on {device} with {compute_type}..."
+    })
     
     try:
-        # Use base model for GPU with limited VRAM (RTX 3050, etc.)
+        phase_start = time.perf_counter()
+        # The balanced profile uses base for GPUs with limited VRAM (RTX 3050, etc.)
         # Large model requires 10GB+ VRAM, base requires ~2GB
         model = WhisperModel(
-            "base",  # Use base model for better GPU compatibility
+            model_name,
             device=device,
             compute_type=compute_type,
             download_root=str(MODEL_DIR),
-            num_workers=2,  # Reduce workers for lower memory usage
-            cpu_threads=4   # Reduce CPU threads for lower memory usage
+            num_workers=num_workers or profile["num_workers"],
+            cpu_threads=cpu_threads or profile["cpu_threads"]
         )
-        print(json.dumps({
+        # Remembered so decoding uses the profile's settings and cached
+        # transcripts are only reused for the same model
+        model.model_info = {
+            "model": model_name,
+            "profile": profile["profile"],
+            "device": device,
+            "compute_type": compute_type,
+            "beam_size": profile["beam_size"]
+        }
+        record_timing("model_load", time.perf_counter() - phase_start)
+        emit({
             "status": "ready",
             "message": f"Model loaded successfully on {device} ({compute_type})"
-        }), flush=True)
+        })
         return model
     except Exception as e:
-        print(json.dumps({"status": "error", "message": f"Failed to load model: {str(e)}"}), flush=True)
+        emit({"status": "error", "message": f"Failed to load model: {str(e)}"})
         sys.exit(1)
 
-def transcribe_audio(audio_path, model, language="english"):
-    """Transcribe audio file with minimal configuration"""
-    
-    # ONLY allow these 5 languages - reject all others
-    SUPPORTED_LANGUAGES = {
-        'tamil': 'ta',
-        'telugu': 'te',
-        'kannada': 'kn',
-        'hindi': 'hi',
-        'english': 'en'
-    }
-    
-    # Validate language is supported
+def resolve_language(language):
+    """Validate a language name and return its Whisper language code"""
     if language.lower() not in SUPPORTED_LANGUAGES:
         error_msg = f"Unsupported language: '{language}'. Only Tamil, Telugu, Kannada, Hindi, and English are supported."
-        print(json.dumps({"status": "error", "message": error_msg}), flush=True)
+        emit({"status": "error", "message": error_msg})
         raise ValueError(error_msg)
     
-    whisper_lang = SUPPORTED_LANGUAGES[language.lower()]
-    print(json.dumps({"status": "transcribing", "message": f"Transcribing audio in {language}..."}), flush=True)
+    return SUPPORTED_LANGUAGES[language.lower()]
+
+def transcription_options(whisper_lang, language, word_timestamps=False, beam_size=5):
+    """Decode parameters shared by the sequential and chunked paths"""
+    # GPU-optimized transcription - balanced speed and accuracy
+    # CRITICAL: Force language detection to use specified language, not auto-detect
+    return dict(
+        language=whisper_lang,  # Force this language - do NOT auto-detect
+        beam_size=beam_size,  # Balance between speed and accuracy (set by the profile)
+        vad_filter=True,  # Skip silence - 2x faster
+        vad_parameters=dict(min_silence_duration_ms=500),
+        word_timestamps=word_timestamps,
+        condition_on_previous_text=False,
+        temperature=0.0,  # Deterministic output
+        best_of=1,  # Use single pass (GPU optimized)
+        patience=1.0,  # Early stopping for faster inference
+        length_penalty=1.0,  # No length penalty
+        initial_prompt=f"This audio is in {language}. Transcribe it in {language}."  # Force language context
+    )
+
+def segment_to_dict(segment, offset=0.0):
+    """Convert a faster-whisper segment to a JSON-serialisable dict"""
+    result = {
+        "start": round(offset + segment.start, 3),
+        "end": round(offset + segment.end, 3),
+        "text": segment.text,
+        "avg_logprob": round(segment.avg_logprob, 4)
+    }
+    if segment.words:
+        result["words"] = [
+            {
+                "start": round(offset + word.start, 3),
+                "end": round(offset + word.end, 3),
+                "word": word.word,
+                "probability": round(word.probability, 4)
+            }
+            for word in segment.words
+        ]
+    return result
+
+def segments_to_text(segments):
+    """Join segment texts into a single transcript string"""
+    return "".join(segment["text"] + " " for segment in segments).strip()
+
+def transcribe_audio(audio_path, model, language="english", word_timestamps=False):
+    """
+    Transcribe audio file (path or decoded 16 kHz array) with minimal configuration
+
+    Each segment is emitted as a "segment" message as soon as it is decoded.
+
+    Returns:
+        list: Segments with start, end, text, avg_logprob and optional words
+    """
+    
+    whisper_lang = resolve_language(language)
+    emit({"status": "transcribing", "message": f"Transcribing audio in {language}..."})
     
     try:
-        # GPU-optimized transcription - balanced speed and accuracy
-        # CRITICAL: Force language detection to use specified language, not auto-detect
+        phase_start = time.perf_counter()
         segments, info = model.transcribe(
             audio_path,
-            language=whisper_lang,  # Force this language - do NOT auto-detect
-            beam_size=5,  # Balance between speed and accuracy (GPU can handle this)
-            vad_filter=True,  # Skip silence - 2x faster
-            vad_parameters=dict(min_silence_duration_ms=500),
-            word_timestamps=False,
-            condition_on_previous_text=False,
-            temperature=0.0,  # Deterministic output
-            best_of=1,  # Use single pass (GPU optimized)
-            patience=1.0,  # Early stopping for faster inference
-            length_penalty=1.0,  # No length penalty
-            initial_prompt=f"This audio is in {language}. Transcribe it in {language}."  # Force language context
+            **transcription_options(whisper_lang, language, word_timestamps, model.model_info["beam_size"])
         )
         
         # Collect all segments
-        transcript_text = ""
+        collected = []
         total_duration = info.duration
-        segment_count = 0
         
-        print(json.dumps({
+        emit({
             "status": "info",
             "message": f"Audio duration: {total_duration:.2f} seconds"
-        }), flush=True)
+        })
         
         for segment in segments:
-            transcript_text += segment.text + " "
-            segment_count += 1
+            if not collected:
+                record_timing("first_segment", time.perf_counter() - phase_start)
+            segment_data = segment_to_dict(segment)
+            collected.append(segment_data)
+            emit({"status": "segment", "segment": segment_data})
             
             # Calculate progress
             if total_duration > 0:
                 progress = int((segment.end / total_duration) * 100)
-                print(json.dumps({
+                emit({
                     "status": "progress",
                     "message": f"Processing: {progress}% complete",
                     "percent": progress
-                }), flush=True)
+                })
         
-        print(json.dumps({
+        emit({
             "status": "info",
-            "message": f"Processed {segment_count} segments"
-        }), flush=True)
+            "message": f"Processed {len(collected)} segments"
+        })
         
-        if not transcript_text.strip():
-            print(json.dumps({
+        if not segments_to_text(collected):
+            emit({
                 "status": "warning",
                 "message": "No speech detected in audio. The video might be silent or in a different language."
-            }), flush=True)
+            })
         
-        return transcript_text.strip()
+        return collected
         
     except Exception as e:
-        print(json.dumps({"status": "error", "message": f"Transcription failed: {str(e)}"}), flush=True)
-        sys.exit(1)
+        emit({"status": "error", "message": f"Transcription failed: {str(e)}"})
+        raise RuntimeError(f"Transcription failed: {str(e)}") from e
+
+def speech_windows(audio, max_seconds=30):
+    """
+    Group VAD speech regions into decode windows of at most max_seconds
+
+    Returns:
+        list: [start, end] sample ranges
+    """
+    max_samples = int(max_seconds * SAMPLE_RATE)
+    regions = get_speech_timestamps(
+        audio,
+        VadOptions(min_silence_duration_ms=500, max_speech_duration_s=max_seconds)
+    )
+
+    windows = []
+    for region in regions:
+        if windows and region["end"] - windows[-1][0] <= max_samples:
+            windows[-1][1] = region["end"]
+        else:
+            windows.append([region["start"], region["end"]])
+    return windows
+
+def transcribe_batched(jobs, model, batch_size=8):
+    """
+    Transcribe one or more audio files by decoding VAD windows in batches
+
+    Speech windows (up to 30 s) from every job are pooled and sent through
+    the CTranslate2 encoder/decoder batch_size at a time, so short files
+    queued together share decoder passes. Each window becomes one segment
+    (no word timings). Segments are streamed per job as batches complete.
+
+    Args:
+        jobs: Dicts with "id", "audio_path" and "language"
+        model: Loaded WhisperModel
+        batch_size: Windows decoded per batch
+
+    Returns:
+        list: Segment lists, one per job, in the same order
+    """
+    start_time = time.perf_counter()
+    n_frames = model.feature_extractor.nb_max_frames
+    beam_size = model.model_info["beam_size"]
+    options = {"length_penalty": 1.0, "patience": 1.0}
+
+    items = []
+    audio_seconds = 0.0
+    for job_index, job in enumerate(jobs):
+        with job_context(job["id"]):
+            emit({"status": "transcribing", "message": f"Transcribing audio in {job['language']} (batched)..."})
+
+        audio = decode_audio(job["audio_path"], sampling_rate=SAMPLE_RATE)
+        audio_seconds += len(audio) / SAMPLE_RATE
+
+        whisper_lang = SUPPORTED_LANGUAGES[job["language"].lower()]
+        tokenizer = Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language=whisper_lang)
+        initial_prompt = f"This audio is in {job['language']}. Transcribe it in {job['language']}."
+        prompt = model.get_prompt(
+            tokenizer,
+            tokenizer.encode(" " + initial_prompt),
+            without_timestamps=True
+        )
+
+        for start, end in speech_windows(audio):
+            items.append({
+                "job": job_index,
+                "audio": audio[start:end],
+                "start": start / SAMPLE_RATE,
+                "end": end / SAMPLE_RATE,
+                "prompt": prompt,
+                "tokenizer": tokenizer
+            })
+
+    suppress_tokens = list(get_suppressed_tokens(items[0]["tokenizer"], [-1])) if items else []
+    results = [[] for _ in jobs]
+
+    for batch_start in range(0, len(items), batch_size):
+        batch = items[batch_start:batch_start + batch_size]
+
+        features = np.stack([model.feature_extractor(item["audio"])[:, :n_frames] for item in batch])
+        encoder_output = model.encode(features)
+        outputs = model.model.generate(
+            encoder_output,
+            [item["prompt"] for item in batch],
+            beam_size=beam_size,
+            patience=options["patience"],
+            length_penalty=options["length_penalty"],
+            max_length=getattr(model, "max_length", 448),
+            suppress_blank=True,
+            suppress_tokens=suppress_tokens,
+            return_scores=True,
+            return_no_speech_prob=True
+        )
+
+        for item, output in zip(batch, outputs):
+            tokenizer = item["tokenizer"]
+            tokens = [token for token in output.sequences_ids[0] if token < tokenizer.eot]
+            cumulative_logprob = output.scores[0] * (len(tokens) ** options["length_penalty"])
+            avg_logprob = cumulative_logprob / (len(tokens) + 1)
+
+            # Same silence rule Whisper uses in the sequential path
+            if output.no_speech_prob > 0.6 and avg_logprob < -1.0:
+                continue
+
+            text = tokenizer.decode(tokens)
+            if not text.strip():
+                continue
+
+            segment = {
+                "start": round(item["start"], 3),
+                "end": round(item["end"], 3),
+                "text": text,
+                "avg_logprob": round(avg_logprob, 4)
+            }
+            results[item["job"]].append(segment)
+            record_timing("first_segment", time.perf_counter() - start_time)
+            with job_context(jobs[item["job"]]["id"]):
+                emit({"status": "segment", "segment": segment})
+
+        done = min(batch_start + batch_size, len(items))
+        for job in jobs:
+            with job_context(job["id"]):
+                emit({
+                    "status": "progress",
+                    "message": f"Processing: {int(done / len(items) * 100)}% complete",
+                    "percent": int(done / len(items) * 100)
+                })
+
+    elapsed = time.perf_counter() - start_time
+    throughput = audio_seconds / elapsed if elapsed > 0 else 0.0
+    for job, segments in zip(jobs, results):
+        with job_context(job["id"]):
+            emit({
+                "status": "info",
+                "message": f"Processed {len(segments)} segments in {len(jobs)}-file batch "
+                           f"({throughput:.1f} audio-seconds per second)",
+                "throughput": round(throughput, 2),
+                "audio_seconds": round(audio_seconds, 2),
+                "wall_seconds": round(elapsed, 2)
+            })
+
+    return results
+
+# Model held by each chunk-transcription process (see ChunkedTranscriber)
+_chunk_model = None
+
+def _init_chunk_worker(profile, cpu_threads):
+    """Load the model once in each chunk-transcription process"""
+    global _chunk_model
+    # Protocol messages belong to the parent process only
+    sys.stdout = open(os.devnull, "w")
+    _chunk_model = load_model(profile, cpu_threads=cpu_threads, num_workers=1)
+
+def _transcribe_chunk(audio, offset, whisper_lang, language, word_timestamps):
+    """Transcribe one chunk and return its segments on the global timeline"""
+    segments, _ = _chunk_model.transcribe(
+        audio,
+        **transcription_options(whisper_lang, language, word_timestamps, _chunk_model.model_info["beam_size"])
+    )
+    return [segment_to_dict(segment, offset) for segment in segments]
+
+def plan_chunks(speech_timestamps, total_samples, chunk_samples):
+    """
+    Split audio into chunks of roughly chunk_samples that end in silence
+
+    Args:
+        speech_timestamps: VAD speech regions ({"start", "end"} in samples)
+        total_samples: Length of the audio in samples
+        chunk_samples: Target chunk length in samples
+
+    Returns:
+        list: (start, end) sample ranges covering the whole audio
+    """
+    chunks = []
+    chunk_start = 0
+
+    for current, following in zip(speech_timestamps, speech_timestamps[1:]):
+        if following["end"] - chunk_start > chunk_samples:
+            # Cut in the middle of the silence between the two speech regions
+            cut = (current["end"] + following["start"]) // 2
+            if cut > chunk_start:
+                chunks.append((chunk_start, cut))
+                chunk_start = cut
+
+    chunks.append((chunk_start, total_samples))
+    return chunks
+
+def stitch_chunk(stitched, own_start, own_end, segments):
+    """
+    Append one chunk's segments to the stitched timeline
+
+    Chunks are decoded with a little padding on both sides, so a segment near
+    a boundary can be produced twice. Each segment is kept only by the chunk
+    that owns its midpoint, and an identical neighbouring repeat is dropped.
+
+    Args:
+        stitched: Segments stitched so far (modified in place)
+        own_start: Start of the range this chunk owns, in seconds
+        own_end: End of the range this chunk owns, in seconds
+        segments: Chunk segments on the global timeline
+
+    Returns:
+        list: Segments that were appended
+    """
+    added = []
+    for segment in segments:
+        midpoint = (segment["start"] + segment["end"]) / 2
+        if not own_start <= midpoint < own_end:
+            continue
+        if stitched and segment["text"].strip() == stitched[-1]["text"].strip() \
+                and segment["start"] < stitched[-1]["end"]:
+            continue
+        stitched.append(segment)
+        added.append(segment)
+    return added
+
+class ChunkedTranscriber:
+    """
+    Transcribe long audio by fanning VAD-aligned chunks out to a process pool
+
+    Each process keeps its own warm model, so one long lecture can use every
+    core instead of a single decoder. Audio shorter than min_duration goes
+    through the normal sequential path.
+    """
+
+    def __init__(self, profile=None, processes=None, chunk_seconds=120, min_duration=600, padding_seconds=0.5):
+        self.profile = profile or resolve_profile()
+        self.processes = processes or default_pool_size(self.profile["model"])
+        self.chunk_seconds = chunk_seconds
+        self.min_duration = min_duration
+        self.padding_seconds = padding_seconds
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def _get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                cpu_threads = max(1, (os.cpu_count() or 1) // self.processes)
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    initializer=_init_chunk_worker,
+                    initargs=(self.profile, cpu_threads)
+                )
+            return self.executor
+
+    def transcribe(self, audio_path, model, language="english", word_timestamps=False):
+        """
+        Transcribe an audio file, chunking it when it is long enough
+
+        Segments are streamed in timeline order as soon as every earlier
+        chunk has finished.
+
+        Args:
+            audio_path: Path to the audio file
+            model: Model used for short audio
+            language: Transcription language
+            word_timestamps: Include per-word timings
+
+        Returns:
+            list: Stitched segments
+        """
+        whisper_lang = resolve_language(language)
+        phase_start = time.perf_counter()
+
+        try:
+            audio = decode_audio(audio_path, sampling_rate=SAMPLE_RATE)
+        except Exception as e:
+            emit({"status": "error", "message": f"Failed to decode audio: {str(e)}"})
+            raise RuntimeError(f"Failed to decode audio: {str(e)}") from e
+
+        duration = len(audio) / SAMPLE_RATE
+        if duration < self.min_duration:
+            return transcribe_audio(audio, model, language, word_timestamps)
+
+        emit({"status": "transcribing", "message": f"Transcribing audio in {language}..."})
+
+        try:
+            speech = get_speech_timestamps(audio, VadOptions(min_silence_duration_ms=500))
+            if not speech:
+                emit({
+                    "status": "warning",
+                    "message": "No speech detected in audio. The video might be silent or in a different language."
+                })
+                return []
+
+            chunks = plan_chunks(speech, len(audio), int(self.chunk_seconds * SAMPLE_RATE))
+            padding = int(self.padding_seconds * SAMPLE_RATE)
+
+            emit({
+                "status": "info",
+                "message": f"Audio duration: {duration:.2f} seconds, split into {len(chunks)} chunks "
+                           f"across {self.processes} processes"
+            })
+
+            executor = self._get_executor()
+            futures = {}
+            for index, (start, end) in enumerate(chunks):
+                decode_start = max(0, start - padding)
+                decode_end = min(len(audio), end + padding)
+                future = executor.submit(
+                    _transcribe_chunk,
+                    audio[decode_start:decode_end],
+                    decode_start / SAMPLE_RATE,
+                    whisper_lang,
+                    language,
+                    word_timestamps
+                )
+                futures[future] = index
+
+            results = [None] * len(chunks)
+            segments = []
+            next_chunk = 0
+            done_samples = 0
+            for future in as_completed(futures):
+                index = futures[future]
+                start, end = chunks[index]
+                results[index] = future.result()
+
+                # Stitch and stream every chunk whose predecessors are done
+                while next_chunk < len(chunks) and results[next_chunk] is not None:
+                    own_start, own_end = chunks[next_chunk]
+                    added = stitch_chunk(
+                        segments,
+                        own_start / SAMPLE_RATE,
+                        own_end / SAMPLE_RATE,
+                        results[next_chunk]
+                    )
+                    for segment in added:
+                        record_timing("first_segment", time.perf_counter() - phase_start)
+                        emit({"status": "segment", "segment": segment})
+                    results[next_chunk] = []
+                    next_chunk += 1
+
+                done_samples += end - start
+                progress = int(done_samples / len(audio) * 100)
+                emit({
+                    "status": "progress",
+                    "message": f"Processing: {progress}% complete",
+                    "percent": progress
+                })
+
+        except Exception as e:
+            emit({"status": "error", "message": f"Transcription failed: {str(e)}"})
+            raise RuntimeError(f"Transcription failed: {str(e)}") from e
+
+        emit({
+            "status": "info",
+            "message": f"Processed {len(segments)} segments"
+        })
+
+        if not segments_to_text(segments):
+            emit({
+                "status": "warning",
+                "message": "No speech detected in audio. The video might be silent or in a different language."
+            })
+
+        return segments
+
+    def shutdown(self):
+        """Stop the chunk-transcription processes"""
+        if self.executor is not None:
+            self.executor.shutdown()
+
+def cache_key_for(cache, audio_path, model, language, word_timestamps, chunker, batch_size):
+    """Build the transcription cache key for a job, or None if it cannot be computed"""
+    whisper_lang = SUPPORTED_LANGUAGES[language.lower()]
+    params = transcription_options(whisper_lang, language, word_timestamps, model.model_info["beam_size"])
+    if batch_size:
+        # Batched decoding segments audio by VAD windows, so it is cached separately
+        params["batched"] = True
+    elif chunker is not None:
+        # Chunk boundaries can change segmentation, so they are part of the key
+        params["chunking"] = {"chunk_seconds": chunker.chunk_seconds, "min_duration": chunker.min_duration}
+
+    try:
+        return cache.make_key(
+            audio_path,
+            model.model_info["model"],
+            model.model_info["compute_type"],
+            whisper_lang,
+            params
+        )
+    except OSError as e:
+        emit({"status": "warning", "message": f"Transcription cache unavailable: {str(e)}"})
+        return None
+
+def finish_job(segments, cached=False):
+    """Emit the final message for a job"""
+    transcript = segments_to_text(segments)
+    emit({
+        "status": "complete",
+        "transcript": transcript if transcript else "No speech detected in the audio.",
+        "segments": segments,
+        "cached": cached
+    })
+
+def prepare_job(job, model, chunker, cache, batch_size):
+    """
+    Validate a job and look it up in the cache
+
+    Returns:
+        dict: Job settings with "segments" set on a cache hit, or None if the
+        job is invalid (the error has already been emitted)
+    """
+    audio_path = job.get("audio_path")
+    language = job.get("language") or "english"
+    word_timestamps = bool(job.get("word_timestamps"))
+
+    if not audio_path:
+        emit({"status": "error", "message": "No audio file provided"})
+        return None
+
+    if not os.path.exists(audio_path):
+        emit({"status": "error", "message": f"Audio file not found: {audio_path}"})
+        return None
+
+    try:
+        resolve_language(language)
+    except ValueError:
+        return None
+
+    # Batched decoding has no word timings, so those jobs stay sequential
+    batched = bool(batch_size) and not word_timestamps
+
+    prepared = {
+        "id": job.get("id"),
+        "audio_path": audio_path,
+        "language": language,
+        "word_timestamps": word_timestamps,
+        "batched": batched,
+        "cache_key": None,
+        "segments": None
+    }
+
+    if cache is not None:
+        prepared["cache_key"] = cache_key_for(
+            cache, audio_path, model, language, word_timestamps, chunker, batch_size if batched else None
+        )
+        if prepared["cache_key"] is not None:
+            prepared["segments"] = cache.get(prepared["cache_key"])
+
+    return prepared
+
+def run_jobs(jobs, model, chunker=None, cache=None, batch_size=None):
+    """
+    Run transcription jobs and emit each job's final message
+
+    With batch_size set, jobs that miss the cache are decoded together by
+    transcribe_batched; if batched decoding fails they fall back to the
+    sequential path.
+
+    Args:
+        jobs: Dicts with "id", "audio_path" and optional "language" and "word_timestamps"
+        model: Loaded WhisperModel
+        chunker: Optional ChunkedTranscriber for long audio
+        cache: Optional TranscriptionCache consulted before transcribing
+        batch_size: Decode VAD windows in batches of this size
+
+    Returns:
+        list: True for each job that completed successfully
+    """
+    results = [False] * len(jobs)
+    batched = []
+    sequential = []
+
+    for index, job in enumerate(jobs):
+        with job_context(job.get("id")):
+            prepared = prepare_job(job, model, chunker, cache, batch_size)
+            if prepared is None:
+                continue
+
+            if prepared["segments"] is not None:
+                emit({"status": "info", "message": "Loaded transcript from cache"})
+                for segment in prepared["segments"]:
+                    emit({"status": "segment", "segment": segment})
+                finish_job(prepared["segments"], cached=True)
+                results[index] = True
+            elif prepared["batched"]:
+                batched.append((index, prepared))
+            else:
+                sequential.append((index, prepared))
+
+    if batched:
+        try:
+            segment_lists = transcribe_batched([prepared for _, prepared in batched], model, batch_size)
+        except Exception as e:
+            for _, prepared in batched:
+                with job_context(prepared["id"]):
+                    emit({
+                        "status": "warning",
+                        "message": f"Batched transcription failed ({str(e)}), falling back to sequential"
+                    })
+                # The cache key describes batched output, so skip caching the fallback
+                prepared["cache_key"] = None
+            sequential.extend(batched)
+        else:
+            for (index, prepared), segments in zip(batched, segment_lists):
+                with job_context(prepared["id"]):
+                    if prepared["cache_key"] is not None:
+                        cache.put(prepared["cache_key"], segments)
+                    finish_job(segments)
+                    results[index] = True
+
+    for index, prepared in sorted(sequential, key=lambda item: item[0]):
+        with job_context(prepared["id"]):
+            try:
+                if chunker is not None:
+                    segments = chunker.transcribe(
+                        prepared["audio_path"], model, prepared["language"], prepared["word_timestamps"]
+                    )
+                else:
+                    segments = transcribe_audio(
+                        prepared["audio_path"], model, prepared["language"], prepared["word_timestamps"]
+                    )
+            except (ValueError, RuntimeError):
+                # transcribe_audio has already reported the error
+                continue
+
+            if prepared["cache_key"] is not None:
+                cache.put(prepared["cache_key"], segments)
+            finish_job(segments)
+            results[index] = True
+
+    return results
+
+def run_job(job, model, chunker=None, cache=None, batch_size=None):
+    """
+    Run a single transcription job and emit its final message
+
+    Returns:
+        bool: True if the job completed successfully
+    """
+    return run_jobs([job], model, chunker, cache, batch_size)[0]
+
+def available_memory_mb():
+    """Return available physical memory in MB, or None if it cannot be determined"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def default_pool_size(model_name="base"):
+    """Pick a worker count from available CPU cores and memory"""
+    cores = os.cpu_count() or 1
+    # Each model instance decodes well with ~4 threads; more instances than
+    # that just fight over the same cores
+    by_cpu = max(1, cores // 4)
+
+    memory_mb = available_memory_mb()
+    if memory_mb is None:
+        return by_cpu
+    by_memory = max(1, memory_mb // MODEL_MEMORY_MB.get(model_name, LARGE_MODEL_MEMORY_MB))
+
+    return min(by_cpu, by_memory)
+
+class TranscriptionPool:
+    """
+    Fixed set of model instances serving jobs from a bounded queue
+
+    Each worker thread owns its own WhisperModel (CTranslate2 releases the
+    GIL while decoding), and the CPU cores are split evenly between them so
+    concurrent jobs never oversubscribe the machine. With batch_size set,
+    jobs queued together are decoded in shared batches.
+    """
+
+    def __init__(self, profile=None, size=None, queue_size=8, on_full="reject", chunker=None, cache=None,
+                 batch_size=None):
+        self.profile = profile or resolve_profile()
+        self.size = size or default_pool_size(self.profile["model"])
+        self.on_full = on_full
+        self.chunker = chunker
+        self.cache = cache
+        # In batched mode a worker takes up to batch_size queued jobs at once
+        self.batch_size = batch_size
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.threads = []
+        self.lock = threading.Lock()
+        self.busy = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        # Jobs taken off the queue; total_wait is summed over exactly these
+        self.started = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def start(self):
+        """Load one model per worker and start the worker threads"""
+        cores = os.cpu_count() or 1
+        cpu_threads = max(1, cores // self.size)
+
+        emit({
+            "status": "loading",
+            "message": f"Starting {self.size} transcription worker(s) with {cpu_threads} CPU thread(s) each..."
+        })
+
+        # Models are loaded up front so a load failure stops the whole worker
+        models = [load_model(self.profile, cpu_threads=cpu_threads, num_workers=1) for _ in range(self.size)]
+
+        for index, model in enumerate(models):
+            thread = threading.Thread(target=self._work, args=(model,), name=f"whisper-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, job):
+        """
+        Queue a job for transcription
+
+        When the queue is full the job is either rejected immediately or the
+        caller blocks until a slot frees up, depending on on_full.
+
+        Returns:
+            bool: True if the job was queued
+        """
+        job["enqueued_at"] = time.monotonic()
+
+        if self.on_full == "wait":
+            self.jobs.put(job)
+            return True
+
+        try:
+            self.jobs.put_nowait(job)
+            return True
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+            with job_context(job.get("id")):
+                emit({
+                    "status": "error",
+                    "reason": "queue_full",
+                    "message": "Transcription queue is full. Please try again shortly.",
+                    "queue_depth": self.jobs.qsize()
+                })
+            return False
+
+    def stats(self):
+        """Return queue depth, utilisation and wait-time statistics"""
+        cache_stats = self.cache.stats() if self.cache is not None else None
+        with self.lock:
+            return {
+                "workers": self.size,
+                "busy_workers": self.busy,
+                "queue_depth": self.jobs.qsize(),
+                "queue_capacity": self.jobs.maxsize,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait / self.started * 1000, 1) if self.started else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+                "cache": cache_stats
+            }
+
+    def shutdown(self):
+        """Let queued jobs finish, then stop the worker threads"""
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.chunker is not None:
+            self.chunker.shutdown()
+
+    def _next_jobs(self):
+        """
+        Block for one job, then take whatever else is queued to batch with it
+
+        Returns:
+            tuple: (jobs, stop) where stop means the shutdown sentinel was seen
+        """
+        job = self.jobs.get()
+        if job is None:
+            return [], True
+
+        jobs = [job]
+        while self.batch_size and len(jobs) < self.batch_size:
+            try:
+                extra = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if extra is None:
+                return jobs, True
+            jobs.append(extra)
+
+        return jobs, False
+
+    def _work(self, model):
+        while True:
+            jobs, stop = self._next_jobs()
+            if jobs:
+                self._run(jobs, model)
+            if stop:
+                break
+
+    def _run(self, jobs, model):
+        now = time.monotonic()
+        with self.lock:
+            self.busy += 1
+            self.started += len(jobs)
+            for job in jobs:
+                wait = now - job["enqueued_at"]
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+
+        for job in jobs:
+            wait = now - job["enqueued_at"]
+            with job_context(job.get("id")):
+                emit({
+                    "status": "info",
+                    "message": f"Job started after {wait:.2f}s in queue",
+                    "queue_wait_ms": round(wait * 1000, 1),
+                    "queue_depth": self.jobs.qsize()
+                })
+
+        successes = [False] * len(jobs)
+        try:
+            successes = run_jobs(jobs, model, self.chunker, self.cache, self.batch_size)
+        except Exception as e:
+            for job in jobs:
+                with job_context(job.get("id")):
+                    emit({"status": "error", "message": f"Transcription failed: {str(e)}"})
+        finally:
+            with self.lock:
+                self.busy -= 1
+                self.completed += sum(1 for success in successes if success)
+                self.failed += sum(1 for success in successes if not success)
+
+def run_worker(pool):
+    """
+    Serve transcription jobs over line-delimited JSON on stdin/stdout
+
+    Models are loaded once and reused for every job. Each input line is a
+    job such as {"id": "abc", "audio_path": "...", "language": "english"}.
+    Every message emitted while the job runs carries the same "id", and the
+    status/progress/complete/error shapes match the one-shot CLI. A line of
+    {"command": "stats"} reports pool statistics. The worker exits on EOF or
+    on {"command": "shutdown"} once queued jobs have finished.
+    """
+    pool.start()
+    emit({"status": "worker_ready", "message": "Whisper worker ready for jobs", **pool.stats()})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as e:
+            emit({"status": "error", "message": f"Invalid job: {str(e)}"})
+            continue
+        if not isinstance(job, dict):
+            emit({"status": "error", "message": f"Invalid job: expected a JSON object, got {type(job).__name__}"})
+            continue
+
+        command = job.get("command")
+        if command == "shutdown":
+            break
+        if command == "stats":
+            with job_context(job.get("id")):
+                emit({"status": "stats", **pool.stats()})
+            continue
+
+        pool.submit(job)
+
+    pool.shutdown()
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Transcribe audio with faster-whisper")
+    parser.add_argument("audio_path", nargs="?", help="Audio file to transcribe")
+    parser.add_argument("language", nargs="?", default="english", help="Transcription language")
+    parser.add_argument("--profile", choices=list(PROFILES), default=None,
+                        help="Performance profile (default: WHISPER_PROFILE or balanced)")
+    parser.add_argument("--model", default=None,
+                        help="Override the profile's model size or path")
+    parser.add_argument("--compute-type", choices=COMPUTE_TYPES, default=None,
+                        help="Override the profile's quantization")
+    parser.add_argument("--beam-size", type=int, default=None,
+                        help="Override the profile's beam size")
+    parser.add_argument("--cpu-threads", type=int, default=None,
+                        help="Override the profile's CPU threads (worker pools split cores automatically)")
+    parser.add_argument("--num-workers", type=int, default=None,
+                        help="Override the profile's concurrent decodes per model")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report timings for imports, device detection, model load and first segment")
+    parser.add_argument("--worker", action="store_true",
+                        help="Keep the model loaded and read jobs as JSON lines from stdin")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Model instances in worker mode (default: sized from CPU cores and memory)")
+    parser.add_argument("--queue-size", type=int, default=8,
+                        help="Maximum jobs waiting for a worker")
+    parser.add_argument("--on-full", choices=["reject", "wait"], default="reject",
+                        help="Reject new jobs when the queue is full, or wait for a free slot")
+    parser.add_argument("--word-timestamps", action="store_true",
+                        help="Include per-word timings in each segment")
+    parser.add_argument("--cache-dir", default=str(CACHE_DIR),
+                        help="Directory for cached transcriptions")
+    parser.add_argument("--cache-max-mb", type=int, default=1024,
+                        help="Maximum size of the transcription cache in MB")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always run the model, never read or write the cache")
+    parser.add_argument("--cache-stats", action="store_true",
+                        help="Print transcription cache statistics and exit")
+    parser.add_argument("--batched", action="store_true",
+                        help="Decode VAD windows (from one or more queued files) in batches")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Override the profile's batch size for --batched")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Split long audio at silences and transcribe the chunks in parallel")
+    parser.add_argument("--chunk-seconds", type=float, default=120,
+                        help="Target chunk length in seconds for --chunked")
+    parser.add_argument("--chunk-min-duration", type=float, default=600,
+                        help="Only chunk audio at least this many seconds long")
+    parser.add_argument("--chunk-processes", type=int, default=None,
+                        help="Processes used for chunks (default: sized from CPU cores and memory)")
+    return parser.parse_args(argv)
 
 def main():
-    if len(sys.argv) < 2:
-        print(json.dumps({"status": "error", "message": "No audio file provided"}), flush=True)
+    global PROFILE_STARTUP
+    args = parse_args()
+
+    if args.profile_startup:
+        PROFILE_STARTUP = True
+        emit({"status": "profile", "phase": "imports", "seconds": round(STARTUP_TIMINGS["imports"], 3)})
+
+    try:
+        profile = resolve_profile(args.profile, {
+            "model": args.model,
+            "compute_type": args.compute_type,
+            "beam_size": args.beam_size,
+            "cpu_threads": args.cpu_threads,
+            "num_workers": args.num_workers,
+            "batch_size": args.batch_size
+        })
+    except ValueError as e:
+        emit({"status": "error", "message": str(e)})
+        sys.exit(1)
+
+    cache = None
+    if not args.no_cache:
+        cache = TranscriptionCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+
+    if args.cache_stats:
+        emit({"status": "stats", "cache": cache.stats() if cache is not None else None})
+        return
+
+    batch_size = profile["batch_size"] if args.batched else None
+
+    chunker = None
+    if args.chunked:
+        chunker = ChunkedTranscriber(profile, args.chunk_processes, args.chunk_seconds, args.chunk_min_duration)
+
+    if args.worker:
+        run_worker(TranscriptionPool(profile, args.workers, args.queue_size, args.on_full, chunker, cache,
+                                     batch_size))
+        return
+
+    if not args.audio_path:
+        emit({"status": "error", "message": "No audio file provided"})
         sys.exit(1)
     
-    audio_path = sys.argv[1]
-    language = sys.argv[2] if len(sys.argv) > 2 else "english"
-    
-    if not os.path.exists(audio_path):
-        print(json.dumps({"status": "error", "message": f"Audio file not found: {audio_path}"}), flush=True)
+    if not os.path.exists(args.audio_path):
+        emit({"status": "error", "message": f"Audio file not found: {args.audio_path}"})
         sys.exit(1)
     
     # Load model
-    model = load_model()
+    model = load_model(profile)
     
     # Transcribe with specified language
-    transcript = transcribe_audio(audio_path, model, language)
-    
-    # Output final result
-    print(json.dumps({
-        "status": "complete",
-        "transcript": transcript if transcript else "No speech detected in the audio."
-    }), flush=True)
+    try:
+        job = {"audio_path": args.audio_path, "language": args.language, "word_timestamps": args.word_timestamps}
+        success = run_job(job, model, chunker, cache, batch_size)
+    finally:
+        if chunker is not None:
+            chunker.shutdown()
+
+    if args.profile_startup:
+        emit({
+            "status": "profile",
+            "timings": {phase: round(seconds, 3) for phase, seconds in STARTUP_TIMINGS.items()},
+            "total": round(time.perf_counter() - _PROCESS_START, 3)
+        })
+
+    if not success:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()